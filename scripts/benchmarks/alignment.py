@@ -0,0 +1,95 @@
+import numpy as np
+from PIL import Image, ImageDraw
+from scripts.benchmarks.harness import time_call, print_table
+from scripts.common.alignment import align_share
+from scripts.random_grid import rg_grayscale_halftone
+
+
+# Function to draw a document page: dark lines of "words" on a white background
+def draw_document(size, seed=0):
+    """
+    Parameters:
+    size (tuple): The (width, height) of the page.
+    seed (int): The seed of the lengths of the words.
+
+    Returns:
+    PIL.Image.Image: The page (mode "L").
+    """
+    rng = np.random.default_rng(seed)
+    page = Image.new('L', size, 255)
+    draw = ImageDraw.Draw(page)
+    line_height = max(4, size[1] // 80)
+    margin = size[0] // 10
+    for top in range(margin, size[1] - margin, 2 * line_height):
+        left = margin
+        while True:
+            width = int(rng.integers(2, 8)) * line_height
+            if left + width > size[0] - margin:
+                break
+            draw.rectangle((left, top, left + width, top + line_height), fill=30)
+            left += width + line_height
+    return page
+
+
+# Function to simulate the scan of a printed share: shifted, rotated and scaled on a larger white page
+def simulate_scan(share, translation, angle=0.0, scale=1.0):
+    """
+    Parameters:
+    share (PIL.Image.Image): The share.
+    translation (tuple): The (x, y) position of the share on the page, in pixels.
+    angle (float): The counter-clockwise rotation, in degrees.
+    scale (float): The scaling.
+
+    Returns:
+    PIL.Image.Image: The scanned page (mode "L").
+    """
+    scanned = share.convert('L')
+    if scale != 1.0:
+        scanned = scanned.resize((round(share.size[0] * scale), round(share.size[1] * scale)),
+                                 Image.Resampling.BILINEAR)
+    if angle:
+        scanned = scanned.rotate(angle, resample=Image.Resampling.BILINEAR, expand=True, fillcolor=255)
+
+    page = Image.new('L', (scanned.size[0] + 2 * translation[0], scanned.size[1] + 2 * translation[1]), 255)
+    page.paste(scanned, translation)
+    return page
+
+
+# Function to align a scanned share and compare its decryption with the one of the original shares
+def benchmark_alignment(name, share1, share2, scanned, method, repeat=3):
+    """
+    Parameters:
+    name (str): The label of the case.
+    share1 (PIL.Image.Image): The reference share.
+    share2 (PIL.Image.Image): The original second share.
+    scanned (PIL.Image.Image): The scanned second share.
+    method (str): The alignment method ("Translation" or "Rotation and scale").
+    repeat (int): The number of executions; the fastest one is reported.
+
+    Returns:
+    list: The row of the table (case, alignment time, estimated transform, pixels equal to the original share).
+    """
+    seconds, (aligned, transform) = time_call(align_share, share1, scanned, method, repeat=repeat)
+    # The XOR decryption of the shares: the aligned share has to match the original one, pixel by pixel
+    agreement = (np.asarray(aligned) == np.asarray(share2.convert('1'))).mean()
+    estimate = (f"{transform['angle']:.2f} deg, x{transform['scale']:.3f}, "
+                f"({transform['translation'][0]:.1f}, {transform['translation'][1]:.1f}) px")
+    return [name, f"{seconds * 1000:.0f} ms", estimate, f"{agreement:.1%}"]
+
+
+if __name__ == "__main__":
+    size = (2740, 3650)  # 10 megapixels (an A4 page at about 330 dpi)
+    share1, share2 = rg_grayscale_halftone.encrypt(draw_document(size), "Bayer")
+
+    rows = [
+        benchmark_alignment("shifted by (37, 21)", share1, share2, simulate_scan(share2, (37, 21)), "Translation"),
+        benchmark_alignment("rotated by 1 deg", share1, share2, simulate_scan(share2, (37, 21), 1.0),
+                            "Rotation and scale"),
+        benchmark_alignment("rotated by -2 deg, scaled by 1.01", share1, share2,
+                            simulate_scan(share2, (37, 21), -2.0, 1.01), "Rotation and scale"),
+    ]
+
+    print(f"Shares of {size[0]}x{size[1]} pixels ({size[0] * size[1] / 1e6:.0f} MP), rg_grayscale_halftone\n")
+    print_table(["scanned share", "alignment", "estimated transform", "equal to the original"], rows)
+    print("\nThe rotated scans are interpolated twice (by the simulated scan and by the alignment): some isolated "
+          "pixels are lost, whatever the accuracy of the transform.")
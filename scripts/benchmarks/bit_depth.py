@@ -0,0 +1,47 @@
+import numpy as np
+from scripts.benchmarks.harness import load_test_image, time_call, print_table
+from scripts.random_grid import rg_grayscale_bitplane, rg_grayscale_additive_SS
+from scripts.random_grid import rg_grayscale16_bitplane, rg_grayscale16_additive_SS
+
+
+# Function to compare the 8-bit and the 16-bit array functions of a scheme
+def benchmark_bit_depth(name, module8, module16, gray8, gray16, encryption=(), repeat=3):
+    """
+    Parameters:
+    name (str): The label of the scheme.
+    module8 (module): The 8-bit scheme.
+    module16 (module): The 16-bit scheme.
+    gray8 (numpy.ndarray): The 8-bit image (np.uint8).
+    gray16 (numpy.ndarray): The same image at 16 bits (np.uint16).
+    encryption (tuple): The additional parameters of the encryption.
+    repeat (int): The number of executions; the fastest one is reported.
+
+    Returns:
+    list of lists: One row per operation (scheme, operation, 8-bit time, 16-bit time, ratio).
+    """
+    megapixels = gray8.size / 1e6
+    rows = []
+
+    time8, shares8 = time_call(module8.encrypt_array, gray8, *encryption, repeat=repeat)
+    time16, shares16 = time_call(module16.encrypt_array, gray16, *encryption, repeat=repeat)
+    rows.append([name, "encrypt", f"{megapixels / time8:.0f} MP/s", f"{megapixels / time16:.0f} MP/s",
+                 f"{time16 / time8:.2f}x"])
+
+    time8, _ = time_call(module8.decrypt_array, *shares8, *encryption, repeat=repeat)
+    time16, _ = time_call(module16.decrypt_array, *shares16, *encryption, repeat=repeat)
+    rows.append([name, "decrypt", f"{megapixels / time8:.0f} MP/s", f"{megapixels / time16:.0f} MP/s",
+                 f"{time16 / time8:.2f}x"])
+    return rows
+
+
+if __name__ == "__main__":
+    size = (4000, 3000)  # 12 megapixels
+    gray8 = np.asarray(load_test_image('L', size))
+    gray16 = gray8.astype(np.uint16) * np.uint16(257)
+
+    rows = benchmark_bit_depth("additive", rg_grayscale_additive_SS, rg_grayscale16_additive_SS, gray8, gray16)
+    rows += benchmark_bit_depth("bitplane (8 bitplanes)", rg_grayscale_bitplane, rg_grayscale16_bitplane, gray8,
+                                gray16, (8,))
+
+    print(f"Image of {size[0]}x{size[1]} pixels ({size[0] * size[1] / 1e6:.0f} MP)\n")
+    print_table(["scheme", "operation", "8-bit", "16-bit", "16-bit time / 8-bit time"], rows)
@@ -0,0 +1,70 @@
+import io
+from scripts.benchmarks.harness import load_test_image, time_call, print_table
+from scripts.common.encoding import save_image
+from scripts.random_grid import rg_grayscale_halftone, rg_grayscale_bitplane, rg_grayscale_additive_SS, rg_color_additive_SS
+from scripts.visual_cryptography import vc_grayscale_halftone, vc_color_cmyk
+
+
+# Function to encode an image in memory with an encoder profile
+def encode_in_memory(image, encoder):
+    """
+    Encodes an image in memory with the given encoder profile.
+
+    Parameters:
+    image (PIL.Image.Image): The image to be encoded.
+    encoder (str): The name of the encoder profile.
+
+    Returns:
+    int: The size of the encoded image in bytes.
+    """
+    buffer = io.BytesIO()
+    save_image(image, buffer, encoder)
+    return buffer.tell()
+
+
+# Function to compare the encoder profiles available for the shares of a scheme
+def benchmark_encoders(module, size, repeat=3):
+    """
+    Encrypts the test image with a scheme (using the default parameters) and encodes the two shares with each of
+    its encoder profiles.
+
+    Parameters:
+    module (module): The scheme to be measured.
+    size (tuple): The (width, height) of the input image.
+    repeat (int): The number of executions; the fastest one is reported.
+
+    Returns:
+    list of lists: One row per encoder profile (scheme, encoder, encode time, throughput, share bytes).
+    """
+    config = module.get_config()
+    image = load_test_image(config["image_type"], size)
+    parameters = config["requirements"]["encryption"]["parameters"]
+    share1, share2 = config["encrypt"](image, *(parameter["default"] for parameter in parameters.values()))
+    share_pixels = share1.size[0] * share1.size[1] + share2.size[0] * share2.size[1]
+    rows = []
+
+    for encoder in config["encoders"]:
+        seconds, share_bytes = time_call(lambda: encode_in_memory(share1, encoder) + encode_in_memory(share2, encoder),
+                                         repeat=repeat)
+
+        rows.append([
+            module.__name__.split('.')[-1],
+            encoder,
+            f"{seconds * 1000:.1f} ms",
+            f"{share_pixels / 1e6 / seconds:.1f} MP/s",
+            f"{share_bytes / 1024:.1f} KiB"
+        ])
+
+    return rows
+
+
+if __name__ == "__main__":
+    header = ["scheme", "encoder", "encode 2 shares", "throughput", "2 shares encoded"]
+
+    rows = []
+    for module in [rg_grayscale_additive_SS, rg_color_additive_SS, rg_grayscale_bitplane, rg_grayscale_halftone,
+                   vc_grayscale_halftone]:
+        rows += benchmark_encoders(module, (512, 512))
+    rows += benchmark_encoders(vc_color_cmyk, (100, 100), repeat=1)
+
+    print_table(header, rows)
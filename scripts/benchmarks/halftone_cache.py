@@ -0,0 +1,81 @@
+import tempfile
+import numpy as np
+from scripts.benchmarks.harness import load_test_image, time_call, print_table
+from scripts.common import halftone_cache
+from scripts.random_grid import rg_grayscale_halftone
+from scripts.visual_cryptography import vc_grayscale_halftone, vc_color_cmyk
+
+
+# Function to read the halftoned image back from the decryption of a VC scheme with the 2x2 pixel expansion
+def stacked_black_pixels(decrypted):
+    """
+    The subpixels of a white pixel are half black and half white once stacked, while those of a black pixel are all
+    black: the uniform 2x2 blocks are the black pixels of the halftoned image, whatever the random subpixels drawn.
+
+    Parameters:
+    decrypted (PIL.Image.Image): The decrypted image (the stacked shares).
+
+    Returns:
+    numpy.ndarray: A boolean array, True for the black pixels (of each channel).
+    """
+    subpixels = np.asarray(decrypted)
+    blocks = subpixels.reshape(subpixels.shape[0] // 2, 2, subpixels.shape[1] // 2, 2, *subpixels.shape[2:])
+    return blocks.min(axis=(1, 3)) == blocks.max(axis=(1, 3))
+
+
+# Function to time the repeated encryption of an image without cache, with the cache in memory and on disk
+def benchmark_cache(name, encrypt, decrypt, image, directory, repeat=3):
+    """
+    Parameters:
+    name (str): The label of the scheme.
+    encrypt (callable): Called with the image, returns the shares.
+    decrypt (callable): Called with the shares, returns the halftoned image recovered from them (which does not
+                        depend on the random bytes of the encryption).
+    image (PIL.Image.Image): The input image.
+    directory (str): An empty directory for the planes kept on disk.
+    repeat (int): The number of executions; the fastest one is reported.
+
+    Returns:
+    list: The row of the table (scheme, time without cache, with a hit in memory, with a hit on disk, and whether
+          the shares of the cached planes hold the same halftoned image).
+    """
+    halftone_cache.stop_halftone_cache()
+    uncached, shares = time_call(encrypt, image, repeat=repeat)
+    reference = decrypt(shares)
+
+    cache = halftone_cache.start_halftone_cache(directory=directory)
+    encrypt(image)  # Fills the cache (in memory and on disk)
+    memory_hit, shares = time_call(encrypt, image, repeat=repeat)
+    same = np.array_equal(decrypt(shares), reference)
+
+    cache.clear()  # Read from the directory, as a new process (or another worker) would
+    disk_hit, _ = time_call(lambda: (cache.clear(), encrypt(image)), repeat=repeat)
+    halftone_cache.stop_halftone_cache()
+
+    return [name, f"{uncached * 1000:.0f} ms", f"{memory_hit * 1000:.0f} ms", f"{disk_hit * 1000:.0f} ms",
+            "yes" if same else "NO"]
+
+
+if __name__ == "__main__":
+    size = (1240, 1754)  # A4 page at 150 dpi
+    gray_image = load_test_image('L', size)
+    cmyk_image = load_test_image('CMYK', size)
+
+    cases = [
+        ("rg_grayscale_halftone (Floyd-Steinberg)", lambda img: rg_grayscale_halftone.encrypt(img, "Floyd-Steinberg"),
+         lambda shares: np.asarray(rg_grayscale_halftone.decrypt(*shares, "XOR")), gray_image),
+        ("vc_grayscale_halftone (Floyd-Steinberg)", lambda img: vc_grayscale_halftone.encrypt(img, "2x2"),
+         lambda shares: stacked_black_pixels(vc_grayscale_halftone.decrypt(*shares)), gray_image),
+        ("vc_color_cmyk (Floyd-Steinberg)", lambda img: vc_color_cmyk.encrypt(img, "2x2", "Floyd-Steinberg"),
+         lambda shares: stacked_black_pixels(vc_color_cmyk.decrypt(*shares)), cmyk_image),
+        ("vc_color_cmyk (Bayer)", lambda img: vc_color_cmyk.encrypt(img, "2x2", "Bayer"),
+         lambda shares: stacked_black_pixels(vc_color_cmyk.decrypt(*shares)), cmyk_image),
+    ]
+
+    rows = []
+    for name, encrypt, decrypt, image in cases:
+        with tempfile.TemporaryDirectory() as directory:
+            rows.append(benchmark_cache(name, encrypt, decrypt, image, directory))
+
+    print(f"Encryption of the same {size[0]}x{size[1]} image (A4 page at 150 dpi)\n")
+    print_table(["scheme", "no cache", "hit in memory", "hit on disk", "same halftoned image"], rows)
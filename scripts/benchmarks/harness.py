@@ -0,0 +1,122 @@
+import io
+import os
+import time
+import numpy as np
+from PIL import Image
+from scripts.common.metrics import quality_report
+
+TEST_IMAGE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'images', 'test.png')
+
+
+# Function to load the test image with the requested mode and size
+def load_test_image(mode, size=None):
+    """
+    Loads the repository test image, converted to the requested mode and optionally resized.
+
+    Parameters:
+    mode (str): The PIL mode of the returned image (e.g., "1", "L", "RGB", "CMYK").
+    size (tuple): The (width, height) of the returned image. If None, the original size is kept.
+
+    Returns:
+    PIL.Image.Image: The test image, ready to be used as benchmark input.
+    """
+    image = Image.open(TEST_IMAGE_PATH).convert('RGB')
+    if size is not None:
+        image = image.resize(size, Image.Resampling.LANCZOS)
+
+    return image.convert(mode)
+
+
+# Function to measure the execution time of a function
+def time_call(function, *args, repeat=3):
+    """
+    Calls a function several times and measures the fastest execution.
+
+    Parameters:
+    function (callable): The function to be measured.
+    *args: The positional arguments passed to the function.
+    repeat (int): The number of executions; the fastest one is reported.
+
+    Returns:
+    tuple: The best execution time in seconds and the result of the last call.
+    """
+    best_time = float('inf')
+    result = None
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        best_time = min(best_time, time.perf_counter() - start)
+
+    return best_time, result
+
+
+# Function to compute the size of an image once encoded
+def encoded_size(image, extension):
+    """
+    Encodes an image in memory and returns the number of bytes produced.
+
+    Parameters:
+    image (PIL.Image.Image): The image to be encoded.
+    extension (str): The file format to be used (e.g., "png", "tiff").
+
+    Returns:
+    int: The size of the encoded image in bytes.
+    """
+    buffer = io.BytesIO()
+    image.save(buffer, format=extension)
+    return buffer.tell()
+
+
+# Function to compute the throughput in megapixels per second
+def megapixels_per_second(image, seconds):
+    """
+    Computes the throughput of an operation on an image.
+
+    Parameters:
+    image (PIL.Image.Image): The source image of the operation.
+    seconds (float): The execution time of the operation.
+
+    Returns:
+    float: The number of source megapixels processed per second.
+    """
+    return image.size[0] * image.size[1] / 1e6 / seconds
+
+
+# Function to print the benchmark results as an aligned table
+def print_table(header, rows):
+    """
+    Prints the benchmark results as a plain-text table.
+
+    Parameters:
+    header (list): The column titles.
+    rows (list of lists): The values of each row, in the same order as the header.
+    """
+    rows = [[str(value) for value in row] for row in rows]
+    widths = [max(len(str(title)), *(len(row[i]) for row in rows)) for i, title in enumerate(header)]
+
+    print("  ".join(str(title).ljust(width) for title, width in zip(header, widths)).rstrip())
+    print("  ".join("-" * width for width in widths))
+    for row in rows:
+        print("  ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip())
+
+
+# Function to encrypt and decrypt an image with a scheme, measuring the time and the quality of the result
+def measure_round_trip(config, image, encryption=(), decryption=(), repeat=3):
+    """
+    Encrypts an image with a scheme, decrypts its shares and compares the result with the image.
+
+    Parameters:
+    config (dict): The configuration of the scheme (get_config()).
+    image (PIL.Image.Image): The source image, in the mode of the scheme (config["image_type"]).
+    encryption (list): The additional parameters of the encryption, in the order of get_requirements().
+    decryption (list): The additional parameters of the decryption, in the order of get_requirements().
+    repeat (int): The number of executions; the fastest one is reported.
+
+    Returns:
+    tuple: The encryption time, the decryption time (seconds) and the quality report of the result (see
+           scripts.common.metrics.quality_report).
+    """
+    encrypt_time, shares = time_call(config["encrypt"], image, *encryption, repeat=repeat)
+    decrypt_time, result = time_call(config["decrypt"], *shares, *decryption, repeat=repeat)
+    return encrypt_time, decrypt_time, quality_report(np.asarray(image), np.asarray(result))
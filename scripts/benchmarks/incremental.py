@@ -0,0 +1,71 @@
+import numpy as np
+from scripts.benchmarks.harness import load_test_image, time_call, print_table
+from scripts.random_grid import rg_grayscale_halftone, rg_grayscale_additive_SS
+
+
+# Function to edit a rectangle of an image, as a small change of a document
+def edit_image(image_array, box):
+    """
+    Parameters:
+    image_array (numpy.ndarray): The image (np.uint8).
+    box (tuple): The (left, top, right, bottom) rectangle to be changed.
+
+    Returns:
+    numpy.ndarray: A copy of the image, with the rectangle inverted.
+    """
+    left, top, right, bottom = box
+    edited = image_array.copy()
+    edited[top:bottom, left:right] = 255 - edited[top:bottom, left:right]
+    return edited
+
+
+# Function to compare the full encryption of the edited image with the update of the second share
+def benchmark_update(name, encrypt_array, update_array, image_array, edited_array, repeat=3):
+    """
+    Parameters:
+    name (str): The label of the scheme.
+    encrypt_array (callable): Called as encrypt_array(image_array), returns the two shares.
+    update_array (callable): Called as update_array(share1, share2, old=image_array, new=edited_array), updates
+                             share 2 in place and returns the updated blocks.
+    image_array (numpy.ndarray): The image encrypted first.
+    edited_array (numpy.ndarray): The edited image.
+    repeat (int): The number of executions; the fastest one is reported.
+
+    Returns:
+    list: The row of the table (scheme, full encryption time, update time, updated area, speedup).
+    """
+    share1, share2 = encrypt_array(image_array)
+    full_seconds, _ = time_call(encrypt_array, edited_array, repeat=repeat)
+
+    # Each run starts from the share of the original image
+    updated = share2.copy()
+    blocks = []
+
+    def run_update():
+        updated[:] = share2
+        blocks[:] = update_array(share1, updated, old=image_array, new=edited_array)
+
+    update_seconds, _ = time_call(run_update, repeat=repeat)
+    area = sum((rows.stop - rows.start) * (cols.stop - cols.start) for rows, cols in blocks) / \
+        (share1.shape[0] * share1.shape[1])
+    return [name, f"{full_seconds * 1000:.1f} ms", f"{update_seconds * 1000:.1f} ms", f"{area:.1%}",
+            f"{full_seconds / update_seconds:.1f}x"]
+
+
+if __name__ == "__main__":
+    size = (2480, 3508)  # A4 page at 300 dpi
+    image_array = np.asarray(load_test_image('L', size))
+    edited_array = edit_image(image_array, (1500, 3000, 2200, 3200))  # e.g. a signature field
+
+    rows = []
+    for halftoning in ["Bayer", "Blue noise", "Floyd-Steinberg"]:
+        rows.append(benchmark_update(f"rg_grayscale_halftone ({halftoning})",
+                                     lambda array: rg_grayscale_halftone.encrypt_array(array, halftoning),
+                                     lambda s1, s2, old, new: rg_grayscale_halftone.update_array(
+                                         s1, s2, old=old, new=new, halftoning=halftoning),
+                                     image_array, edited_array))
+    rows.append(benchmark_update("rg_grayscale_additive_SS", rg_grayscale_additive_SS.encrypt_array,
+                                 rg_grayscale_additive_SS.update_array, image_array, edited_array))
+
+    print(f"A4 page ({size[0]}x{size[1]}), edited rectangle of 700x200 pixels\n")
+    print_table(["scheme", "full encryption", "update", "updated area", "speedup"], rows)
@@ -0,0 +1,95 @@
+import numpy as np
+from scripts.benchmarks.harness import load_test_image, time_call, megapixels_per_second, print_table
+from scripts.common import kernels
+from scripts.visual_cryptography import vc_color_cmyk
+
+
+# Function to dither a single channel with the pure Python reference implementation
+def reference_dithering(channel):
+    """
+    Parameters:
+    channel (numpy.ndarray): The pixel values of a channel (np.uint8), with shape (height, width).
+
+    Returns:
+    numpy.ndarray: A boolean array, True where the dithered pixel is black.
+    """
+    black_pixels = np.empty(channel.shape, dtype=bool)
+
+    next_row = channel[0].tolist()
+    for y in range(channel.shape[0]):
+        current_row = next_row
+        next_row = channel[y + 1].tolist() if y < channel.shape[0] - 1 else None
+        black_pixels[y] = vc_color_cmyk.floyd_steinberg_row(current_row, next_row)
+
+    return black_pixels
+
+
+# Function to check that every backend gives the same dithering and the same shares as the reference
+def check_parity(pixels):
+    """
+    Dithers a CMYK image with the Python reference and with each backend (bit-identical results expected),
+    then encrypts it with each backend from the same random bytes (identical shares expected).
+
+    Parameters:
+    pixels (numpy.ndarray): The CMYK image, with shape (height, width, 4).
+
+    Returns:
+    list: One row per backend (backend, image size, dithering check, shares check).
+    """
+    expected = np.stack([reference_dithering(pixels[..., channel]) for channel in range(3)], axis=-1)
+    expected_shares = None
+
+    rows = []
+    for backend in kernels.available_backends():
+        kernels.set_kernel_backend(backend)
+        dithered = np.array(list(vc_color_cmyk.dither_cmy_rows(pixels)))
+
+        # The same random bytes for every backend, so that the shares can be compared
+        shares = vc_color_cmyk.encrypt_array(pixels, random_source=np.random.default_rng(0).bytes)
+        expected_shares = expected_shares or shares
+        same_shares = all(np.array_equal(a, b) for a, b in zip(shares, expected_shares))
+
+        rows.append([backend, f"{pixels.shape[1]}x{pixels.shape[0]}", "ok" if np.array_equal(dithered, expected)
+                     else "MISMATCH", "ok" if same_shares else "MISMATCH"])
+    return rows
+
+
+# Function to measure the dithering of each backend
+def benchmark_backends(size, repeat=3):
+    """
+    Parameters:
+    size (tuple): The (width, height) of the input image.
+    repeat (int): The number of executions; the fastest one is reported.
+
+    Returns:
+    list of lists: One row per backend, then the reference (backend, time, throughput).
+    """
+    image = load_test_image('CMYK', size)
+    pixels = np.asarray(image)
+
+    rows = []
+    for backend in kernels.available_backends():
+        kernels.set_kernel_backend(backend)
+        seconds, _ = time_call(lambda: list(vc_color_cmyk.dither_cmy_rows(pixels)), repeat=repeat)
+        rows.append([backend, f"{seconds * 1000:.1f} ms", f"{megapixels_per_second(image, seconds):.2f} MP/s"])
+
+    seconds, _ = time_call(lambda: [reference_dithering(pixels[..., channel]) for channel in range(3)], repeat=1)
+    rows.append(["python (reference)", f"{seconds * 1000:.1f} ms", f"{megapixels_per_second(image, seconds):.2f} MP/s"])
+    return rows
+
+
+if __name__ == "__main__":
+    default_backend = kernels.KERNEL_BACKEND
+    print(f"Active backend: {default_backend} (available: {', '.join(kernels.available_backends())})\n")
+
+    # Random images (every error value), odd sizes, and blocks of rows whose error is carried to the next block
+    rng = np.random.default_rng(1)
+    parity_rows = []
+    for width, height in [(1, 1), (7, 1), (1, 9), (53, 37), (41, 2 * vc_color_cmyk.DITHER_BLOCK_ROWS + 3)]:
+        parity_rows.extend(check_parity(rng.integers(0, 256, (height, width, 4), dtype=np.uint8)))
+    parity_rows.extend(check_parity(np.asarray(load_test_image('CMYK', (160, 120)))))
+    print_table(["backend", "size", "dithering", "shares"], parity_rows)
+    print()
+
+    print_table(["backend", "Floyd-Steinberg", "throughput"], benchmark_backends((640, 480)))
+    kernels.set_kernel_backend(default_backend)
@@ -0,0 +1,149 @@
+import argparse
+import asyncio
+import io
+import time
+from scripts.benchmarks.harness import load_test_image, print_table
+
+
+# Function to send one encryption request to the /api/v1 endpoint, uploading the image slowly
+async def upload(host, port, path, body, upload_chunks, upload_delay):
+    """
+    Sends a raw-body POST request over a plain HTTP/1.1 connection, splitting the upload into chunks separated
+    by a delay to simulate a slow client, and reads the whole response.
+
+    Parameters:
+    host (str): The server host.
+    port (int): The server port.
+    path (str): The path of the request (e.g. "/api/v1/rg_grayscale_halftone/encrypt").
+    body (bytes): The encoded image sent as the request body.
+    upload_chunks (int): The number of chunks the upload is split into.
+    upload_delay (float): The delay in seconds between two chunks.
+
+    Returns:
+    tuple: The HTTP status code and the latency of the request in seconds.
+    """
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection(host, port)
+
+    writer.write((f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: image/png\r\n"
+                  f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n").encode())
+    chunk_size = -(-len(body) // upload_chunks)
+    for offset in range(0, len(body), chunk_size):
+        writer.write(body[offset:offset + chunk_size])
+        await writer.drain()
+        await asyncio.sleep(upload_delay)
+
+    response = await reader.read()
+    writer.close()
+
+    status = int(response.split(b" ", 2)[1]) if response else 0
+    return status, time.perf_counter() - start
+
+
+# Function to encode the test image sent by the requests of a load test
+def encoded_test_image(size):
+    """
+    Parameters:
+    size (tuple): The (width, height) of the image.
+
+    Returns:
+    bytes: The image encoded as PNG.
+    """
+    buffer = io.BytesIO()
+    load_test_image('RGB', size).save(buffer, format='png')
+    return buffer.getvalue()
+
+
+# Function to summarize the requests of one kind of a load test
+def latency_row(kind, results, elapsed):
+    """
+    Parameters:
+    kind (str): The description of the requests.
+    results (list): The (status, latency) of each request.
+    elapsed (float): The duration of the whole test, in seconds.
+
+    Returns:
+    list: The kind, the successful requests, the requests per second and the median and p95 latencies.
+    """
+    latencies = sorted(latency for status, latency in results if status == 200)
+    successes = len(latencies)
+
+    return [
+        kind,
+        f"{successes}/{len(results)}",
+        f"{successes / elapsed:.1f} req/s",
+        f"{latencies[successes // 2]:.2f} s" if latencies else "-",
+        f"{latencies[int(successes * 0.95) - 1]:.2f} s" if latencies else "-",
+    ]
+
+
+# Function to run a load test with many concurrent slow uploads
+async def run_load_test(host, port, algorithm, concurrency, num_requests, size, upload_chunks, upload_delay,
+                        large_algorithm=None, large_requests=0, large_size=None):
+    """
+    Sends num_requests encryption requests, at most concurrency of them at the same time. Optionally, large
+    requests are sent at the same time (mixed load), to measure how much they delay the small ones.
+
+    Parameters:
+    host (str): The server host.
+    port (int): The server port.
+    algorithm (str): The algorithm identifier used in the /api/v1 path.
+    concurrency (int): The number of concurrent clients.
+    num_requests (int): The total number of requests.
+    size (tuple): The (width, height) of the uploaded image.
+    upload_chunks (int): The number of chunks each upload is split into.
+    upload_delay (float): The delay in seconds between two chunks of an upload.
+    large_algorithm (str): The algorithm identifier of the large requests.
+    large_requests (int): The number of large requests, all sent at the start of the test.
+    large_size (tuple): The (width, height) of the image of the large requests.
+
+    Returns:
+    list: One row for the requests, and one for the large requests if any (see latency_row).
+    """
+    body = encoded_test_image(size)
+    semaphore = asyncio.Semaphore(concurrency)
+    path = f"/api/v1/{algorithm}/encrypt"
+
+    async def client():
+        async with semaphore:
+            return await upload(host, port, path, body, upload_chunks, upload_delay)
+
+    large_body = encoded_test_image(large_size) if large_requests else None
+    large_path = f"/api/v1/{large_algorithm}/encrypt"
+
+    start = time.perf_counter()
+    large_tasks = [asyncio.create_task(upload(host, port, large_path, large_body, 1, 0))
+                   for _ in range(large_requests)]
+    results = await asyncio.gather(*(client() for _ in range(num_requests)))
+    elapsed = time.perf_counter() - start
+
+    rows = [latency_row(f"{algorithm} {size[0]}x{size[1]}", results, elapsed)]
+    if large_tasks:
+        large_results = await asyncio.gather(*large_tasks)
+        rows.append(latency_row(f"{large_algorithm} {large_size[0]}x{large_size[1]}", large_results,
+                                time.perf_counter() - start))
+    return rows
+
+
+if __name__ == "__main__":
+    # Start the server first, e.g. "uvicorn asgi:app --port 8000" (async mode) or "python app.py" (Flask)
+    parser = argparse.ArgumentParser(description="Load test of the /api/v1 encryption endpoint with slow uploads.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--algorithm", default="rg_grayscale_halftone")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--size", type=int, default=256, help="Width and height of the uploaded image")
+    parser.add_argument("--upload-chunks", type=int, default=10)
+    parser.add_argument("--upload-delay", type=float, default=0.1, help="Seconds between two chunks of an upload")
+    parser.add_argument("--large-algorithm", default="vc_color_cmyk", help="Algorithm of the large requests")
+    parser.add_argument("--large-requests", type=int, default=0,
+                        help="Large requests sent at the start, for a mixed load (e.g. 2)")
+    parser.add_argument("--large-size", type=int, default=4096, help="Width and height of the large images")
+    args = parser.parse_args()
+
+    rows = asyncio.run(run_load_test(args.host, args.port, args.algorithm, args.concurrency, args.requests,
+                                     (args.size, args.size), args.upload_chunks, args.upload_delay,
+                                     args.large_algorithm, args.large_requests, (args.large_size, args.large_size)))
+    print(f"Concurrency: {args.concurrency}")
+    print_table(["requests", "successful", "throughput", "median latency", "p95 latency"], rows)
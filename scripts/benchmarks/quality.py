@@ -0,0 +1,74 @@
+import math
+from scripts.benchmarks.harness import load_test_image, measure_round_trip, print_table
+from scripts.common.halftoning import HALFTONING_METHODS
+from scripts.random_grid import rg_grayscale_halftone, rg_grayscale_bitplane, rg_grayscale_additive_SS, rg_color_additive_SS
+from scripts.visual_cryptography import vc_grayscale_halftone, vc_color_cmyk
+
+
+# Function to format a metric, or a dash when it does not apply
+def format_metric(value, digits=3):
+    """
+    Parameters:
+    value (float): The value of the metric (None if it is not computed for the scheme).
+    digits (int): The number of decimal digits.
+
+    Returns:
+    str: The formatted value.
+    """
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return "-"
+    return "inf" if math.isinf(value) else f"{value:.{digits}f}"
+
+
+# Function to measure the speed and the reconstruction quality of a variant of a scheme
+def benchmark_quality(module, variant, size, encryption=(), decryption=()):
+    """
+    Parameters:
+    module (module): The scheme to be measured.
+    variant (str): The description of the parameters, shown in the table.
+    size (tuple): The (width, height) of the test image.
+    encryption (list): The additional parameters of the encryption, in the order of get_requirements().
+    decryption (list): The additional parameters of the decryption, in the order of get_requirements().
+
+    Returns:
+    list: The row of the results (scheme, variant, encrypt time, decrypt time, PSNR, SSIM, contrast, bitplane errors).
+    """
+    config = module.get_config()
+    image = load_test_image(config["image_type"], size)
+    encrypt_time, decrypt_time, report = measure_round_trip(config, image, encryption, decryption)
+
+    bitplane_error = report.get("bitplane_error")
+    return [
+        module.__name__.split('.')[-1],
+        variant,
+        f"{encrypt_time * 1000:.1f} ms",
+        f"{decrypt_time * 1000:.1f} ms",
+        format_metric(report["psnr"], 2),
+        format_metric(report["ssim"]),
+        format_metric(report.get("contrast")),
+        " ".join(f"{error:.2f}" for error in bitplane_error) if bitplane_error is not None else "-"
+    ]
+
+
+if __name__ == "__main__":
+    header = ["scheme", "variant", "encrypt", "decrypt", "PSNR (dB)", "SSIM", "contrast", "bitplane errors (MSB first)"]
+    size = (1024, 768)
+
+    rows = [
+        benchmark_quality(rg_grayscale_additive_SS, "-", size),
+        benchmark_quality(rg_color_additive_SS, "-", size)
+    ]
+    for bitplanes in range(1, 9):
+        rows.append(benchmark_quality(rg_grayscale_bitplane, f"{bitplanes} bitplanes", size, [bitplanes], [bitplanes]))
+    for halftoning in HALFTONING_METHODS:
+        for operation in ["OR", "XOR"]:
+            rows.append(benchmark_quality(rg_grayscale_halftone, f"{halftoning}, {operation}", size,
+                                          [halftoning], [operation]))
+    for expansion in ["2x2", "Probabilistic"]:
+        for halftoning in HALFTONING_METHODS:
+            rows.append(benchmark_quality(vc_grayscale_halftone, f"{expansion}, {halftoning}", size,
+                                          [expansion, halftoning]))
+    for expansion in ["2x2", "Probabilistic"]:
+        rows.append(benchmark_quality(vc_color_cmyk, expansion, (160, 120), [expansion]))  # Per-pixel Python loops
+
+    print_table(header, rows)
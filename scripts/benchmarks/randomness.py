@@ -0,0 +1,71 @@
+import secrets
+import time
+import numpy as np
+from scripts.benchmarks.harness import load_test_image, print_table
+from scripts.common.randomness import RandomPool
+from scripts.random_grid import rg_grayscale_additive_SS, rg_grayscale_halftone
+
+
+# Function to measure the latency of encryptions arriving at intervals
+def measure_latencies(encrypt, image_array, random_source, requests=50, interval=0.05):
+    """
+    Encrypts the image once per request, waiting between the requests as a server between two arrivals (the random
+    pool is refilled in the meantime).
+
+    Parameters:
+    encrypt (callable): Called as encrypt(image_array, random_source), returns the shares.
+    image_array (numpy.ndarray): The image to be encrypted.
+    random_source (callable): The random source of the encryptions.
+    requests (int): The number of encryptions.
+    interval (float): The seconds between two encryptions.
+
+    Returns:
+    list: The latency of each encryption, in seconds.
+    """
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        encrypt(image_array, random_source)
+        latencies.append(time.perf_counter() - start)
+        time.sleep(interval)
+    return latencies
+
+
+# Function to build a row of the table from the latencies of the encryptions
+def latency_row(name, source, latencies):
+    """
+    Parameters:
+    name (str): The label of the scheme.
+    source (str): The label of the random source.
+    latencies (list): The latency of each encryption, in seconds.
+
+    Returns:
+    list: The row of the table (scheme, random source, median, p99 and maximum latency).
+    """
+    p50, p99 = np.percentile(latencies, [50, 99])
+    return [name, source, f"{p50 * 1000:.1f} ms", f"{p99 * 1000:.1f} ms", f"{max(latencies) * 1000:.1f} ms"]
+
+
+if __name__ == "__main__":
+    image_array = np.asarray(load_test_image('L', (1240, 1754)))  # A4 page at 150 dpi
+    schemes = [
+        ("rg_grayscale_additive_SS", lambda array, source: rg_grayscale_additive_SS.encrypt_array(
+            array, random_source=source)),
+        ("rg_grayscale_halftone (Bayer)", lambda array, source: rg_grayscale_halftone.encrypt_array(
+            array, "Bayer", random_source=source)),
+    ]
+
+    pool = RandomPool(capacity=16 * 2 ** 20).start()
+    time.sleep(0.5)  # Initial fill
+
+    rows = []
+    for name, encrypt in schemes:
+        rows.append(latency_row(name, "secrets.token_bytes",
+                                measure_latencies(encrypt, image_array, secrets.token_bytes)))
+        rows.append(latency_row(name, "random pool", measure_latencies(encrypt, image_array, pool.take)))
+
+    print_table(["scheme", "random source", "median", "p99", "max"], rows)
+    metrics = pool.metrics()
+    print(f"\nRandom pool: {metrics['requests']} requests, {metrics['misses']} misses, "
+          f"refilled at {metrics['refill_mb_per_second']} MB/s")
+    pool.stop()
@@ -0,0 +1,51 @@
+from scripts.benchmarks.harness import load_test_image, time_call, megapixels_per_second, print_table
+from scripts.random_grid import rg_grayscale_halftone
+from scripts.visual_cryptography import vc_grayscale_halftone, vc_color_cmyk
+
+
+# Function to build a centered region covering a fraction of an image
+def centered_region(size, fraction):
+    """
+    Parameters:
+    size (tuple): The (width, height) of the image.
+    fraction (float): The fraction of the area of the image covered by the region.
+
+    Returns:
+    str: The region, as accepted by the "regions" parameter.
+    """
+    width, height = (int(side * fraction ** 0.5) for side in size)
+    left, top = (size[0] - width) // 2, (size[1] - height) // 2
+    return f"{left},{top},{left + width},{top + height}"
+
+
+# Function to measure the encryption of a scheme with regions of interest of increasing area
+def benchmark_regions(module, mode, size, parameters, fractions=(1, 0.25, 0.05), repeat=3):
+    """
+    Parameters:
+    module (module): The scheme to be measured.
+    mode (str): The PIL mode of the test image.
+    size (tuple): The (width, height) of the test image.
+    parameters (list): The parameters of the encryption before "regions", in the order of get_requirements().
+    fractions (tuple): The fractions of the image covered by the region (1 encrypts the whole image).
+    repeat (int): The number of executions; the fastest one is reported.
+
+    Returns:
+    list of lists: One row per fraction (scheme, region, time, throughput over the whole page).
+    """
+    image = load_test_image(mode, size)
+
+    rows = []
+    for fraction in fractions:
+        regions = None if fraction == 1 else centered_region(size, fraction)
+        seconds, _ = time_call(module.encrypt, image, *parameters, regions, repeat=repeat)
+        rows.append([module.__name__.split('.')[-1], "whole image" if regions is None else f"{fraction:.0%} ({regions})",
+                     f"{seconds * 1000:.1f} ms", f"{megapixels_per_second(image, seconds):.1f} MP/s"])
+    return rows
+
+
+if __name__ == "__main__":
+    size = (2480, 3508)  # A4 page at 300 dpi
+    rows = benchmark_regions(rg_grayscale_halftone, 'L', size, ["Floyd-Steinberg"])
+    rows += benchmark_regions(vc_grayscale_halftone, 'L', size, ["2x2", "Floyd-Steinberg"])
+    rows += benchmark_regions(vc_color_cmyk, 'CMYK', (1240, 1754), ["2x2", "Floyd-Steinberg"])  # A4 at 150 dpi
+    print_table(["scheme", "region", "encrypt", "page throughput"], rows)
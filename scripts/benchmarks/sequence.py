@@ -0,0 +1,84 @@
+import os
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from PIL import Image, ImageSequence
+from scripts.benchmarks.harness import load_test_image, print_table
+from scripts.common.sequence import encrypt_sequence, decrypt_sequence
+from scripts.random_grid import rg_grayscale_halftone, rg_grayscale_bitplane, rg_grayscale_additive_SS, rg_color_additive_SS
+from scripts.visual_cryptography import vc_grayscale_halftone, vc_color_cmyk
+
+
+# Function to write an animated GIF from the test image, shifting it a little at each frame
+def make_test_animation(path, size, num_frames):
+    """
+    Parameters:
+    path (str): The path of the GIF file.
+    size (tuple): The (width, height) of the frames.
+    num_frames (int): The number of frames.
+    """
+    image = load_test_image('RGB', size)
+    frames = [image.rotate(i * 5, translate=(i * 3, 0)) for i in range(num_frames)]
+    frames[0].save(path, save_all=True, append_images=frames[1:], duration=40)
+
+
+# Function to encrypt and decrypt an animation with a scheme, checking every frame
+def benchmark_sequence(module, size, num_frames, folder):
+    """
+    Encrypts an animated GIF into multi-page shares, decrypts them, and checks that each decrypted frame is
+    equal to the decryption of the same shares page by page. The peak memory traced during the encryption
+    shows that only a few frames are in flight.
+
+    Parameters:
+    module (module): The scheme to be measured.
+    size (tuple): The (width, height) of the frames.
+    num_frames (int): The number of frames.
+    folder (str): The folder for the animation, the shares and the result.
+
+    Returns:
+    list: The row of the results (scheme, frames, encrypt time, frames per second, peak memory, check).
+    """
+    config = module.get_config()
+    encryption = [p["default"] for p in config["requirements"]["encryption"]["parameters"].values()]
+    decryption = [p["default"] for p in config["requirements"]["decryption"]["parameters"].values()]
+    source = os.path.join(folder, "animation.gif")
+    make_test_animation(source, size, num_frames)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    shares = encrypt_sequence(config, source, folder, encryption)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    result = decrypt_sequence(config, shares, os.path.join(folder, "decrypted.tiff"), decryption)
+
+    # Page by page check of the multi-frame outputs
+    with Image.open(shares[0]) as share1, Image.open(shares[1]) as share2, Image.open(result) as decrypted:
+        pages = zip(ImageSequence.Iterator(share1), ImageSequence.Iterator(share2), ImageSequence.Iterator(decrypted))
+        checked = all(np.array_equal(np.asarray(config["decrypt"](s1, s2, *decryption)), np.asarray(d))
+                      for s1, s2, d in pages)
+        checked = checked and decrypted.n_frames == num_frames
+
+    return [
+        module.__name__.split('.')[-1],
+        num_frames,
+        f"{seconds:.2f} s",
+        f"{num_frames / seconds:.1f} fps",
+        f"{peak / 2 ** 20:.1f} MiB",
+        "ok" if checked else "MISMATCH"
+    ]
+
+
+if __name__ == "__main__":
+    header = ["scheme", "frames", "encrypt", "throughput", "peak memory", "check"]
+
+    rows = []
+    with tempfile.TemporaryDirectory() as folder:
+        for module in [rg_grayscale_additive_SS, rg_color_additive_SS, rg_grayscale_bitplane, rg_grayscale_halftone,
+                       vc_grayscale_halftone]:
+            rows.append(benchmark_sequence(module, (320, 240), 24, folder))
+        rows.append(benchmark_sequence(vc_color_cmyk, (80, 60), 6, folder))
+
+    print_table(header, rows)
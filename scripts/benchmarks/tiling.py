@@ -0,0 +1,46 @@
+from scripts.benchmarks.harness import load_test_image, time_call, megapixels_per_second, print_table
+from scripts.common.tiling import default_num_bands
+from scripts.random_grid import rg_grayscale_bitplane, rg_grayscale_additive_SS, rg_color_additive_SS, rg_grayscale_halftone
+
+
+# Function to compare single-threaded and multithreaded executions of the NumPy schemes
+def benchmark_bands(size, repeat=3):
+    """
+    Encrypts and decrypts the test image with the NumPy schemes, using one band and one band per CPU.
+
+    Parameters:
+    size (tuple): The (width, height) of the input image.
+    repeat (int): The number of executions; the fastest one is reported.
+
+    Returns:
+    list of lists: One row per scheme, operation and number of bands (scheme, operation, bands, time, throughput).
+    """
+    gray_image = load_test_image('L', size)
+    color_image = load_test_image('RGB', size)
+
+    cases = [
+        ("rg_grayscale_bitplane", gray_image, lambda img, bands: rg_grayscale_bitplane.encrypt(img, 8, bands),
+         lambda shares, bands: rg_grayscale_bitplane.decrypt(*shares, 8, bands)),
+        ("rg_grayscale_additive_SS", gray_image, rg_grayscale_additive_SS.encrypt,
+         lambda shares, bands: rg_grayscale_additive_SS.decrypt(*shares, bands)),
+        ("rg_color_additive_SS", color_image, rg_color_additive_SS.encrypt,
+         lambda shares, bands: rg_color_additive_SS.decrypt(*shares, bands)),
+        ("rg_grayscale_halftone", gray_image, lambda img, bands: rg_grayscale_halftone.encrypt(img, "Bayer", num_bands=bands),
+         lambda shares, bands: rg_grayscale_halftone.decrypt(*shares, "XOR", num_bands=bands)),
+    ]
+
+    rows = []
+    for name, image, encrypt, decrypt in cases:
+        shares = encrypt(image, 1)
+        for bands in sorted({1, default_num_bands()}):
+            encrypt_time, _ = time_call(encrypt, image, bands, repeat=repeat)
+            decrypt_time, _ = time_call(decrypt, shares, bands, repeat=repeat)
+
+            rows.append([name, "encrypt", bands, f"{encrypt_time * 1000:.1f} ms", f"{megapixels_per_second(image, encrypt_time):.1f} MP/s"])
+            rows.append([name, "decrypt", bands, f"{decrypt_time * 1000:.1f} ms", f"{megapixels_per_second(image, decrypt_time):.1f} MP/s"])
+
+    return rows
+
+
+if __name__ == "__main__":
+    print_table(["scheme", "operation", "bands", "time", "throughput"], benchmark_bands((4000, 4000)))
@@ -0,0 +1,45 @@
+from scripts.benchmarks.harness import load_test_image, time_call, encoded_size, megapixels_per_second, print_table
+from scripts.visual_cryptography import vc_grayscale_halftone, vc_color_cmyk
+
+
+# Function to compare the 2x2 pixel expansion with the probabilistic (non-expansible) mode
+def benchmark_expansion(module, mode, extension, size, repeat=3):
+    """
+    Encrypts the test image with both pixel expansion modes of a VC scheme and collects the results.
+
+    Parameters:
+    module (module): The VC scheme to be measured (it must accept the "expansion" parameter).
+    mode (str): The PIL mode of the input image expected by the scheme.
+    extension (str): The file format used to measure the size of the encoded shares.
+    size (tuple): The (width, height) of the input image.
+    repeat (int): The number of executions; the fastest one is reported.
+
+    Returns:
+    list of lists: One row per expansion mode (scheme, expansion, time, throughput, share pixels, share bytes).
+    """
+    image = load_test_image(mode, size)
+    rows = []
+
+    for expansion in ["2x2", "Probabilistic"]:
+        seconds, (share1, share2) = time_call(module.encrypt, image, expansion, repeat=repeat)
+        share_bytes = encoded_size(share1, extension) + encoded_size(share2, extension)
+
+        rows.append([
+            module.__name__.split('.')[-1],
+            expansion,
+            f"{seconds:.3f} s",
+            f"{megapixels_per_second(image, seconds):.3f} MP/s",
+            f"{share1.size[0]}x{share1.size[1]}",
+            f"{share_bytes / 1024:.1f} KiB"
+        ])
+
+    return rows
+
+
+if __name__ == "__main__":
+    header = ["scheme", "expansion", "encrypt", "throughput", "share size", "2 shares encoded"]
+
+    rows = benchmark_expansion(vc_grayscale_halftone, "1", "png", (400, 400))
+    rows += benchmark_expansion(vc_color_cmyk, "CMYK", "tiff", (100, 100), repeat=1)
+
+    print_table(header, rows)
@@ -0,0 +1,455 @@
+import math
+from functools import lru_cache
+import numpy as np
+from PIL import Image, ImageChops
+from scripts.common.metadata import copy_share_metadata
+from scripts.common.preview import PREVIEW_MAX_SIZE, preview_factor, preview_size
+
+ALIGNMENT_METHODS = ["None", "Translation", "Rotation and scale"]
+
+COARSE_SIZE = 512  # Maximum width and height of the downsampled shares used for the coarse estimation
+WINDOW_SIZE = 256  # Side of the full-resolution windows used for the refinement
+MIN_LEVEL_SIZE = 48  # Minimum width of the coarsest level searched for the rotation and the scale
+MAX_ROTATION = 5  # Largest rotation searched, in degrees
+MAX_SCALING = 0.05  # Largest relative scaling searched
+REFINEMENTS = 3  # Maximum number of refinements of the transform at full resolution
+MIN_PEAK_RATIO = 10  # Minimum height of a correlation peak, in standard deviations of the correlation surface
+
+# The decryption parameter of the schemes whose shares can be aligned (see get_requirements())
+ALIGNMENT_REQUIREMENT = {
+    "type": "select",
+    "options": ALIGNMENT_METHODS,
+    "default": "None",
+    "label": "Align scanned or photographed shares:"
+}
+
+
+# Function to build a 2D Hann window
+@lru_cache(maxsize=8)
+def hann_window(shape):
+    """
+    Parameters:
+    shape (tuple): The (height, width) of the window.
+
+    Returns:
+    numpy.ndarray: The window (np.float32), 1 in the center and 0 on the borders.
+    """
+    window = np.outer(np.hanning(shape[0]), np.hanning(shape[1])).astype(np.float32)
+    window.flags.writeable = False
+    return window
+
+
+# Function to compute the spectrum of an image for the phase correlation
+def windowed_spectrum(image, shape):
+    """
+    Parameters:
+    image (numpy.ndarray): The image (float), with shape (height, width).
+    shape (tuple): The (height, width) of the transform; the image is zero-padded to it.
+
+    Returns:
+    numpy.ndarray: The real 2D Fourier transform of the image, centered on its mean and windowed (so its borders
+                   do not correlate).
+    """
+    return np.fft.rfft2((image - image.mean()) * hann_window(image.shape), s=shape)
+
+
+# Function to estimate the translation between two images by phase correlation
+def phase_correlation(reference, moving, reference_spectrum=None):
+    """
+    Computes the normalized cross-power spectrum of the two images: its inverse transform is a peak at the
+    translation of the content of moving relative to reference. The images are windowed (so their borders do not
+    correlate) and zero-padded to the same size. The peak is located with subpixel precision from its neighbors.
+
+    Parameters:
+    reference (numpy.ndarray): The reference image (float), with shape (height, width).
+    moving (numpy.ndarray): The moving image (float), of any size.
+    reference_spectrum (numpy.ndarray): The windowed_spectrum of the reference, when several images are compared to
+                                        it with the same shape. If None, it is computed.
+
+    Returns:
+    tuple: The (dy, dx) translation (moving(y, x) = reference(y - dy, x - dx)) and the height of the peak in standard
+           deviations of the correlation surface (its significance).
+    """
+    shape = (max(reference.shape[0], moving.shape[0]), max(reference.shape[1], moving.shape[1]))
+    if reference_spectrum is None:
+        reference_spectrum = windowed_spectrum(reference, shape)
+
+    cross_power = windowed_spectrum(moving, shape) * np.conj(reference_spectrum)
+    cross_power /= np.abs(cross_power) + 1e-12
+    surface = np.fft.irfft2(cross_power, s=shape)
+
+    y, x = np.unravel_index(np.argmax(surface), shape)
+    peak = surface[y, x]
+    significance = (peak - surface.mean()) / (surface.std() + 1e-12)
+
+    # The peak of a subpixel translation spreads over its two neighbors in proportion to their distance (Foroosh et
+    # al.): the higher neighbor gives the fraction of pixel
+    def subpixel(before, after):
+        neighbor, sign = (after, 1) if after > before else (before, -1)
+        return 0.0 if neighbor <= 0 else sign * neighbor / (neighbor + peak)
+
+    dy = y + subpixel(surface[y - 1, x], surface[(y + 1) % shape[0], x])
+    dx = x + subpixel(surface[y, x - 1], surface[y, (x + 1) % shape[1]])
+
+    # Translations beyond half the size wrap around to negative values
+    dy = dy - shape[0] if dy > shape[0] / 2 else dy
+    dx = dx - shape[1] if dx > shape[1] / 2 else dx
+    return (dy, dx), significance
+
+
+# Function to compute the edge map of an image
+def edge_map(image):
+    """
+    The two shares are equal where the secret image is white and complementary where it is black, so their gray
+    levels anti-correlate on the black areas. The differences between neighboring pixels are the same in both cases:
+    the edge maps of the shares correlate everywhere but on the contours of the secret image.
+
+    Parameters:
+    image (PIL.Image.Image): The image (any mode).
+
+    Returns:
+    PIL.Image.Image: The sum of the absolute horizontal and vertical differences of the gray levels (mode "L"), one
+                     pixel narrower and shorter than the image.
+    """
+    gray = image.convert('L')
+    width, height = gray.size
+    inner = gray.crop((0, 0, width - 1, height - 1))
+    return ImageChops.add(ImageChops.difference(gray.crop((1, 0, width, height - 1)), inner),
+                          ImageChops.difference(gray.crop((0, 1, width - 1, height)), inner))
+
+
+# Function to convert an edge map to an array, downsampled by an integer factor
+def edge_array(edges, factor=1):
+    """
+    Parameters:
+    edges (PIL.Image.Image): The edge map (see edge_map).
+    factor (int): The downsampling factor (each output pixel is the mean of a block of factor x factor pixels).
+
+    Returns:
+    numpy.ndarray: The downsampled edge map (np.float32).
+    """
+    return np.asarray(edges.reduce(factor) if factor > 1 else edges, dtype=np.float32)
+
+
+# Function to convert a transform into the coefficients of PIL.Image.transform
+def affine_coefficients(matrix, offset):
+    """
+    Parameters:
+    matrix (numpy.ndarray): The 2x2 linear part of the transform, mapping (x, y) of the reference to the moving image.
+    offset (numpy.ndarray): The (x, y) translation of the transform.
+
+    Returns:
+    tuple: The coefficients (a, b, c, d, e, f): the pixel (x, y) of the output is read at
+           (a x + b y + c, d x + e y + f).
+    """
+    return (matrix[0, 0], matrix[0, 1], offset[0], matrix[1, 0], matrix[1, 1], offset[1])
+
+
+# Function to build the transform mapping the reference to the moving image
+def similarity(angle, scale, reference_size, moving_size, translation):
+    """
+    Parameters:
+    angle (float): The rotation of the moving image, in radians.
+    scale (float): The scaling of the moving image.
+    reference_size (tuple): The (width, height) of the reference image.
+    moving_size (tuple): The (width, height) of the moving image.
+    translation (tuple): The (x, y) translation between the centers of the images.
+
+    Returns:
+    tuple: The 2x2 linear part and the (x, y) offset of the transform.
+    """
+    matrix = scale * np.array([[math.cos(angle), -math.sin(angle)], [math.sin(angle), math.cos(angle)]])
+    reference_center = np.array(reference_size) / 2
+    moving_center = np.array(moving_size) / 2
+    return matrix, moving_center + np.array(translation) - matrix @ reference_center
+
+
+# Function to measure the translation between two downsampled shares for a candidate rotation and scale
+def candidate_translation(small_reference, small_moving, angle, scale, reference_spectrum=None):
+    """
+    Parameters:
+    small_reference (numpy.ndarray): The edge map of the downsampled reference share.
+    small_moving (numpy.ndarray): The edge map of the downsampled share to be aligned.
+    angle (float): The candidate rotation of the moving share, in radians.
+    scale (float): The candidate scaling of the moving share.
+    reference_spectrum (numpy.ndarray): The windowed_spectrum of small_reference. If None, it is computed.
+
+    Returns:
+    tuple: The significance of the phase correlation and the (x, y) translation between the centers of the shares.
+    """
+    reference_size, moving_size = small_reference.shape[::-1], small_moving.shape[::-1]
+    matrix, offset = similarity(angle, scale, reference_size, moving_size, (0, 0))
+    resampled = Image.fromarray(small_moving).transform(reference_size, Image.Transform.AFFINE,
+                                                        affine_coefficients(matrix, offset), Image.Resampling.BILINEAR)
+    (dy, dx), significance = phase_correlation(small_reference, np.asarray(resampled), reference_spectrum)
+
+    # The translation was measured on the grid of the reference: it becomes a translation of the moving share
+    return significance, matrix @ np.array([dx, dy])
+
+
+# Function to estimate the coarse transform between two shares on downsampled versions
+def coarse_transform(reference, moving, rotation_scale):
+    """
+    The shares are random patterns, whose magnitude spectra are flat: unlike for natural images, the rotation and
+    the scale cannot be read from them (Fourier-Mellin transform). They are searched instead, from the coarsest
+    level of a pyramid of downsampled shares (factors of 3) to the finest one, each candidate being scored by the
+    significance of its phase correlation. The steps of the search shrink with the size of the level, so that the
+    candidates are never more than about a pixel apart on the borders.
+
+    Parameters:
+    reference (PIL.Image.Image): The reference share.
+    moving (PIL.Image.Image): The share to be aligned.
+    rotation_scale (bool): Whether the rotation and the scale are estimated (otherwise only the translation).
+
+    Returns:
+    tuple: The 2x2 linear part and the (x, y) offset of the transform, in full resolution pixels.
+    """
+    # Odd factors (the levels are powers of 3 of the finest one): the blocks straddle the 2x2 subpixels of the VC shares
+    factors = [max(1, math.ceil(max(*reference.size, *moving.size) / COARSE_SIZE)) | 1]
+    while rotation_scale and max(reference.size) / (factors[0] * 3) >= MIN_LEVEL_SIZE:
+        factors.insert(0, factors[0] * 3)
+
+    reference_edges, moving_edges = edge_map(reference), edge_map(moving)
+    angle, scale, previous_step = 0.0, 1.0, None
+    for factor in factors:
+        small_reference, small_moving = edge_array(reference_edges, factor), edge_array(moving_edges, factor)
+        candidates = [(angle, scale)]
+        if rotation_scale:
+            step = 2 / max(small_reference.shape)
+            if previous_step is None:  # The whole range at the coarsest level
+                reach = math.ceil(math.radians(MAX_ROTATION) / step), math.ceil(MAX_SCALING / step)
+            else:  # Around the estimate of the previous level, within half of its step
+                reach = (math.ceil(previous_step / 2 / step),) * 2
+            candidates = [(angle + i * step, scale + j * step)
+                          for i in range(-reach[0], reach[0] + 1) for j in range(-reach[1], reach[1] + 1)]
+            previous_step = step
+
+        reference_spectrum = windowed_spectrum(small_reference, small_reference.shape)
+        best = None
+        for candidate in candidates:
+            significance, translation = candidate_translation(small_reference, small_moving, *candidate,
+                                                              reference_spectrum)
+            if best is None or significance > best[0]:
+                best = (significance, candidate, translation)
+        _, (angle, scale), translation = best
+
+    return similarity(angle, scale, reference.size, moving.size, translation * factor)
+
+
+# Function to refine a transform with the translations of full resolution windows
+def refine_transform(reference, moving, matrix, offset, rotation_scale):
+    """
+    Resamples windows of the moving share at full resolution with the current transform, measures the residual
+    translation of each window by phase correlation, and fits the correction: a translation (the weighted mean of
+    the residuals), or a similarity (least squares) when the rotation and the scale are estimated.
+
+    Parameters:
+    reference (PIL.Image.Image): The reference share.
+    moving (PIL.Image.Image): The share to be aligned.
+    matrix (numpy.ndarray): The 2x2 linear part of the current transform.
+    offset (numpy.ndarray): The (x, y) offset of the current transform.
+    rotation_scale (bool): Whether the rotation and the scale are refined too.
+
+    Returns:
+    tuple: The refined linear part and offset, and the significance of the weakest window kept.
+    """
+    width, height = reference.size
+    side = min(WINDOW_SIZE, width, height)
+
+    # The center and, for the rotation and the scale, four windows around it
+    positions = [(0.5, 0.5)] + ([(0.2, 0.2), (0.8, 0.2), (0.2, 0.8), (0.8, 0.8)] if rotation_scale else [])
+
+    points, residuals, weights = [], [], []
+    for px, py in positions:
+        left = min(max(0, int(px * width - side / 2)), width - side)
+        top = min(max(0, int(py * height - side / 2)), height - side)
+        box = (left, top, left + side, top + side)
+
+        # Only the part of the moving share covered by the window is converted to gray levels
+        window_offset = offset + matrix @ np.array([left, top])
+        corners = window_offset[:, np.newaxis] + matrix @ np.array([[0, side, 0, side], [0, 0, side, side]])
+        crop_box = (max(0, math.floor(corners[0].min()) - 1), max(0, math.floor(corners[1].min()) - 1),
+                    min(moving.size[0], math.ceil(corners[0].max()) + 2),
+                    min(moving.size[1], math.ceil(corners[1].max()) + 2))
+        if crop_box[0] >= crop_box[2] or crop_box[1] >= crop_box[3]:
+            continue  # The window falls outside the moving share
+        window = moving.crop(crop_box).convert('L').transform(
+            (side, side), Image.Transform.AFFINE, affine_coefficients(matrix, window_offset - np.array(crop_box[:2])),
+            Image.Resampling.BILINEAR, fillcolor=255)
+        (dy, dx), significance = phase_correlation(edge_array(edge_map(reference.crop(box))),
+                                                   edge_array(edge_map(window)))
+        if significance >= MIN_PEAK_RATIO:
+            points.append((left + side / 2, top + side / 2))
+            residuals.append((dx, dy))  # The reference pixel (x, y) is at (x + dx, y + dy) in the window
+            weights.append(significance)
+
+    if not points:
+        raise ValueError("The shares could not be aligned: they do not correlate (are they shares of the same "
+                         "encryption?).")
+
+    points, residuals, weights = np.array(points), np.array(residuals), np.array(weights)
+    if rotation_scale and len(points) >= 3:
+        # Least squares similarity mapping the reference points to their corrected positions (x + residual)
+        targets = points + residuals
+        rows = []
+        for (x, y) in points:
+            rows.append([x, -y, 1, 0])
+            rows.append([y, x, 0, 1])
+        (a, b, tx, ty), *_ = np.linalg.lstsq(np.array(rows) * np.repeat(weights, 2)[:, np.newaxis],
+                                             targets.ravel() * np.repeat(weights, 2), rcond=None)
+        correction, correction_offset = np.array([[a, -b], [b, a]]), np.array([tx, ty])
+    else:
+        correction, correction_offset = np.eye(2), np.average(residuals, axis=0, weights=weights)
+
+    # The corrected transform reads the moving share at transform(correction(x))
+    return matrix @ correction, offset + matrix @ correction_offset, weights.min()
+
+
+# Function to binarize a share with a fixed threshold
+def binarize(image):
+    """
+    Parameters:
+    image (PIL.Image.Image): The share (binary, or scanned in gray levels or colors).
+
+    Returns:
+    PIL.Image.Image: The binary share (mode "1"), white where the gray level is above 127 (unlike
+                     Image.convert('1'), which dithers).
+    """
+    if image.mode == '1':
+        return image
+    return image.convert('L').point(lambda value: 255 if value > 127 else 0).convert('1')
+
+
+# Function to estimate the transform between two binarized shares
+def estimate_transform(reference, moving, rotation_scale):
+    """
+    Parameters:
+    reference (PIL.Image.Image): The reference share, binarized (see binarize).
+    moving (PIL.Image.Image): The share to be aligned, binarized.
+    rotation_scale (bool): Whether the rotation and the scale are estimated (otherwise only the translation).
+
+    Returns:
+    tuple: The 2x2 linear part and the (x, y) offset of the transform (the moving share is read at
+           matrix @ (x, y) + offset for the pixel (x, y) of the reference), and the significance of the weakest
+           correlation peak kept.
+    """
+    matrix, offset = coarse_transform(reference, moving, rotation_scale)
+    for _ in range(REFINEMENTS):  # Each refinement resamples the windows closer to the shares, until it converges
+        previous = offset
+        matrix, offset, significance = refine_transform(reference, moving, matrix, offset, rotation_scale)
+        if np.abs(offset - previous).max() < 0.05:
+            break
+    return matrix, offset, significance
+
+
+# Function to align a share to a reference share
+def align_share(reference, moving, method="Translation"):
+    """
+    Estimates the transform between two shares of the same encryption that were printed and scanned (or
+    photographed) separately, and resamples the moving share on the pixel grid of the reference. The shares
+    correlate where the secret image is white (the pixels, or subpixels, are equal) and anti-correlate where it is
+    black, so the estimation works best on documents (mostly white).
+
+    The transform is estimated by phase correlation of the edge maps of the binarized shares, first on downsampled
+    shares (at most COARSE_SIZE pixels wide, searching the rotation and the scale up to MAX_ROTATION degrees and
+    MAX_SCALING), then refined on full resolution windows of WINDOW_SIZE pixels, so the cost barely depends on the
+    size of the shares.
+
+    Parameters:
+    reference (PIL.Image.Image): The reference share (e.g. share 1).
+    moving (PIL.Image.Image): The share to be aligned, of any size.
+    method (str): "Translation", or "Rotation and scale" (rotation, scale and translation).
+
+    Returns:
+    tuple: The moving share resampled on the grid of the reference (mode "1", white outside the moving share) and
+           the estimated transform, as a dict with "angle" (degrees), "scale", "translation" ((x, y) pixels) and
+           "significance" (height of the weakest correlation peak kept, in standard deviations).
+    """
+    if method.upper() not in ("TRANSLATION", "ROTATION AND SCALE"):
+        raise ValueError(f"Invalid alignment method: {method}. Choose one of {', '.join(ALIGNMENT_METHODS)}.")
+    rotation_scale = method.upper() == "ROTATION AND SCALE"
+
+    # The gray levels of a scan blur the edges of the pixels, which the edge maps are made of
+    reference, moving = binarize(reference), binarize(moving)
+    matrix, offset, significance = estimate_transform(reference, moving, rotation_scale)
+
+    if np.allclose(matrix, np.eye(2), atol=1e-4):
+        # A translation is resampled without interpolation: the threshold of the bilinear interpolation of a binary
+        # share would pick the nearest pixel anyway
+        matrix, offset = np.eye(2), np.round(offset)
+        aligned = moving.transform(reference.size, Image.Transform.AFFINE, affine_coefficients(matrix, offset),
+                                   Image.Resampling.NEAREST, fillcolor=255)
+    else:
+        aligned = binarize(moving.convert('L').transform(reference.size, Image.Transform.AFFINE,
+                                                         affine_coefficients(matrix, offset),
+                                                         Image.Resampling.BILINEAR, fillcolor=255))
+
+    angle = -math.degrees(math.atan2(matrix[1, 0], matrix[0, 0]))  # Counter-clockwise, as Image.rotate
+    scale = math.hypot(matrix[0, 0], matrix[1, 0])
+    center = np.array(reference.size) / 2
+    translation = offset + matrix @ center - np.array(moving.size) / 2
+    return aligned, {"angle": angle, "scale": scale, "translation": tuple(translation.tolist()),
+                               "significance": float(significance)}
+
+
+# Function to prepare the shares of a decryption according to the selected alignment
+def align_shares(images, method="None"):
+    """
+    Parameters:
+    images (list): The shares (PIL images), the first one being the reference.
+    method (str): "None" (the shares are returned unchanged), "Translation" or "Rotation and scale".
+
+    Returns:
+    list: The shares, the others aligned to the first one and all of them binary (mode "1"), with the metadata of
+          the original shares (a scanned share carries none).
+    """
+    if method.upper() == "NONE":
+        return images
+    if method.upper() not in ("TRANSLATION", "ROTATION AND SCALE"):
+        raise ValueError(f"Invalid alignment method: {method}. Choose one of {', '.join(ALIGNMENT_METHODS)}.")
+
+    reference = binarize(images[0])
+    aligned = [reference] + [align_share(reference, image, method)[0] for image in images[1:]]
+    return [copy_share_metadata(image, result) for image, result in zip(images, aligned)]
+
+
+# Function to align the shares of a decryption preview, resampling them only at the pixels of the preview
+def align_shares_preview(images, method, max_size=PREVIEW_MAX_SIZE):
+    """
+    The transform is estimated as in align_share (on downsampled shares and full resolution windows), but the
+    moving shares are never resampled at full resolution: the preview samples one pixel per block of the reference
+    (the center of the block), and reads each moving share at the transformed center of the same pixel.
+
+    Parameters:
+    images (list): The shares (PIL images), the first one being the reference.
+    method (str): "Translation" or "Rotation and scale".
+    max_size (int): The maximum width and height of the preview.
+
+    Returns:
+    list: The subsampled shares, the others aligned to the first one, all of them binary (mode "1") and without
+          metadata (a scanned share carries none).
+    """
+    if method.upper() not in ("TRANSLATION", "ROTATION AND SCALE"):
+        raise ValueError(f"Invalid alignment method: {method}. Choose one of {', '.join(ALIGNMENT_METHODS)}.")
+
+    reference = binarize(images[0])
+    factor = preview_factor(reference.size, max_size)
+    size = preview_size(reference.size, max_size)
+
+    # The pixel (x, y) of the preview is the pixel (factor * x + factor // 2, ...) of the reference, read at its
+    # center: factor * (x + 0.5) + shift, for the center x + 0.5 of the pixel of the preview
+    shift = factor // 2 + 0.5 - factor / 2
+    sampling, sampling_offset = factor * np.eye(2), np.array([shift, shift])
+
+    samples = [reference.transform(size, Image.Transform.AFFINE, affine_coefficients(sampling, sampling_offset),
+                                   Image.Resampling.NEAREST, fillcolor=255)]
+    for image in images[1:]:
+        moving = binarize(image)
+        matrix, offset, _ = estimate_transform(reference, moving, method.upper() == "ROTATION AND SCALE")
+        samples.append(moving.transform(size, Image.Transform.AFFINE,
+                                        affine_coefficients(matrix @ sampling, offset + matrix @ sampling_offset),
+                                        Image.Resampling.NEAREST, fillcolor=255))
+
+    for sample in samples:
+        sample.info.clear()
+    return samples
@@ -0,0 +1,94 @@
+from PIL import Image
+import numpy as np
+
+# PIL modes of the 16-bit grayscale images (and of the 32-bit integer mode, in which PIL may open them)
+HIGH_BIT_DEPTH_MODES = ["I;16", "I;16L", "I;16B", "I;16N", "I"]
+
+
+# Function to convert an image to another mode, keeping the range of its gray levels
+def convert_image(image, mode):
+    """
+    PIL converts between the 8-bit and the 16-bit modes by keeping the values, which turns an 8-bit image into an
+    almost black 16-bit one, and clips a 16-bit image to 255. The gray levels are scaled instead (x 257 from 8 to
+    16 bits, the 8 most significant bits from 16 to 8 bits), so that white stays white.
+
+    Parameters:
+    image (PIL.Image.Image): The input image.
+    mode (str): The PIL mode of the result (e.g., "L", "RGB", "I;16").
+
+    Returns:
+    PIL.Image.Image: The converted image (the input itself if it already has the mode).
+    """
+    if image.mode == mode:
+        return image
+
+    if mode == 'I;16' and image.mode not in HIGH_BIT_DEPTH_MODES:
+        gray = np.asarray(image.convert('L'), dtype=np.uint16)
+        return array_to_image(gray * np.uint16(257), 'I;16')
+    if image.mode in HIGH_BIT_DEPTH_MODES and mode not in HIGH_BIT_DEPTH_MODES:
+        gray = np.asarray(image.convert('I;16') if image.mode == 'I' else image).astype(np.uint16, copy=False)
+        return array_to_image((gray >> 8).astype(np.uint8), 'L').convert(mode)
+
+    return image.convert(mode)
+
+
+# Function to view a PIL image as a numpy array
+def image_to_array(image, mode=None):
+    """
+    Returns the pixels of a PIL image as a (read-only) numpy array, converting the image only when its mode
+    differs from the requested one (see convert_image). Unlike np.array, np.asarray does not make a further copy
+    of the pixels.
+
+    Parameters:
+    image (PIL.Image.Image): The input image.
+    mode (str): The PIL mode expected by the caller (e.g., "1", "L", "RGB", "CMYK", "I;16"). If None, any mode is
+                accepted.
+
+    Returns:
+    numpy.ndarray: The pixels of the image (bool for mode "1", np.uint16 for mode "I;16", np.uint8 for the other
+                   8-bit modes).
+    """
+    if mode is not None and image.mode != mode:
+        image = convert_image(image, mode)
+
+    return np.asarray(image)
+
+
+# Function to wrap a numpy array into a PIL image
+def array_to_image(array, mode):
+    """
+    Wraps a numpy array into a PIL image of the given mode. For 8-bit modes (and the 16-bit "I;16" mode) the image
+    is created with Image.frombuffer, so it shares the memory of the (C-contiguous) array instead of copying it.
+
+    Parameters:
+    array (numpy.ndarray): The pixels, with shape (height, width) or (height, width, channels).
+    mode (str): The PIL mode of the returned image (e.g., "1", "L", "RGB", "CMYK", "I;16").
+
+    Returns:
+    PIL.Image.Image: The image backed by the array (mode "1" images are bit-packed, hence copied).
+    """
+    if mode == '1':
+        return Image.fromarray(array.astype(bool, copy=False))
+
+    if mode == 'I;16':  # Little-endian 16-bit values
+        array = np.ascontiguousarray(array, dtype='<u2')
+        height, width = array.shape[:2]
+        return Image.frombuffer(mode, (width, height), array, 'raw', mode, 0, 1)
+
+    array = np.ascontiguousarray(array, dtype=np.uint8)
+    height, width = array.shape[:2]
+    return Image.frombuffer(mode, (width, height), array, 'raw', mode, 0, 1)
+
+
+# Function to interpret an array as a binary image
+def as_binary(array):
+    """
+    Interprets an array as a binary image, where every non-zero value is white.
+
+    Parameters:
+    array (numpy.ndarray): A boolean array (as returned for mode "1" images) or an integer array (e.g. 0/255 values).
+
+    Returns:
+    numpy.ndarray: A boolean array, True for white pixels and False for black ones (the input itself if already boolean).
+    """
+    return array if array.dtype == bool else array != 0
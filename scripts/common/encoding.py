@@ -0,0 +1,67 @@
+from PIL import Image
+from scripts.common.metadata import metadata_save_options
+
+# Encoder profiles used to save shares and decrypted images. Each scheme lists in get_config()["encoders"]
+# the profiles that are lossless for its images, the first one being the default.
+#   - "format": the file format (also used as file extension)
+#   - "options": the keyword arguments passed to PIL.Image.save
+#   - "mode": if present, the image is converted to this mode before saving (e.g. 1-bit for binary images)
+ENCODER_PROFILES = {
+    "PNG": {"format": "png", "options": {}},
+    "PNG fast": {"format": "png", "options": {"compress_level": 1}},
+    "PNG uncompressed": {"format": "png", "options": {"compress_level": 0}},
+    "PNG 1-bit": {"format": "png", "options": {"compress_level": 1}, "mode": "1"},
+    "TIFF uncompressed": {"format": "tiff", "options": {"compression": "raw"}},
+    "TIFF PackBits": {"format": "tiff", "options": {"compression": "packbits"}},
+    "TIFF Deflate": {"format": "tiff", "options": {"compression": "tiff_adobe_deflate"}},
+}
+
+# Profiles for random noise (incompressible, so the cheapest encoders are listed first)
+NOISE_ENCODERS = ["PNG fast", "PNG uncompressed", "PNG", "TIFF uncompressed"]
+
+# Profiles for binary (black and white) images, which can be stored with 1 bit per pixel
+BINARY_ENCODERS = ["PNG 1-bit", "PNG fast", "PNG", "TIFF PackBits"]
+
+# Profiles for CMYK images (PNG does not support CMYK)
+CMYK_ENCODERS = ["TIFF uncompressed", "TIFF PackBits", "TIFF Deflate"]
+
+
+# Function to retrieve an encoder profile by name
+def get_encoder_profile(name):
+    """
+    Returns the encoder profile with the given name.
+
+    Parameters:
+    name (str): The name of the profile (a key of ENCODER_PROFILES).
+
+    Returns:
+    dict: The encoder profile ("format", "options" and optionally "mode").
+    """
+    if name not in ENCODER_PROFILES:
+        raise ValueError(f"Invalid encoder profile: {name}. Choose one of {', '.join(ENCODER_PROFILES)}.")
+
+    return ENCODER_PROFILES[name]
+
+
+# Function to save an image with an encoder profile
+def save_image(image, fp, profile_name):
+    """
+    Encodes and saves an image using the given encoder profile. The metadata attached to shares by tag_shares
+    (scripts/common/metadata.py) is written in the header of the file.
+
+    Parameters:
+    image (PIL.Image.Image): The image to be saved.
+    fp (str or file object): The destination path or a writable binary file object.
+    profile_name (str): The name of the encoder profile.
+
+    Returns:
+    str: The file extension of the saved image (e.g. "png", "tiff").
+    """
+    profile = get_encoder_profile(profile_name)
+    options = dict(profile["options"], **metadata_save_options(image, profile["format"]))
+
+    if "mode" in profile and image.mode != profile["mode"]:
+        image = image.convert(profile["mode"], dither=Image.Dither.NONE)
+
+    image.save(fp, format=profile["format"], **options)
+    return profile["format"]
@@ -0,0 +1,256 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+
+HALFTONE_CACHE_CAPACITY = 64 * 2 ** 20  # Bytes of bit-packed planes kept in memory: about 500 megapixels of planes
+HALFTONE_DISK_CAPACITY = 2 ** 30  # Bytes of bit-packed planes kept on disk, when a directory is given
+
+
+# Function to compute the key of the halftoned planes of an image
+def halftone_key(kind, array, method):
+    """
+    The halftoning is deterministic, so the planes are identified by the content of the image and by the method.
+
+    Parameters:
+    kind (str): The halftoning step (e.g. "gray" for the error diffusion of PIL, "cmy" for the Cyan, Magenta and
+                Yellow channels of vc_color_cmyk), so that different steps on the same pixels do not collide.
+    array (numpy.ndarray): The pixels of the image.
+    method (str): The halftoning method.
+
+    Returns:
+    str: The hexadecimal key.
+    """
+    digest = hashlib.blake2b(f"{kind}|{method.upper()}|{array.shape}|{array.dtype.str}|".encode(), digest_size=20)
+    digest.update(np.ascontiguousarray(array).data)
+    return digest.hexdigest()
+
+
+# Cache of halftoned planes, in memory (least recently used first out) and optionally on disk
+class HalftoneCache:
+    def __init__(self, capacity=HALFTONE_CACHE_CAPACITY, directory=None, disk_capacity=HALFTONE_DISK_CAPACITY):
+        """
+        Keeps the halftoned (boolean) planes of the last images, bit-packed, so that a new encryption of the same
+        image only draws fresh random bytes and builds the shares. The planes reveal the secret images: the
+        directory should be readable only by the server (the files are created with mode 0o600).
+
+        Parameters:
+        capacity (int): The number of bytes of planes kept in memory. The least recently used planes are evicted
+                        first.
+        directory (str): The directory of the planes kept on disk (shared by the processes of a server). If None,
+                         the planes are kept in memory only.
+        disk_capacity (int): The number of bytes of planes kept in the directory. The least recently used files are
+                             deleted first.
+        """
+        if capacity < 0 or disk_capacity < 0:
+            raise ValueError(f"Invalid halftone cache: capacity {capacity} and disk capacity {disk_capacity} "
+                             f"must not be negative.")
+
+        self.capacity = capacity
+        self.directory = directory
+        self.disk_capacity = disk_capacity
+        if directory is not None:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+
+        self.entries = OrderedDict()  # Bit-packed planes by key, from the least to the most recently used
+        self.size = 0  # Total size of the entries
+        self.lock = threading.Lock()
+
+        # Counters reported by metrics()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # Returns the path of the file of a key in the directory
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.npy")
+
+    # Returns the halftoned planes of a key, or None if they are not cached
+    def get(self, key, shape):
+        """
+        Parameters:
+        key (str): The key of the planes (see halftone_key).
+        shape (tuple): The shape of the planes.
+
+        Returns:
+        numpy.ndarray: The planes (a new boolean array with the given shape), or None.
+        """
+        with self.lock:
+            packed = self.entries.get(key)
+            if packed is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+
+        if packed is None and self.directory is not None:
+            try:
+                packed = np.load(self._path(key))
+                os.utime(self._path(key))  # Most recently used
+            except (OSError, ValueError):  # Missing, or evicted (or being replaced) by another process
+                packed = None
+            if packed is not None:
+                self._store(key, packed)
+                with self.lock:
+                    self.disk_hits += 1
+
+        if packed is None:
+            with self.lock:
+                self.misses += 1
+            return None
+
+        count = int(np.prod(shape))
+        return np.unpackbits(packed, count=count).view(bool).reshape(shape)
+
+    # Adds the halftoned planes of a key to the cache
+    def put(self, key, planes):
+        """
+        Parameters:
+        key (str): The key of the planes (see halftone_key).
+        planes (numpy.ndarray): The halftoned planes (boolean).
+        """
+        packed = np.packbits(planes, axis=None)
+        self._store(key, packed)
+
+        if self.directory is not None and packed.nbytes <= self.disk_capacity:
+            self._write(key, packed)
+
+    # Keeps bit-packed planes in memory, evicting the least recently used ones beyond the capacity
+    def _store(self, key, packed):
+        if packed.nbytes > self.capacity:
+            return
+
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous.nbytes
+            self.entries[key] = packed
+            self.size += packed.nbytes
+
+            while self.size > self.capacity:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= evicted.nbytes
+                self.evictions += 1
+
+    # Writes bit-packed planes to the directory, deleting the least recently used files beyond the disk capacity
+    def _write(self, key, packed):
+        # Written under a temporary name, then renamed: the other processes never read a partial file
+        temporary = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with os.fdopen(os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "wb") as file:
+            np.save(file, packed)
+        os.replace(temporary, self._path(key))
+
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".npy"):
+                try:
+                    stat = entry.stat()
+                except OSError:  # Deleted by another process
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.disk_capacity:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    # Empties the cache in memory (the files of the directory are kept)
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    # Creates a new lock in a forked child process (the lock may have been held by another thread of the parent)
+    def _forget(self):
+        self.lock = threading.Lock()
+
+    # Returns the state of the cache and its counters
+    def metrics(self):
+        with self.lock:
+            return {
+                "capacity_bytes": self.capacity,
+                "size_bytes": self.size,
+                "entries": len(self.entries),
+                "directory": self.directory,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+
+HALFTONE_CACHE = None  # The cache of the process, created by start_halftone_cache
+
+
+# Function to create the halftone cache of the process
+def start_halftone_cache(capacity=HALFTONE_CACHE_CAPACITY, directory=None, disk_capacity=HALFTONE_DISK_CAPACITY):
+    """
+    Parameters:
+    capacity (int): The number of bytes of planes kept in memory (see HalftoneCache). If 0, no cache is created.
+    directory (str): The directory of the planes kept on disk. If None, the planes are kept in memory only.
+    disk_capacity (int): The number of bytes of planes kept in the directory.
+
+    Returns:
+    HalftoneCache: The cache of the process (the existing one if it was already created), or None.
+    """
+    global HALFTONE_CACHE
+
+    if HALFTONE_CACHE is None and capacity > 0:
+        HALFTONE_CACHE = HalftoneCache(capacity, directory, disk_capacity)
+    return HALFTONE_CACHE
+
+
+# Function to remove the halftone cache of the process
+def stop_halftone_cache():
+    global HALFTONE_CACHE
+
+    cache, HALFTONE_CACHE = HALFTONE_CACHE, None
+    if cache is not None:
+        cache.clear()
+
+
+# Function to get the halftone cache of the process
+def get_halftone_cache():
+    """
+    Returns:
+    HalftoneCache: The cache created by start_halftone_cache, or None.
+    """
+    return HALFTONE_CACHE
+
+
+# Function to halftone an image through the cache of the process
+def cached_halftone(kind, array, method, halftone):
+    """
+    Parameters:
+    kind (str): The halftoning step (see halftone_key).
+    array (numpy.ndarray): The pixels of the image.
+    method (str): The halftoning method.
+    halftone (callable): Called without arguments on a miss, returns the halftoned planes (boolean).
+
+    Returns:
+    numpy.ndarray: The halftoned planes, from the cache if it holds them (always computed without a cache).
+    """
+    cache = HALFTONE_CACHE
+    if cache is None:
+        return halftone()
+
+    key = halftone_key(kind, array, method)
+    planes = cache.get(key, array.shape)
+    if planes is None:
+        planes = halftone()
+        cache.put(key, planes)
+    return planes
+
+
+# Function run in a child process after a fork: the locks of the parent may be held by its other threads
+def forget_locks_after_fork():
+    if HALFTONE_CACHE is not None:
+        HALFTONE_CACHE._forget()
+
+
+os.register_at_fork(after_in_child=forget_locks_after_fork)
@@ -0,0 +1,200 @@
+from functools import lru_cache
+from PIL import Image
+import numpy as np
+from scripts.common.halftone_cache import cached_halftone
+
+# Halftoning methods selectable through the "halftoning" parameter of the halftone schemes
+HALFTONING_METHODS = ["Floyd-Steinberg", "Bayer", "Blue noise"]
+
+BAYER_ORDER = 8  # Size of the Bayer threshold matrix (8x8, 64 gray levels)
+BLUE_NOISE_SIZE = 64  # Size of the blue-noise threshold mask (64x64, 4096 gray levels)
+
+
+# Function to build the Bayer index matrix used for ordered dithering
+@lru_cache(maxsize=None)
+def bayer_matrix(order=BAYER_ORDER):
+    """
+    Builds the recursive Bayer index matrix of the requested order.
+
+    Parameters:
+    order (int): The size of the matrix (a power of 2).
+
+    Returns:
+    numpy.ndarray: An (order x order) matrix containing each index from 0 to order^2 - 1 exactly once.
+    """
+    matrix = np.zeros((1, 1), dtype=np.int64)
+
+    while matrix.shape[0] < order:
+        matrix = np.block([[4 * matrix + 0, 4 * matrix + 2],
+                           [4 * matrix + 3, 4 * matrix + 1]])
+
+    return matrix
+
+
+# Function to build a blue-noise index matrix with the void-and-cluster algorithm
+@lru_cache(maxsize=None)
+def blue_noise_matrix(size=BLUE_NOISE_SIZE, sigma=1.5):
+    """
+    Builds a blue-noise index matrix using the void-and-cluster algorithm by Ulichney. The matrix is computed
+    once per process (and then cached), starting from a fixed pattern, so it is the same on every run.
+
+    Parameters:
+    size (int): The size of the square matrix.
+    sigma (float): The standard deviation of the Gaussian filter used to find clusters and voids.
+
+    Returns:
+    numpy.ndarray: A (size x size) matrix containing each index from 0 to size^2 - 1 exactly once.
+    """
+    num_pixels = size * size
+
+    # Toroidal Gaussian kernel centred on (0, 0), used to measure the local density of the minority pixels
+    distance = np.minimum(np.arange(size), size - np.arange(size))
+    kernel = np.exp(-(distance[:, np.newaxis] ** 2 + distance[np.newaxis, :] ** 2) / (2 * sigma ** 2))
+
+    def splat(energy, y, x, sign):
+        energy += sign * np.roll(np.roll(kernel, y, axis=0), x, axis=1)
+
+    # Initial binary pattern: 10% of the pixels, drawn from a fixed seed (the mask is public, not a secret)
+    pattern = np.zeros((size, size), dtype=bool)
+    pattern.flat[np.random.default_rng(0).choice(num_pixels, num_pixels // 10, replace=False)] = True
+
+    energy = np.zeros((size, size))
+    for y, x in zip(*np.nonzero(pattern)):
+        splat(energy, y, x, 1)
+
+    # Move pixels from the tightest cluster to the largest void until the pattern is stable
+    for _ in range(num_pixels):
+        cluster = np.unravel_index(np.argmax(np.where(pattern, energy, -np.inf)), pattern.shape)
+        pattern[cluster] = False
+        splat(energy, *cluster, -1)
+
+        void = np.unravel_index(np.argmin(np.where(pattern, np.inf, energy)), pattern.shape)
+        if void == cluster:
+            pattern[cluster] = True
+            splat(energy, *cluster, 1)
+            break
+
+        pattern[void] = True
+        splat(energy, *void, 1)
+
+    ranks = np.zeros((size, size), dtype=np.int64)
+    initial_pattern, initial_energy = pattern.copy(), energy.copy()
+    num_ones = int(pattern.sum())
+
+    # Phase 1: rank the initial pixels by removing the tightest cluster first
+    for rank in range(num_ones - 1, -1, -1):
+        cluster = np.unravel_index(np.argmax(np.where(pattern, energy, -np.inf)), pattern.shape)
+        pattern[cluster] = False
+        splat(energy, *cluster, -1)
+        ranks[cluster] = rank
+
+    # Phase 2 and 3: rank the remaining pixels by filling the largest void first
+    pattern, energy = initial_pattern, initial_energy
+    for rank in range(num_ones, num_pixels):
+        void = np.unravel_index(np.argmin(np.where(pattern, np.inf, energy)), pattern.shape)
+        pattern[void] = True
+        splat(energy, *void, 1)
+        ranks[void] = rank
+
+    return ranks
+
+
+# Function to convert an index matrix into a threshold mask on the 0-255 scale
+@lru_cache(maxsize=None)
+def threshold_mask(method):
+    """
+    Returns the threshold mask of an ordered halftoning method. A pixel is white when its value
+    is greater than the threshold at the same position (the mask is tiled over the image).
+
+    Parameters:
+    method (str): "Bayer" or "Blue noise".
+
+    Returns:
+    numpy.ndarray: A square matrix of thresholds in the range (0, 255).
+    """
+    if method.upper() == "BAYER":
+        indices = bayer_matrix()
+    elif method.upper() == "BLUE NOISE":
+        indices = blue_noise_matrix()
+    else:
+        raise ValueError(f"Invalid ordered halftoning method: {method}. Choose 'Bayer' or 'Blue noise'.")
+
+    thresholds = (indices + 0.5) * 255 / indices.size
+    thresholds.flags.writeable = False
+    return thresholds
+
+
+# Function to halftone a grayscale array with an ordered (threshold mask) method
+def ordered_dithering(gray_array, method, row_offset=0):
+    """
+    Halftones a grayscale array by comparing every pixel with a tiled threshold mask. Each pixel is processed
+    independently, so the image can be split into bands and halftoned in any order.
+
+    Parameters:
+    gray_array (numpy.ndarray): The grayscale values (0-255), with the image rows on the first axis.
+                                Additional trailing axes (e.g. color channels) share the same threshold.
+    method (str): "Bayer" or "Blue noise".
+    row_offset (int): The index of the first row of gray_array within the whole image, used to align the mask
+                      when gray_array is only a band of the image.
+
+    Returns:
+    numpy.ndarray: A boolean array with the shape of gray_array, True for white pixels and False for black ones.
+    """
+    mask = threshold_mask(method)
+    rows = (np.arange(gray_array.shape[0]) + row_offset) % mask.shape[0]
+    cols = np.arange(gray_array.shape[1]) % mask.shape[1]
+
+    thresholds = mask[rows[:, np.newaxis], cols[np.newaxis, :]]
+    thresholds = thresholds.reshape(thresholds.shape + (1,) * (gray_array.ndim - 2))
+
+    return gray_array > thresholds
+
+
+# Function to halftone an image with the selected method
+def halftone(image, method="Floyd-Steinberg"):
+    """
+    Converts an image into a binary image with the selected halftoning method.
+
+    Parameters:
+    image (PIL.Image.Image): The input image (any mode, it is converted to grayscale first).
+    method (str): "Floyd-Steinberg" (PIL error diffusion), "Bayer" or "Blue noise" (ordered dithering).
+
+    Returns:
+    PIL.Image.Image: The halftoned binary image (mode "1").
+    """
+    if method.upper() == "FLOYD-STEINBERG":
+        return image.convert('1')
+    elif method.upper() in ("BAYER", "BLUE NOISE"):
+        return Image.fromarray(ordered_dithering(np.asarray(image.convert('L')), method))
+    else:
+        raise ValueError(f"Invalid halftoning method: {method}. Choose one of {', '.join(HALFTONING_METHODS)}.")
+
+
+# Function to prepare the halftoning of an image one horizontal band at a time
+def band_halftoner(image_array, method="Floyd-Steinberg"):
+    """
+    Prepares the halftoning of an image so that it can be computed one horizontal band at a time (e.g. inside
+    the kernels of run_in_bands). Floyd-Steinberg is an error diffusion, so it is computed at once on the whole
+    image (or read from the halftone cache of the process, see scripts/common/halftone_cache.py), while the ordered
+    methods are computed independently on each requested band.
+
+    Parameters:
+    image_array (numpy.ndarray): The grayscale image (np.uint8), or a binary image (bool) which is left unchanged.
+    method (str): "Floyd-Steinberg", "Bayer" or "Blue noise".
+
+    Returns:
+    callable: A function that, given a slice of rows, returns the halftoned band as a boolean array
+              (True for white pixels and False for black ones).
+    """
+    if method.upper() not in (name.upper() for name in HALFTONING_METHODS):
+        raise ValueError(f"Invalid halftoning method: {method}. Choose one of {', '.join(HALFTONING_METHODS)}.")
+
+    if image_array.dtype == bool:
+        return lambda rows: image_array[rows]
+    elif method.upper() == "FLOYD-STEINBERG":
+        # The error diffusion of the whole image is the costly step of a new encryption of the same image
+        white_pixels = cached_halftone("gray", image_array, method,
+                                       lambda: np.asarray(Image.fromarray(image_array).convert('1')))
+        return lambda rows: white_pixels[rows]
+    else:
+        return lambda rows: ordered_dithering(image_array[rows], method, rows.start or 0)
@@ -0,0 +1,146 @@
+import os
+import numpy as np
+
+try:
+    import numba
+except ImportError:  # Numba is optional: without it, the NumPy kernels are used
+    numba = None
+
+KERNEL_BACKENDS = ["numba", "numpy"]
+
+# The backend used by default, chosen at import time (the VISUALCRYPTO_KERNEL_BACKEND variable can force "numpy")
+KERNEL_BACKEND = os.environ.get("VISUALCRYPTO_KERNEL_BACKEND") or ("numba" if numba is not None else "numpy")
+
+
+# Function to get the backends that can run the kernels in this environment
+def available_backends():
+    """
+    Returns:
+    list: The names of the available backends, the default one first.
+    """
+    return [backend for backend in KERNEL_BACKENDS if backend != "numba" or numba is not None]
+
+
+# An unknown backend (or "numba" without Numba) fails at import, not at the first dithering
+if KERNEL_BACKEND not in available_backends():
+    raise ValueError(f"Invalid VISUALCRYPTO_KERNEL_BACKEND: {KERNEL_BACKEND}. "
+                     f"Choose one of {', '.join(available_backends())}.")
+
+
+# Function to select the backend used by default
+def set_kernel_backend(backend):
+    """
+    Parameters:
+    backend (str): "numba" (if Numba is installed) or "numpy".
+    """
+    global KERNEL_BACKEND
+
+    if backend not in available_backends():
+        raise ValueError(f"Invalid kernel backend: {backend}. Choose one of {', '.join(available_backends())}.")
+    KERNEL_BACKEND = backend
+
+
+# Function to diffuse the error of Floyd-Steinberg dithering one anti-diagonal of pixels at a time, with NumPy
+def floyd_steinberg_numpy(work, num_rows, black):
+    """
+    Computes the same dithering as a scan of the rows from left to right, but on wavefronts: the pixel (y, x)
+    only depends on the pixels (y, x - 1), (y - 1, x - 1), (y - 1, x) and (y - 1, x + 1), so all the pixels with
+    the same x + 2 * y are processed together, one step for each value of x + 2 * y.
+
+    Within a step, the error pushed down by the pixel of row y is added before the error pushed right by the pixel
+    of row y + 1 (they can target the same pixel), as in the row by row scan, so the clamped sums are identical.
+    Each step costs a few NumPy calls, so the kernel is much faster than a Python loop over the pixels, but far
+    slower than the compiled one.
+
+    Parameters:
+    work (numpy.ndarray): The pixel values (np.int32), with shape (rows, width, channels). See floyd_steinberg.
+    num_rows (int): The number of rows to be dithered.
+    black (numpy.ndarray): The output (bool), with shape (num_rows, width, channels).
+    """
+    height, width, channels = work.shape
+
+    # Copy with a margin column on each side and a margin row below, which absorb the error diffused outside
+    # the block, so the steps do not need to check the borders
+    padded = np.zeros((num_rows + 1, width + 2, channels), dtype=np.int32)
+    padded[:height, 1:-1] = work
+
+    for step in range(width + 2 * (num_rows - 1)):
+        ys = np.arange(max(0, (step - width + 2) // 2), min(num_rows - 1, step // 2) + 1)
+        xs = step - 2 * ys + 1  # Columns of the padded copy
+
+        old_values = padded[ys, xs]
+        black_values = old_values <= 128  # Threshold for binary dithering
+        black[ys, xs - 1] = black_values
+        error = old_values - 255 * ~black_values
+
+        # Error diffused to the next row first (bottom-right, bottom and bottom-left neighbors), then to the right
+        for dy, dx, weight in ((1, 1, 1), (1, 0, 5), (1, -1, 3), (0, 1, 7)):
+            target = (ys + dy, xs + dx)
+            padded[target] = np.clip(padded[target] + error * weight // 16, 0, 255)
+
+    work[:] = padded[:height, 1:-1]
+
+
+if numba is not None:
+    # Function to diffuse the error of Floyd-Steinberg dithering pixel by pixel, compiled by Numba
+    @numba.njit("void(int32[:, :, ::1], int64, boolean[:, :, ::1])", cache=True, nogil=True)
+    def floyd_steinberg_numba(work, num_rows, black):
+        """
+        Scans the rows from left to right, as floyd_steinberg_row of vc_color_cmyk, on all the channels at once.
+        The signature is given, so the kernel is compiled when the module is imported (or loaded from the cache).
+
+        Parameters:
+        work (numpy.ndarray): The pixel values (np.int32), with shape (rows, width, channels). See floyd_steinberg.
+        num_rows (int): The number of rows to be dithered.
+        black (numpy.ndarray): The output (bool), with shape (num_rows, width, channels).
+        """
+        height, width, channels = work.shape
+
+        for y in range(num_rows):
+            has_next_row = y + 1 < height
+            for x in range(width):
+                for c in range(channels):
+                    old_value = work[y, x, c]
+                    new_value = 255 if old_value > 128 else 0
+                    black[y, x, c] = new_value == 0
+                    quant_error = old_value - new_value
+
+                    if x < width - 1:  # Right neighbor
+                        work[y, x + 1, c] = min(max(work[y, x + 1, c] + quant_error * 7 // 16, 0), 255)
+                        if has_next_row:  # Bottom-right neighbor
+                            work[y + 1, x + 1, c] = min(max(work[y + 1, x + 1, c] + quant_error * 1 // 16, 0), 255)
+
+                    if has_next_row:  # Bottom neighbor
+                        work[y + 1, x, c] = min(max(work[y + 1, x, c] + quant_error * 5 // 16, 0), 255)
+                        if x > 0:  # Bottom-left neighbor
+                            work[y + 1, x - 1, c] = min(max(work[y + 1, x - 1, c] + quant_error * 3 // 16, 0), 255)
+
+
+# Function to apply Floyd-Steinberg dithering to a block of rows
+def floyd_steinberg(work, num_rows, backend=None):
+    """
+    Dithers the first num_rows rows of a block, diffusing the quantization error in place. If the block has one
+    more row, it receives the error of the last dithered row: it is the first row of the next block, so the
+    image can be dithered block by block with the same result as in a single pass.
+
+    Parameters:
+    work (numpy.ndarray): The pixel values (0-255) as a C-contiguous np.int32 array with shape
+                          (num_rows or num_rows + 1, width, channels); the channels are dithered independently.
+                          The first row already includes the error diffused by the previous block. Modified in place.
+    num_rows (int): The number of rows to be dithered.
+    backend (str): "numba" or "numpy". If None, KERNEL_BACKEND is used.
+
+    Returns:
+    numpy.ndarray: A boolean array with shape (num_rows, width, channels), True where the dithered pixel is black.
+    """
+    backend = backend or KERNEL_BACKEND
+    black = np.empty((num_rows, *work.shape[1:]), dtype=bool)
+
+    if backend == "numba" and numba is not None:
+        floyd_steinberg_numba(work, num_rows, black)
+    elif backend == "numpy":
+        floyd_steinberg_numpy(work, num_rows, black)
+    else:
+        raise ValueError(f"Invalid kernel backend: {backend}. Choose one of {', '.join(available_backends())}.")
+
+    return black
@@ -0,0 +1,168 @@
+import json
+import secrets
+from PIL.PngImagePlugin import PngInfo
+
+METADATA_KEY = "visualcrypto"  # Key of the PNG text chunk (and of image.info) holding the metadata of a share
+METADATA_VERSION = 1  # Version of the metadata format
+TIFF_DESCRIPTION_TAG = 270  # ImageDescription, the TIFF tag holding the metadata of a share
+
+
+# Function to attach the metadata of an encryption to its shares
+def tag_shares(shares, algorithm, parameters):
+    """
+    Attaches to each share (in image.info) the algorithm, the parameters of the encryption and an identifier
+    shared by the shares of the same encryption. The metadata is written to the file by save_image
+    (scripts/common/encoding.py), and lets the decryption recognize the scheme and reject mismatched pairs.
+
+    Parameters:
+    shares (tuple): The shares (PIL images) produced by one encryption.
+    algorithm (str): The algorithm identifier (the name of the scheme module, e.g. "rg_grayscale_halftone").
+    parameters (dict): The parameters of the encryption, with the keys of get_requirements().
+
+    Returns:
+    tuple: The same shares.
+    """
+    pair_id = secrets.token_hex(8)
+
+    for i, share in enumerate(shares, start=1):
+        share.info[METADATA_KEY] = json.dumps({
+            "algorithm": algorithm,
+            "version": METADATA_VERSION,
+            "parameters": parameters,
+            "pair_id": pair_id,
+            "share": i,
+            "shares": len(shares)
+        })
+
+    return shares
+
+
+# Function to give a share the metadata of another one
+def copy_share_metadata(source, target):
+    """
+    Copies the metadata of a share (e.g. opened from a file) to a new version of the same share, so that it is
+    still recognized as the pair of the other shares of the encryption.
+
+    Parameters:
+    source (PIL.Image.Image): The share carrying the metadata.
+    target (PIL.Image.Image): The image receiving it.
+
+    Returns:
+    PIL.Image.Image: The target image.
+    """
+    metadata = read_share_metadata(source)
+    if metadata is not None:
+        target.info[METADATA_KEY] = json.dumps(metadata)
+    return target
+
+
+# Function to build the PIL.Image.save options that write the metadata of a share
+def metadata_save_options(image, image_format):
+    """
+    Returns the keyword arguments of PIL.Image.save that store the metadata of a share in the file: a text chunk
+    for PNG, the ImageDescription tag for TIFF. Both are written in the header, before the pixels.
+
+    Parameters:
+    image (PIL.Image.Image): The image to be saved.
+    image_format (str): The file format ("png" or "tiff").
+
+    Returns:
+    dict: The options to be passed to PIL.Image.save (empty if the image has no metadata).
+    """
+    metadata = image.info.get(METADATA_KEY)
+    if metadata is None:
+        return {}
+
+    if image_format == "png":
+        pnginfo = PngInfo()
+        pnginfo.add_text(METADATA_KEY, metadata)
+        return {"pnginfo": pnginfo}
+    elif image_format == "tiff":
+        return {"tiffinfo": {TIFF_DESCRIPTION_TAG: metadata}}
+    else:
+        return {}
+
+
+# Function to read the metadata of a share from the header of its file
+def read_share_metadata(image):
+    """
+    Reads the metadata written by tag_shares. Only the header is needed, so the image can be the result of a
+    lazy Image.open, whose pixels are not decoded.
+
+    Parameters:
+    image (PIL.Image.Image): The share.
+
+    Returns:
+    dict: The metadata ("algorithm", "version", "parameters", "pair_id", "share", "shares"), or None if the image
+          carries no (valid) metadata.
+    """
+    metadata = image.info.get(METADATA_KEY)
+    if metadata is None and hasattr(image, "tag_v2"):  # TIFF files
+        metadata = image.tag_v2.get(TIFF_DESCRIPTION_TAG)
+
+    try:
+        metadata = json.loads(metadata)
+    except (TypeError, ValueError):
+        return None
+
+    if not isinstance(metadata, dict) or "algorithm" not in metadata or "pair_id" not in metadata:
+        return None
+    return metadata
+
+
+# Function to check that the shares belong to the same encryption and to retrieve its metadata
+def resolve_share_pair(images, allow_missing=False):
+    """
+    Checks the metadata of the shares to be decrypted together, reading only their headers.
+
+    Parameters:
+    images (list): The shares (PIL images, possibly opened lazily).
+    allow_missing (bool): Whether shares without metadata are accepted along with the others (e.g. printed and
+                          scanned shares, which lost it). Only the shares carrying metadata are checked.
+
+    Returns:
+    dict: The metadata of the first share carrying it, or None if no share carries metadata (e.g. shares made
+          before the metadata was introduced, or saved by other programs).
+    """
+    metadata = [read_share_metadata(image) for image in images]
+    if all(m is None for m in metadata):
+        return None
+
+    first = next(m for m in metadata if m is not None)
+    for i, m in enumerate(metadata, start=1):
+        if m is None and allow_missing:
+            continue
+        if m is None:
+            raise ValueError(f"Share {i} carries no metadata, unlike the other shares: they do not belong together.")
+        if m.get("version", METADATA_VERSION) > METADATA_VERSION:
+            raise ValueError(f"Share {i} was made by a newer version (metadata version {m.get('version')}).")
+        if m["pair_id"] != first["pair_id"]:
+            raise ValueError(f"Share {i} belongs to a different encryption than share 1 "
+                             f"({m['algorithm']}, pair {m['pair_id']} instead of {first['pair_id']}).")
+
+    share_numbers = [m["share"] for m in metadata if m is not None]
+    if len(set(share_numbers)) != len(share_numbers):
+        raise ValueError(f"The same share was provided more than once (shares {share_numbers}).")
+
+    return first
+
+
+# Function to reject shares that were not made together by the given scheme
+def check_share_pair(images, algorithm, allow_missing=False):
+    """
+    Raises a ValueError if the metadata of the shares shows that they do not belong to the same encryption, or that
+    they were made by another scheme. Shares without metadata are accepted.
+
+    Parameters:
+    images (list): The shares (PIL images).
+    algorithm (str): The algorithm identifier of the scheme decrypting them.
+    allow_missing (bool): Whether some of the shares may carry no metadata (see resolve_share_pair).
+
+    Returns:
+    dict: The metadata of the first share carrying it, or None if the shares carry no metadata.
+    """
+    metadata = resolve_share_pair(images, allow_missing)
+    if metadata is not None and metadata["algorithm"] != algorithm:
+        raise ValueError(f"The shares were made with {metadata['algorithm']}, not {algorithm}.")
+
+    return metadata
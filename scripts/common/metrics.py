@@ -0,0 +1,279 @@
+import numpy as np
+from scripts.common.progress import row_strips
+from scripts.common.tiling import run_in_bands
+
+SSIM_WINDOW = 7  # Side of the square window of the SSIM, in pixels
+SSIM_STRIP_ROWS = 16  # Rows of windows processed at once (the arrays of a strip fit in the CPU caches)
+SSIM_K1 = 0.01  # Stabilizing constants of the SSIM (Wang et al., 2004)
+SSIM_K2 = 0.03
+
+
+# Function to bring a decrypted image to the resolution of the source image
+def match_resolution(result, shape):
+    """
+    Reduces a decrypted image with pixel expansion (e.g. the 2x2 blocks of the VC schemes) to the size of the
+    source image, averaging each block: this is how the result looks from a distance, where the quality is judged.
+
+    Parameters:
+    result (numpy.ndarray): The decrypted image, with shape (height, width) or (height, width, channels).
+    shape (tuple): The shape of the source image.
+
+    Returns:
+    numpy.ndarray: The decrypted image with the given shape (unchanged if it already has it, np.float64 otherwise).
+    """
+    result = np.asarray(result)
+    if result.shape == tuple(shape):
+        return result
+
+    factor_y, factor_x = result.shape[0] // shape[0], result.shape[1] // shape[1]
+    if result.shape[0] != factor_y * shape[0] or result.shape[1] != factor_x * shape[1] or factor_y < 1:
+        raise ValueError(f"The result ({result.shape}) is not an integer expansion of the source ({shape}).")
+
+    blocks = result.reshape(shape[0], factor_y, shape[1], factor_x, *result.shape[2:])
+    return blocks.mean(axis=(1, 3), dtype=np.float64)
+
+
+# Function to compute the peak signal-to-noise ratio
+def psnr(reference, result, data_range=255):
+    """
+    Parameters:
+    reference (numpy.ndarray): The source image.
+    result (numpy.ndarray): The decrypted image, with the same shape.
+    data_range (int): The maximum value of the pixels.
+
+    Returns:
+    float: The PSNR in dB (infinite for identical images).
+    """
+    error = np.subtract(reference, result, dtype=np.float64)
+    mse = np.vdot(error, error) / error.size  # Sum of squares without a temporary array
+    return float('inf') if mse == 0 else float(10 * np.log10(data_range ** 2 / mse))
+
+
+# Function to compute the sums over every window of an image
+def window_sums(image, window):
+    """
+    Computes the sum of the pixels of every (window x window) square of an image, separably: the sums over the
+    columns of the window, then over its rows, each as (window - 1) additions of shifted views of the whole array.
+    With integer pixels the sums are exact.
+
+    Parameters:
+    image (numpy.ndarray): A 2D array (np.int32 or np.float64), also the type of the sums.
+    window (int): The side of the windows.
+
+    Returns:
+    numpy.ndarray: The sums, with shape (height - window + 1, width - window + 1) (windows inside the image only).
+    """
+    height, width = image.shape[0] - window + 1, image.shape[1] - window + 1
+
+    column_sums = image[:height].copy()
+    for k in range(1, window):
+        column_sums += image[k:height + k]
+
+    sums = column_sums[:, :width].copy()
+    for k in range(1, window):
+        sums += column_sums[:, k:width + k]
+    return sums
+
+
+# Function to compute the sum of the SSIM of the windows of a strip of rows
+def ssim_strip_sum(reference, result, window, data_range):
+    """
+    Computes the SSIM of every window of two strips of rows from the window sums S of x, y, x*x, y*y and x*y.
+    Multiplying the numerator and the denominator of the SSIM by n^2 (n pixels per window) leaves only sums:
+
+        SSIM = (2 Sx Sy + C1 n^2) (2 (n Sxy - Sx Sy) + C2 n^2) / ((Sx^2 + Sy^2 + C1 n^2) (n (Sxx + Syy) - Sx^2 - Sy^2 + C2 n^2))
+
+    For 8-bit images every sum and product of sums fits exactly in np.int32, and only the final ratio is computed
+    in floating point (np.float32); other images are processed in np.float64.
+
+    Parameters:
+    reference (numpy.ndarray): The rows of the source image (2D), including the window - 1 rows below the strip.
+    result (numpy.ndarray): The same rows of the decrypted image.
+    window (int): The side of the windows.
+    data_range (int): The maximum value of the pixels.
+
+    Returns:
+    float: The sum of the SSIM of the windows whose top row is in the strip.
+    """
+    exact = reference.dtype == np.uint8 and result.dtype == np.uint8
+    dtype, float_dtype = (np.int32, np.float32) if exact else (np.float64, np.float64)
+    n = window * window
+    c1 = float_dtype((SSIM_K1 * data_range * n) ** 2)
+    c2 = float_dtype((SSIM_K2 * data_range * n) ** 2)
+
+    x, y = reference.astype(dtype), result.astype(dtype)
+    sum_x, sum_y = window_sums(x, window), window_sums(y, window)
+    sum_xy = window_sums(x * y, window)
+    sum_squares = window_sums(x * x, window)
+    sum_squares += window_sums(y * y, window)
+
+    product = sum_x * sum_y
+    squares = sum_x * sum_x + sum_y * sum_y
+
+    # The operations are done in place, to avoid temporary arrays
+    sum_xy *= n
+    sum_xy -= product
+    sum_xy *= 2
+    sum_squares *= n
+    sum_squares -= squares
+    product *= 2
+
+    numerator = product.astype(float_dtype)
+    numerator += c1
+    covariance_term = sum_xy.astype(float_dtype)
+    covariance_term += c2
+    numerator *= covariance_term
+
+    denominator = squares.astype(float_dtype)
+    denominator += c1
+    variance_term = sum_squares.astype(float_dtype)
+    variance_term += c2
+    denominator *= variance_term
+
+    numerator /= denominator
+    return float(numerator.sum(dtype=np.float64))
+
+
+# Function to compute the mean structural similarity of two grayscale images
+def ssim_2d(reference, result, window, data_range, num_bands=None):
+    """
+    Parameters:
+    reference (numpy.ndarray): The source image (2D).
+    result (numpy.ndarray): The decrypted image (2D), with the same shape.
+    window (int): The side of the windows.
+    data_range (int): The maximum value of the pixels.
+    num_bands (int): The number of bands processed in parallel. If None, the number of CPUs is used.
+
+    Returns:
+    float: The mean SSIM over the windows.
+    """
+    num_rows = reference.shape[0] - window + 1
+    strip_sums = []
+
+    # The rows of windows are processed in strips, so the intermediate arrays stay in the CPU caches
+    def kernel(rows):
+        for strip in row_strips(rows, SSIM_STRIP_ROWS):
+            source_rows = slice(strip.start, strip.stop + window - 1)
+            strip_sums.append(ssim_strip_sum(reference[source_rows], result[source_rows], window, data_range))
+
+    run_in_bands(kernel, num_rows, num_bands)
+    return sum(strip_sums) / (num_rows * (reference.shape[1] - window + 1))
+
+
+# Function to compute the structural similarity index
+def ssim(reference, result, window=SSIM_WINDOW, data_range=255, num_bands=None):
+    """
+    Computes the mean SSIM over all the (window x window) windows, with uniform weights. The local means, variances
+    and covariances come from window sums computed with shifted array additions, strip by strip and band by band
+    in parallel. Color images are compared channel by channel and the channel means are averaged.
+
+    Parameters:
+    reference (numpy.ndarray): The source image, with shape (height, width) or (height, width, channels).
+    result (numpy.ndarray): The decrypted image, with the same shape.
+    window (int): The side of the windows (reduced for images smaller than the window).
+    data_range (int): The maximum value of the pixels.
+    num_bands (int): The number of bands processed in parallel. If None, the number of CPUs is used.
+
+    Returns:
+    float: The mean SSIM (1 for identical images).
+    """
+    reference, result = np.asarray(reference), np.asarray(result)
+    window = min(window, reference.shape[0], reference.shape[1])
+
+    if reference.ndim == 2:
+        return ssim_2d(reference, result, window, data_range, num_bands)
+    return float(np.mean([ssim_2d(reference[..., c], result[..., c], window, data_range, num_bands)
+                          for c in range(reference.shape[2])]))
+
+
+# Function to compute the difference between the mean brightness of the white and of the black areas of the source
+def mean_difference(image, white, num_white):
+    """
+    Parameters:
+    image (numpy.ndarray): The image whose brightness is measured.
+    white (numpy.ndarray): The boolean mask of the white pixels of the source.
+    num_white (int): The number of white pixels.
+
+    Returns:
+    float: The mean brightness of the image on the white pixels minus its mean brightness on the black pixels.
+    """
+    image = np.asarray(image, dtype=np.float64)
+    total = image.sum()
+    white_sum = image[white].sum()
+    return white_sum / num_white - (total - white_sum) / (white.size - num_white)
+
+
+# Function to compute the contrast of a decrypted image
+def contrast(reference, result, threshold=128):
+    """
+    Computes the difference between the mean brightness of the result where the source is white and where it is
+    black, relative to the same difference in the source (alpha in the VC literature, for binary sources): 1 for a
+    perfect reconstruction, 0.5 for the stacking of 2x2 VC shares, 0 if the secret cannot be seen.
+
+    Parameters:
+    reference (numpy.ndarray): The source grayscale image.
+    result (numpy.ndarray): The decrypted image (brightness, 0 for black), with the same shape.
+    threshold (int): The value separating the black (below) and white pixels of the source.
+
+    Returns:
+    float: The contrast, or NaN if the source is entirely black or entirely white.
+    """
+    white = np.asarray(reference) >= threshold
+    num_white = np.count_nonzero(white)
+    if num_white == 0 or num_white == white.size:
+        return float('nan')
+
+    return float(mean_difference(result, white, num_white) / mean_difference(reference, white, num_white))
+
+
+# Function to compute the error rate of each bitplane
+def bitplane_error(reference, result):
+    """
+    Computes, for each of the 8 bitplanes, the fraction of pixels whose bit differs between the source and the
+    result. The bitplanes that are not encrypted by rg_grayscale_bitplane show an error around 0.5 (random bits).
+
+    Parameters:
+    reference (numpy.ndarray): The source image (np.uint8).
+    result (numpy.ndarray): The decrypted image (np.uint8), with the same shape.
+
+    Returns:
+    list: The error rate of each bitplane, from the most significant one to the least significant one.
+    """
+    diff = np.bitwise_xor(reference, np.asarray(result, dtype=np.uint8))
+    counts = np.bincount(diff.ravel(), minlength=256)  # Histogram of the differences, one pass over the pixels
+
+    # Number of differences whose bit b is set, for each bitplane, computed on the 256 bins only
+    values = np.arange(256, dtype=np.uint8)
+    bits = np.unpackbits(values[:, None], axis=1)  # Shape (256, 8), most significant bit first
+    return (counts @ bits / diff.size).tolist()
+
+
+# Function to compute all the quality metrics of a decryption
+def quality_report(reference, result):
+    """
+    Compares a decrypted image with its source.
+
+    Parameters:
+    reference (numpy.ndarray): The source image (np.uint8), with shape (height, width) or (height, width, channels).
+    result (numpy.ndarray): The decrypted image (bool or np.uint8), at the resolution of the source or at an
+                            integer multiple of it (pixel expansion).
+
+    Returns:
+    dict: "psnr" (dB), "ssim", "contrast" (grayscale sources only) and "bitplane_error" (grayscale sources with a
+          result at the same resolution only).
+    """
+    reference = np.asarray(reference)
+    result = np.asarray(result)
+    if result.dtype == bool:
+        result = result.astype(np.uint8) * 255  # Binary results: white is 255
+
+    same_resolution = result.shape == reference.shape
+    matched = match_resolution(result, reference.shape)
+
+    report = {"psnr": psnr(reference, matched), "ssim": ssim(reference, matched)}
+    if reference.ndim == 2:
+        report["contrast"] = contrast(reference, matched)
+        if same_resolution:
+            report["bitplane_error"] = bitplane_error(reference, result)
+
+    return report
@@ -0,0 +1,103 @@
+import math
+from PIL import Image
+from scripts.common.arrays import HIGH_BIT_DEPTH_MODES, convert_image
+
+PREVIEW_MAX_SIZE = 800  # Maximum width and height of the preview renditions, in pixels
+
+
+# Function to compute the integer downscaling factor that fits an image in the preview size
+def preview_factor(size, max_size=PREVIEW_MAX_SIZE):
+    """
+    Parameters:
+    size (tuple): The size of the image (width, height).
+    max_size (int): The maximum width and height of the preview.
+
+    Returns:
+    int: The smallest integer factor such that the downscaled image fits in max_size x max_size (1 if it already fits).
+    """
+    return max(1, math.ceil(max(size) / max_size))
+
+
+# Function to create a downscaled rendition of an image for on-page display
+def make_preview(image, max_size=PREVIEW_MAX_SIZE):
+    """
+    Creates a downscaled rendition of a share or of a decrypted image, to be displayed in the result pages
+    instead of the full resolution image.
+
+    Shares are binary or random noise, which resampling filters with negative lobes (e.g. Lanczos) turn into
+    ringing and aliasing patterns. The image is instead reduced by an integer factor with a box filter
+    (Image.reduce), so each preview pixel is the mean of a block of pixels: noise becomes a uniform gray and
+    halftoned areas keep their average tone, as they look from a distance.
+
+    Parameters:
+    image (PIL.Image.Image): The image to be previewed.
+    max_size (int): The maximum width and height of the preview.
+
+    Returns:
+    PIL.Image.Image: The preview, in mode L or RGB (so it can be saved as PNG and displayed by any browser).
+    """
+    if image.mode == '1' or image.mode == 'L':
+        image = image.convert('L')  # Binary pixels are averaged as gray levels
+    elif image.mode in HIGH_BIT_DEPTH_MODES:
+        image = convert_image(image, 'L')  # 16-bit images are scaled to 8 bits, not clipped
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')  # e.g. CMYK, which browsers do not display
+
+    factor = preview_factor(image.size, max_size)
+    return image.reduce(factor) if factor > 1 else image
+
+
+# Function to compute the size of the subsampled shares of a decryption preview
+def preview_size(size, max_size=PREVIEW_MAX_SIZE):
+    """
+    Parameters:
+    size (tuple): The size of the shares (width, height).
+    max_size (int): The maximum width and height of the preview.
+
+    Returns:
+    tuple: The size of the subsampled shares (the size of the shares if they already fit).
+    """
+    factor = preview_factor(size, max_size)
+    return math.ceil(size[0] / factor), math.ceil(size[1] / factor)
+
+
+# Function to subsample the shares of a decryption preview
+def subsample_shares(images, size):
+    """
+    Subsamples the shares at the same pixel positions (nearest neighbour, without averaging, so the pixels of the
+    two shares still correspond). The shares keep their mode, so that they can be subsampled before any conversion:
+    only the pixels of the preview are converted to the mode of the scheme.
+
+    Parameters:
+    images (list): The shares (PIL images, e.g. opened lazily from the uploaded files).
+    size (tuple): The size of the preview (see preview_size).
+
+    Returns:
+    list: The subsampled shares.
+    """
+    return [image if image.size == size else image.resize(size, Image.Resampling.NEAREST) for image in images]
+
+
+# Function to decrypt a subsampled version of the shares, as a quick visual check
+def preview_decrypt(decrypt, images, parameters, max_size=PREVIEW_MAX_SIZE, prepare=None):
+    """
+    Decrypts a preview of the shares: both shares are subsampled (see subsample_shares) and the scheme decrypts
+    only those pixels. For the pixel-wise schemes the preview is the exact decryption of the sampled pixels; for
+    the schemes with pixel expansion it is a noisier version of the result, still enough to check that the shares
+    match.
+
+    Parameters:
+    decrypt (callable): The decryption function of the scheme (get_config()["decrypt"]).
+    images (list): The shares (PIL images).
+    parameters (list): The additional parameters of the decryption, in the order of get_requirements().
+    max_size (int): The maximum width and height of the preview.
+    prepare (callable): Called with the subsampled shares, returns them converted for the scheme (e.g. the
+                        prepare_images of the web app). If None, the subsampled shares are decrypted as they are.
+
+    Returns:
+    PIL.Image.Image: The decrypted preview.
+    """
+    samples = subsample_shares(images, preview_size(images[0].size, max_size))
+    if prepare is not None:
+        samples = prepare(samples)
+    return decrypt(*samples, *parameters)
@@ -0,0 +1,56 @@
+import threading
+
+STRIP_ROWS = 64  # Number of rows processed between two progress reports (and cancellation checks)
+
+
+# Exception raised by the schemes when the cancellation token of an operation is set
+class OperationCancelled(Exception):
+    pass
+
+
+# Thread-safe reporter of the rows processed by an operation, also checking for cancellation
+class ProgressReporter:
+    def __init__(self, total_rows, progress=None, cancel=None):
+        """
+        Parameters:
+        total_rows (int): The number of rows of the image processed by the operation.
+        progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+                             It may be called from the threads of the shared pool, so it must be thread-safe.
+        cancel (threading.Event): The cancellation token. When it is set, the operation stops at the next strip
+                                  of rows by raising OperationCancelled.
+        """
+        self.total_rows = total_rows
+        self.done_rows = 0
+        self.progress = progress
+        self.cancel = cancel
+        self.lock = threading.Lock()
+
+    # Raises OperationCancelled if the cancellation token is set
+    def check(self):
+        if self.cancel is not None and self.cancel.is_set():
+            raise OperationCancelled("The operation was cancelled")
+
+    # Records a strip of processed rows, reports the progress and checks for cancellation
+    def advance(self, rows):
+        with self.lock:
+            self.done_rows += rows
+            done_rows = self.done_rows
+
+        if self.progress is not None:
+            self.progress(done_rows, self.total_rows)
+        self.check()
+
+
+# Function to split a range of rows into strips
+def row_strips(rows, strip_rows=STRIP_ROWS):
+    """
+    Splits a slice of rows into consecutive strips.
+
+    Parameters:
+    rows (slice): The rows to be split (with explicit start and stop).
+    strip_rows (int): The number of rows of each strip (the last one may be shorter).
+
+    Returns:
+    list: A list of slice objects covering the rows in order.
+    """
+    return [slice(start, min(start + strip_rows, rows.stop)) for start in range(rows.start, rows.stop, strip_rows)]
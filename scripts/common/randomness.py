@@ -0,0 +1,228 @@
+import os
+import secrets
+import threading
+import time
+import weakref
+from collections import deque
+
+POOL_CAPACITY = 64 * 2 ** 20  # Bytes kept ready by default (the high watermark): the grids of a few A4 pages
+POOL_CHUNK = 2 ** 20  # Bytes drawn from the source at a time by the refill thread
+
+POOLS = weakref.WeakSet()  # Every pool created, emptied in the child processes after a fork
+
+
+# Pool of cryptographic random bytes drawn in advance by a background thread
+class RandomPool:
+    def __init__(self, capacity=POOL_CAPACITY, low_watermark=None, chunk_size=POOL_CHUNK, source=secrets.token_bytes):
+        """
+        Keeps up to capacity bytes (the high watermark) drawn from the source, so that the encryptions take their
+        random bytes from memory instead of waiting for the source. The refill thread wakes up when the pool falls
+        under the low watermark, and fills it back to the high watermark, one chunk at a time.
+
+        Every byte is handed out once: take removes the bytes it returns from the pool. When the pool does not hold
+        enough bytes, the missing ones are drawn from the source directly (a miss), so take never blocks on the
+        refill thread and never returns fewer bytes than requested.
+
+        Parameters:
+        capacity (int): The number of bytes kept ready (the high watermark).
+        low_watermark (int): The number of bytes under which the pool is refilled. If None, half of the capacity.
+        chunk_size (int): The number of bytes drawn from the source at a time.
+        source (callable): A function returning the requested number of random bytes.
+                           The system's cryptographic random number generator is used by default.
+        """
+        if capacity <= 0 or chunk_size <= 0:
+            raise ValueError(f"Invalid random pool: capacity {capacity} and chunk size {chunk_size} must be positive.")
+        low_watermark = capacity // 2 if low_watermark is None else low_watermark
+        if not 0 <= low_watermark < capacity:
+            raise ValueError(f"Invalid low watermark: {low_watermark}. Choose 0 <= low watermark < {capacity}.")
+
+        self.capacity = capacity
+        self.low_watermark = low_watermark
+        self.chunk_size = chunk_size
+        self.source = source
+
+        self.chunks = deque()  # Random bytes ready to be handed out, in the order they were drawn
+        self.level = 0  # Total size of the chunks
+        self.condition = threading.Condition()
+        self.thread = None
+        self.stopping = False
+
+        # Counters reported by metrics()
+        self.requests = 0
+        self.misses = 0
+        self.bytes_from_pool = 0
+        self.bytes_from_source = 0
+        self.refills = 0
+        self.bytes_drawn = 0
+        self.refill_seconds = 0.0
+        POOLS.add(self)
+
+    # Starts the refill thread, which fills the pool in the background
+    def start(self):
+        with self.condition:
+            if self.thread is not None:
+                return self
+            self.stopping = False
+            self.thread = threading.Thread(target=self._refill, name="random-pool", daemon=True)
+            self.thread.start()
+        return self
+
+    # Stops the refill thread and discards the bytes of the pool
+    def stop(self):
+        with self.condition:
+            thread, self.thread = self.thread, None
+            self.stopping = True
+            self.condition.notify_all()
+        if thread is not None:
+            thread.join()
+
+        with self.condition:
+            self.chunks.clear()
+            self.level = 0
+
+    # Discards the bytes of the pool in a forked child process, so that they are never handed out by two processes
+    def _forget(self):
+        self.condition = threading.Condition()  # The lock may have been held by another thread of the parent
+        self.chunks.clear()
+        self.level = 0
+        self.thread = None  # The refill thread does not exist in the child, start() creates a new one
+
+    # Body of the refill thread
+    def _refill(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.stopping or self.level <= self.low_watermark)
+                if self.stopping:
+                    return
+                self.refills += 1
+
+            # Fill up to the high watermark, drawing outside the lock so that take is never delayed by the source
+            while True:
+                with self.condition:
+                    missing = self.capacity - self.level
+                    if self.stopping or missing <= 0:
+                        break
+
+                start = time.perf_counter()
+                chunk = self.source(min(self.chunk_size, missing))
+                elapsed = time.perf_counter() - start
+
+                with self.condition:
+                    self.chunks.append(chunk)
+                    self.level += len(chunk)
+                    self.bytes_drawn += len(chunk)
+                    self.refill_seconds += elapsed
+
+    # Returns random bytes never handed out before (usable as the random_source of the schemes)
+    def take(self, size):
+        """
+        Parameters:
+        size (int): The number of bytes.
+
+        Returns:
+        bytes: The random bytes, from the pool, completed by the source if the pool holds fewer.
+        """
+        parts = []
+        with self.condition:
+            self.requests += 1
+            needed = size
+            while needed > 0 and self.chunks:
+                chunk = self.chunks.popleft()
+                if len(chunk) > needed:  # The rest of the chunk stays in the pool
+                    self.chunks.appendleft(memoryview(chunk)[needed:])
+                    chunk = memoryview(chunk)[:needed]
+                parts.append(chunk)
+                needed -= len(chunk)
+
+            self.level -= size - needed
+            self.bytes_from_pool += size - needed
+            if needed > 0:
+                self.misses += 1
+                self.bytes_from_source += needed
+            if self.level <= self.low_watermark:
+                self.condition.notify_all()
+
+        if needed > 0:
+            parts.append(self.source(needed))
+        return b"".join(parts)
+
+    # Returns the state of the pool and its counters
+    def metrics(self):
+        with self.condition:
+            return {
+                "running": self.thread is not None,
+                "capacity_bytes": self.capacity,
+                "low_watermark_bytes": self.low_watermark,
+                "level_bytes": self.level,
+                "requests": self.requests,
+                "misses": self.misses,
+                "bytes_from_pool": self.bytes_from_pool,
+                "bytes_from_source": self.bytes_from_source,
+                "refills": self.refills,
+                "refill_mb_per_second": round(self.bytes_drawn / self.refill_seconds / 1e6, 1)
+                if self.refill_seconds else None
+            }
+
+
+RANDOM_POOL = None  # The pool of the process, started by start_random_pool
+
+
+# Function to start the random pool of the process
+def start_random_pool(capacity=POOL_CAPACITY, low_watermark=None):
+    """
+    Parameters:
+    capacity (int): The number of bytes kept ready (see RandomPool). If 0, no pool is started.
+    low_watermark (int): The number of bytes under which the pool is refilled. If None, half of the capacity.
+
+    Returns:
+    RandomPool: The pool of the process (the running one if it was already started), or None.
+    """
+    global RANDOM_POOL
+
+    if RANDOM_POOL is None and capacity > 0:
+        RANDOM_POOL = RandomPool(capacity, low_watermark).start()
+    return RANDOM_POOL
+
+
+# Function to stop the random pool of the process
+def stop_random_pool():
+    global RANDOM_POOL
+
+    pool, RANDOM_POOL = RANDOM_POOL, None
+    if pool is not None:
+        pool.stop()
+
+
+# Function to get the random pool of the process
+def get_random_pool():
+    """
+    Returns:
+    RandomPool: The pool started by start_random_pool, or None.
+    """
+    return RANDOM_POOL
+
+
+# Function to get the random source of the encryptions
+def random_source():
+    """
+    Returns:
+    callable: The take method of the pool of the process if it was started, otherwise secrets.token_bytes.
+    """
+    pool = RANDOM_POOL
+    return pool.take if pool is not None else secrets.token_bytes
+
+
+# Function run in a child process after a fork: the pools of the parent are not inherited
+def forget_pools_after_fork():
+    """
+    Empties every pool in the child process (the parent hands out the same bytes), and forgets the pool of the
+    process, so that the child uses the source directly until it starts its own pool (see start_random_pool).
+    """
+    global RANDOM_POOL
+
+    for pool in list(POOLS):
+        pool._forget()
+    RANDOM_POOL = None
+
+
+os.register_at_fork(after_in_child=forget_pools_after_fork)
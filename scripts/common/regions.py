@@ -0,0 +1,228 @@
+import numpy as np
+from PIL import Image
+from scripts.common.halftoning import BLUE_NOISE_SIZE
+from scripts.common.progress import ProgressReporter
+
+# Side of the tiles the regions of interest are rounded to. The tiles start on multiples of the ordered-dithering
+# masks, so the regions are dithered with the same thresholds as in the whole image
+REGION_TILE = BLUE_NOISE_SIZE
+
+# The "regions" parameter of the encryptions that support regions of interest (see get_requirements())
+REGIONS_REQUIREMENT = {
+    "type": "regions",
+    "default": "",
+    "label": "Regions to encrypt, as left,top,right,bottom rectangles separated by ';' (empty for the whole image):"
+}
+
+
+# Function to parse the regions of interest given as text
+def parse_regions(text):
+    """
+    Parameters:
+    text (str): The rectangles as "left,top,right,bottom", separated by ";" (e.g. "10,10,200,80; 0,500,640,560").
+                The right and bottom edges are excluded, as in PIL boxes.
+
+    Returns:
+    list: The rectangles as (left, top, right, bottom) tuples, or None if the text is empty (whole image).
+    """
+    if text is None or not text.strip():
+        return None
+
+    regions = []
+    for rectangle in text.split(';'):
+        if not rectangle.strip():
+            continue
+        try:
+            left, top, right, bottom = (int(value) for value in rectangle.split(','))
+        except ValueError:
+            raise ValueError(f"Invalid region: '{rectangle.strip()}'. Expected left,top,right,bottom.")
+        if right <= left or bottom <= top or left < 0 or top < 0:
+            raise ValueError(f"Invalid region: '{rectangle.strip()}'. "
+                             f"Expected 0 <= left < right and 0 <= top < bottom.")
+        regions.append((left, top, right, bottom))
+    return regions
+
+
+# Function to build the mask of the regions of interest of an image
+def region_mask(size, regions):
+    """
+    Parameters:
+    size (tuple): The (height, width) of the image.
+    regions: The regions of interest: None or an empty string for the whole image, a string (see parse_regions),
+             a list of (left, top, right, bottom) rectangles (clipped to the image), or a mask with the size of
+             the image (a boolean numpy array or a PIL image, non-zero inside the regions).
+
+    Returns:
+    numpy.ndarray: A boolean array with the given size, True inside the regions, or None for the whole image.
+    """
+    if isinstance(regions, str):
+        regions = parse_regions(regions)
+    if regions is None:
+        return None
+
+    if isinstance(regions, Image.Image):
+        regions = np.asarray(regions.convert('1'))
+    if isinstance(regions, np.ndarray):
+        if regions.shape[:2] != tuple(size):
+            raise ValueError(f"The mask of the regions has size {regions.shape[:2]}, but the image has size {size}.")
+        return regions.astype(bool, copy=False)
+
+    mask = np.zeros(size, dtype=bool)
+    for left, top, right, bottom in regions:
+        mask[top:bottom, left:right] = True
+    return mask
+
+
+# Function to translate the regions of interest to a crop of the image
+def crop_regions(regions, box):
+    """
+    Parameters:
+    regions: The regions of interest of the image (see region_mask).
+    box (tuple): The (left, top, right, bottom) box of the crop.
+
+    Returns:
+    The regions of the crop, in the same form (None for the whole crop; an empty list if no region is in it).
+    """
+    if isinstance(regions, str):
+        regions = parse_regions(regions)
+    if regions is None:
+        return None
+
+    left, top, right, bottom = box
+    if isinstance(regions, Image.Image):
+        return regions.crop(box)
+    if isinstance(regions, np.ndarray):
+        return regions[top:bottom, left:right]
+
+    return [(max(x0, left) - left, max(y0, top) - top, min(x1, right) - left, min(y1, bottom) - top)
+            for x0, y0, x1, y1 in regions if x0 < right and x1 > left and y0 < bottom and y1 > top]
+
+
+# Function to group the tiles containing the regions of interest into blocks
+def region_blocks(mask, tile=REGION_TILE):
+    """
+    Splits the image into tiles, keeps the tiles containing a pixel of the mask, and merges them into blocks:
+    the consecutive kept tiles of a row of tiles form a run, and the consecutive rows of tiles with the same
+    runs form a band (a rectangular region gives a single block).
+
+    Parameters:
+    mask (numpy.ndarray): The boolean mask of the regions of interest, with shape (height, width).
+    tile (int): The side of the tiles.
+
+    Returns:
+    list: The bands, as (rows, [columns, ...]) with a slice of rows and one slice of columns per block.
+    """
+    height, width = mask.shape
+    tiles_y, tiles_x = -(-height // tile), -(-width // tile)
+
+    padded = np.zeros((tiles_y * tile, tiles_x * tile), dtype=bool)
+    padded[:height, :width] = mask
+    kept = padded.reshape(tiles_y, tile, tiles_x, tile).any(axis=(1, 3))
+
+    bands = []
+    for y in range(tiles_y):
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], kept[y].view(np.int8), [0]))))
+        runs = [(int(start), int(stop)) for start, stop in zip(edges[0::2], edges[1::2])]
+        if not runs:
+            continue
+        if bands and bands[-1][1] == y and bands[-1][2] == runs:
+            bands[-1][1] = y + 1
+        else:
+            bands.append([y, y + 1, runs])
+
+    return [(slice(start * tile, min(stop * tile, height)),
+             [slice(x0 * tile, min(x1 * tile, width)) for x0, x1 in runs]) for start, stop, runs in bands]
+
+
+# Function to encrypt the regions of interest of an image, the rest being filled as a blank page
+def encrypt_regions(image_array, mask, encrypt_block, blank_shares, scale, blank_value, progress=None, cancel=None):
+    """
+    Encrypts only the blocks of tiles containing the regions of interest with the full scheme (halftoning and
+    encryption), and fills the rest of the shares with the shares of a blank page, which the schemes draw in
+    bulk without halftoning. The shares look the same everywhere (random subpixels), and the decrypted image
+    is blank outside the regions. The pixels of the blocks outside the mask are also blanked before encryption.
+
+    Parameters:
+    image_array (numpy.ndarray): The image, with shape (height, width) or (height, width, channels).
+    mask (numpy.ndarray): The boolean mask of the regions of interest, with shape (height, width).
+    encrypt_block (callable): Called as encrypt_block(block) with a block of the image, returns its two shares.
+    blank_shares (callable): Called without arguments, returns the two shares of a blank page of the same size.
+    scale (int): The pixel expansion of the scheme (the shares are scale times larger than the image).
+    blank_value: The value of a blank pixel of the image (e.g. 255 or True for white paper, 0 for no CMYK ink).
+    progress (callable): A function called as progress(done_rows, total_rows) after each band of blocks.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
+
+    Returns:
+    tuple: The two shares, as returned by blank_shares with the encrypted blocks pasted in.
+    """
+    height = image_array.shape[0]
+    reporter = ProgressReporter(height, progress, cancel)
+    reporter.check()
+
+    share1, share2 = blank_shares()
+
+    for rows, columns in region_blocks(mask):
+        for cols in columns:
+            block = image_array[rows, cols].copy()
+            block[~mask[rows, cols]] = blank_value
+
+            block_share1, block_share2 = encrypt_block(block)
+            share_rows = slice(rows.start * scale, rows.stop * scale)
+            share_cols = slice(cols.start * scale, cols.stop * scale)
+            share1[share_rows, share_cols] = block_share1
+            share2[share_rows, share_cols] = block_share2
+
+        reporter.advance(rows.stop - reporter.done_rows)
+
+    if reporter.done_rows < height:
+        reporter.advance(height - reporter.done_rows)
+    return share1, share2
+
+
+# Function to find the blocks of tiles where two versions of an image differ
+def changed_blocks(old_array, new_array, tile=REGION_TILE):
+    """
+    Parameters:
+    old_array (numpy.ndarray): The previous version of the image, with shape (height, width) or
+                               (height, width, channels).
+    new_array (numpy.ndarray): The new version of the image, with the same shape.
+    tile (int): The side of the tiles.
+
+    Returns:
+    list: The blocks containing the changed pixels (see region_blocks), as (rows, columns) pairs of slices.
+    """
+    if old_array.shape != new_array.shape:
+        raise ValueError(f"The two versions of the image have different shapes: {old_array.shape} and "
+                         f"{new_array.shape}.")
+
+    changed = old_array != new_array
+    if changed.ndim == 3:
+        changed = changed.any(axis=2)
+    return [(rows, cols) for rows, columns in region_blocks(changed, tile) for cols in columns]
+
+
+# Function to recompute the blocks of a share in place
+def update_blocks(blocks, update_block, height, progress=None, cancel=None):
+    """
+    Parameters:
+    blocks (list): The blocks to be recomputed, as (rows, columns) pairs of slices sorted by rows
+                   (see changed_blocks).
+    update_block (callable): Called as update_block(rows, columns) for each block, writes it into the share.
+    height (int): The number of rows of the image.
+    progress (callable): A function called as progress(done_rows, total_rows) after each band of blocks.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
+
+    Returns:
+    list: The recomputed blocks (the blocks given).
+    """
+    reporter = ProgressReporter(height, progress, cancel)
+    reporter.check()
+
+    for rows, cols in blocks:
+        update_block(rows, cols)
+        if rows.stop > reporter.done_rows:
+            reporter.advance(rows.stop - reporter.done_rows)
+
+    if reporter.done_rows < height:
+        reporter.advance(height - reporter.done_rows)
+    return blocks
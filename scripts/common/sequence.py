@@ -0,0 +1,200 @@
+import io
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageSequence, TiffImagePlugin
+
+from scripts.common.arrays import convert_image
+from scripts.common.encoding import get_encoder_profile, save_image
+from scripts.common.metadata import METADATA_KEY, TIFF_DESCRIPTION_TAG
+from scripts.common.tiling import default_num_bands
+
+# File extensions read from a directory of frames (e.g. frames extracted from a video with ffmpeg)
+FRAME_EXTENSIONS = (".png", ".bmp", ".tif", ".tiff", ".jpg", ".jpeg", ".gif", ".webp")
+
+
+# Function to copy a frame out of its file, keeping the share metadata of TIFF pages
+def detach_frame(frame):
+    """
+    Parameters:
+    frame (PIL.Image.Image): A frame of an open image file.
+
+    Returns:
+    PIL.Image.Image: A copy of the frame, independent of the file. The ImageDescription tag of TIFF pages (which
+                     holds the metadata of the shares) is kept in image.info, where read_share_metadata finds it.
+    """
+    image = frame.copy()
+    if hasattr(frame, "tag_v2") and TIFF_DESCRIPTION_TAG in frame.tag_v2:
+        image.info.setdefault(METADATA_KEY, frame.tag_v2[TIFF_DESCRIPTION_TAG])
+    return image
+
+
+# Function to iterate lazily over the frames of a sequence
+def iter_frames(source):
+    """
+    Yields the frames of a sequence one at a time, decoding each frame only when it is requested.
+
+    Parameters:
+    source (str): A multi-frame image (multi-page TIFF, animated GIF or APNG, ...) or a directory of
+                  still images, read in the order of their file names.
+
+    Returns:
+    generator: The frames (PIL images, independent of the file they were read from).
+    """
+    if os.path.isdir(source):
+        for filename in sorted(os.listdir(source)):
+            if filename.lower().endswith(FRAME_EXTENSIONS):
+                with Image.open(os.path.join(source, filename)) as image:
+                    yield detach_frame(image)
+    else:
+        with Image.open(source) as image:
+            for frame in ImageSequence.Iterator(image):  # The same image, seeked to each frame in turn
+                yield detach_frame(frame)
+
+
+# Function to pick the profile used to write multi-frame shares
+def sequence_encoder(encoders):
+    """
+    Returns the first TIFF profile among the encoder profiles of a scheme. Multi-page TIFF is lossless for every
+    mode (1-bit, 8-bit, RGB, CMYK) and can be written one frame at a time, unlike GIF (palette, lossy) or APNG
+    (all frames kept in memory until the file is written).
+
+    Parameters:
+    encoders (list): The encoder profiles of the scheme (get_config()["encoders"]).
+
+    Returns:
+    str: The name of the encoder profile.
+    """
+    for name in encoders:
+        if get_encoder_profile(name)["format"] == "tiff":
+            return name
+
+    raise ValueError(f"None of the encoder profiles {', '.join(encoders)} can write multi-frame images.")
+
+
+# Function executed by the worker threads: processes a frame and encodes its outputs as single-page TIFF files
+def process_frame(function, images, image_type, parameters, encoder):
+    """
+    Parameters:
+    function (callable): The encryption or decryption function of the scheme.
+    images (list): The input frame(s).
+    image_type (str): The PIL mode expected by the scheme.
+    parameters (list): The additional parameters of the operation, in the order of get_requirements().
+    encoder (str): The name of the TIFF encoder profile.
+
+    Returns:
+    list: The encoded outputs (bytes), one per output image.
+    """
+    result = function(*[convert_image(image, image_type) for image in images], *parameters)
+    outputs = result if isinstance(result, tuple) else (result,)
+
+    encoded = []
+    for output in outputs:
+        buffer = io.BytesIO()
+        save_image(output, buffer, encoder)
+        encoded.append(buffer.getvalue())
+    return encoded
+
+
+# Function to run an operation on every frame of one or more sequences, writing multi-page TIFF outputs
+def process_sequence(function, frame_iterators, output_path, image_type, parameters, encoder,
+                     num_workers=None, max_in_flight=None):
+    """
+    Pipelines the frames through three stages: decoding (in the calling thread, lazily), encryption or decryption
+    and encoding (in a pool of worker threads, several frames at a time), and writing (in the calling thread,
+    in order). At most max_in_flight frames are submitted and not yet written, so the memory used does not depend
+    on the length of the sequence.
+
+    Parameters:
+    function (callable): The encryption or decryption function of the scheme.
+    frame_iterators (list): One frame iterator per input of the operation (see iter_frames), read in lockstep.
+    output_path (callable): A function returning the path of the multi-page TIFF file of the i-th output (from 1).
+    image_type (str): The PIL mode expected by the scheme.
+    parameters (list): The additional parameters of the operation, in the order of get_requirements().
+    encoder (str): The name of the TIFF encoder profile.
+    num_workers (int): The number of worker threads. If None, the number of CPUs is used.
+    max_in_flight (int): The maximum number of frames being processed. If None, twice the number of workers.
+
+    Returns:
+    list: The paths of the outputs.
+    """
+    num_workers = num_workers or default_num_bands()
+    max_in_flight = max_in_flight or 2 * num_workers
+    pending = deque()
+    writers = []
+    output_paths = []
+
+    # Writes the outputs of the oldest frame, so the frames are written in order
+    def write_oldest():
+        outputs = pending.popleft().result()
+
+        # The writers are opened with the first frame, which gives the number of outputs
+        if not writers:
+            output_paths.extend(output_path(i) for i in range(1, len(outputs) + 1))
+            writers.extend(TiffImagePlugin.AppendingTiffWriter(path, new=True) for path in output_paths)
+
+        for writer, data in zip(writers, outputs):
+            writer.write(data)
+            writer.newFrame()
+
+    executor = ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix="frame")
+    try:
+        for frames in zip(*frame_iterators):
+            if len(pending) >= max_in_flight:
+                write_oldest()
+
+            pending.append(executor.submit(process_frame, function, frames, image_type, parameters, encoder))
+
+        while pending:
+            write_oldest()
+    finally:
+        executor.shutdown(cancel_futures=True)  # After an error, the frames not started yet are dropped
+        for writer in writers:
+            writer.close()
+
+    if not output_paths:
+        raise ValueError("The sequence contains no frames.")
+    return output_paths
+
+
+# Function to encrypt every frame of a sequence into multi-frame shares
+def encrypt_sequence(config, source, output_folder, parameters=(), num_workers=None, max_in_flight=None):
+    """
+    Encrypts a sequence of frames with a scheme, writing each share as a multi-page TIFF file whose page i
+    is the share of frame i.
+
+    Parameters:
+    config (dict): The configuration of the scheme (get_config()).
+    source (str): A multi-frame image or a directory of frames (see iter_frames).
+    output_folder (str): The folder where share1.tiff, share2.tiff, ... are written.
+    parameters (list): The additional parameters of the encryption, in the order of get_requirements().
+    num_workers (int): The number of frames encrypted in parallel. If None, the number of CPUs is used.
+    max_in_flight (int): The maximum number of frames being processed. If None, twice the number of workers.
+
+    Returns:
+    list: The paths of the shares.
+    """
+    return process_sequence(config["encrypt"], [iter_frames(source)],
+                            lambda i: os.path.join(output_folder, f"share{i}.tiff"), config["image_type"], parameters,
+                            sequence_encoder(config["encoders"]), num_workers, max_in_flight)
+
+
+# Function to decrypt multi-frame shares into a multi-frame image
+def decrypt_sequence(config, share_sources, output_path, parameters=(), num_workers=None, max_in_flight=None):
+    """
+    Decrypts multi-frame shares frame by frame, writing the result as a multi-page TIFF file.
+
+    Parameters:
+    config (dict): The configuration of the scheme (get_config()).
+    share_sources (list): The multi-frame shares (or directories of frames), one per share.
+    output_path (str): The path of the decrypted multi-page TIFF file.
+    parameters (list): The additional parameters of the decryption, in the order of get_requirements().
+    num_workers (int): The number of frames decrypted in parallel. If None, the number of CPUs is used.
+    max_in_flight (int): The maximum number of frames being processed. If None, twice the number of workers.
+
+    Returns:
+    str: The path of the decrypted image.
+    """
+    return process_sequence(config["decrypt"], [iter_frames(source) for source in share_sources],
+                            lambda i: output_path, config["image_type"], parameters,
+                            sequence_encoder(config["encoders"]), num_workers, max_in_flight)[0]
@@ -0,0 +1,96 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+from scripts.common.progress import ProgressReporter, row_strips
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+# Function to get the default number of bands, following the number of available CPUs
+def default_num_bands():
+    """
+    Returns the default number of horizontal bands an image is split into, equal to the number of CPUs.
+
+    Returns:
+    int: The default number of bands (at least 1).
+    """
+    return os.cpu_count() or 1
+
+
+# Function to get the thread pool shared by all the schemes
+def get_executor():
+    """
+    Returns the thread pool shared by all the schemes, creating it on first use.
+    NumPy releases the GIL inside its vectorized operations, so bands processed by different threads
+    run in parallel on different cores.
+
+    Returns:
+    concurrent.futures.ThreadPoolExecutor: The shared thread pool, with one worker per CPU.
+    """
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=default_num_bands(), thread_name_prefix="band")
+
+    return _executor
+
+
+# Function to split the rows of an image into contiguous horizontal bands
+def band_slices(height, num_bands=None):
+    """
+    Splits the rows of an image into contiguous horizontal bands of (almost) equal height.
+
+    Parameters:
+    height (int): The number of rows of the image.
+    num_bands (int): The number of bands. If None, the number of CPUs is used.
+                     It is reduced when the image has fewer rows than bands.
+
+    Returns:
+    list: A list of slice objects, one per band, covering all the rows in order.
+    """
+    if num_bands is None:
+        num_bands = default_num_bands()
+    num_bands = max(1, min(int(num_bands), height))
+
+    bounds = [height * i // num_bands for i in range(num_bands + 1)]
+    return [slice(start, stop) for start, stop in zip(bounds[:-1], bounds[1:])]
+
+
+# Function to run a kernel on each horizontal band of an image in parallel
+def run_in_bands(kernel, height, num_bands=None, progress=None, cancel=None):
+    """
+    Runs a kernel on each horizontal band of an image using the shared thread pool, and waits for all of them.
+    The kernel reads its band of the inputs and writes its band of the outputs, which are preallocated by the
+    caller and shared by all the bands. Since every band writes disjoint rows, no locking is needed, and the
+    result does not depend on the number of bands.
+
+    Parameters:
+    kernel (callable): A function called as kernel(rows), where rows is the slice of the band.
+    height (int): The number of rows of the image.
+    num_bands (int): The number of bands. If None, the number of CPUs is used.
+    progress (callable): If given, each band is processed in strips of rows, and progress(done_rows, height)
+                         is called after each strip (from the threads of the pool).
+    cancel (threading.Event): If given, each band is processed in strips of rows, and the operation stops
+                              with OperationCancelled at the first strip after the event is set.
+    """
+    slices = band_slices(height, num_bands)
+
+    if progress is not None or cancel is not None:
+        reporter = ProgressReporter(height, progress, cancel)
+        reporter.check()
+        band_kernel = kernel
+
+        def kernel(rows):
+            for strip in row_strips(rows):
+                band_kernel(strip)
+                reporter.advance(strip.stop - strip.start)
+
+    if len(slices) == 1:
+        kernel(slices[0])
+        return
+
+    futures = [get_executor().submit(kernel, rows) for rows in slices]
+    for future in futures:
+        future.result()  # Re-raise any exception raised by the kernel
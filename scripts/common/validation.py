@@ -0,0 +1,23 @@
+# Modes of binary shares: saved with 1 bit per pixel ("PNG 1-bit") or as 8-bit black and white images
+BINARY_SHARE_MODES = ["1", "L"]
+
+
+# Function to check that shares can be decrypted together, from their headers only
+def check_share_headers(images, share_modes=None):
+    """
+    Checks the size and the mode (hence the bit depth) of the shares before their pixels are decoded.
+    With a lazy Image.open only the headers have been read, so incompatible shares are rejected in
+    microseconds instead of failing (or silently producing garbage) after a full decode.
+
+    Parameters:
+    images (list): The shares (PIL images, possibly opened lazily).
+    share_modes (list): The PIL modes accepted for the shares of the scheme (get_config()["share_modes"]).
+                        If None, the modes are not checked (the scheme converts the images itself).
+    """
+    for i, image in enumerate(images, start=1):
+        if share_modes is not None and image.mode not in share_modes:
+            raise ValueError(f"Share {i} has mode {image.mode}, but the shares of this scheme are "
+                             f"{' or '.join(share_modes)} images.")
+        if image.size != images[0].size:
+            raise ValueError(f"The shares have different sizes: share 1 is {images[0].size[0]}x{images[0].size[1]}, "
+                             f"share {i} is {image.size[0]}x{image.size[1]}.")
@@ -1,6 +1,10 @@
-import numpy as np
 from PIL import Image
-from scripts.random_grid.rg_grayscale_additive_SS import create_random_grid, create_difference_grid
+import secrets
+from scripts.random_grid import rg_grayscale_additive_SS
+from scripts.common.arrays import image_to_array, array_to_image
+from scripts.common.encoding import NOISE_ENCODERS, save_image
+from scripts.common.metadata import tag_shares, check_share_pair
+from scripts.common.validation import check_share_headers
 
 
 # Returns a dictionary containing function mappings and metadata for the algorithm (used by the web interface).
@@ -9,9 +13,14 @@ def get_config():
         "name": "RG - Color (RGB) Additive Secret Sharing",
         "description": get_description(),
         "requirements": get_requirements(),
+        "capabilities": get_capabilities(),
         "encrypt": encrypt,
         "decrypt": decrypt,
+        "encrypt_array": encrypt_array,
+        "decrypt_array": decrypt_array,
         "extension": "png",
+        "encoders": NOISE_ENCODERS,
+        "share_modes": ["RGB"],
         "image_type": "RGB"
     }
 
@@ -30,6 +39,28 @@ def get_requirements():
     }
 
 
+# Defines how the encryption/decryption can be executed (used by the dispatcher of the web interface).
+def get_capabilities():
+    return {
+        "encryption": {
+            "pixel_expansion": 1,
+            "cross_row_state": False,
+            "bit_packed_io": False,
+            "dtype": "uint8",
+            "max_safe_pixels": 16_000_000,
+            "bands": True
+        },
+        "decryption": {
+            "pixel_expansion": 1,
+            "cross_row_state": False,
+            "bit_packed_io": False,
+            "dtype": "uint8",
+            "max_safe_pixels": 16_000_000,
+            "bands": True
+        }
+    }
+
+
 # Returns a dictionary containing the description and reference links for the algorithm.
 def get_description():
     return {
@@ -41,66 +72,102 @@ def get_description():
     }
 
 
+# Function to generate the two shares of an RGB image array (the additive scheme is applied to each channel)
+def encrypt_array(img_array, num_bands=None, random_source=secrets.token_bytes, progress=None, cancel=None):
+    """
+    Generates the two shares of an RGB image array using random grids and difference grids.
+
+    Parameters:
+    img_array (numpy.ndarray): The RGB image as a numpy array of np.uint8 values, with shape (height, width, 3).
+    num_bands (int): The number of bands processed in parallel. If None, the number of CPUs is used.
+    random_source (callable): A function returning the requested number of random bytes.
+                              The system's cryptographic random number generator is used by default.
+    progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
+
+    Returns:
+    tuple: A tuple containing the two shares (np.uint8 arrays with the same shape as img_array).
+    """
+    return rg_grayscale_additive_SS.encrypt_array(img_array, num_bands, random_source, progress, cancel)
+
+
 # Function to encrypt an image by generating two shares using random grids and difference grids
-def encrypt(image):
+def encrypt(image, num_bands=None, random_source=secrets.token_bytes, progress=None, cancel=None):
     """
     Encrypts an image by generating two shares using random grids and difference grids.
 
     Parameters:
     image (PIL.Image.Image): The input image (PIL Image object) to be encrypted.
+    num_bands (int): The number of bands processed in parallel. If None, the number of CPUs is used.
+    random_source (callable): A function returning the requested number of random bytes.
+                              The system's cryptographic random number generator is used by default.
+    progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
 
     Returns:
     tuple: A tuple containing two PIL.Image.Image objects (grid1_image and grid2_image),
            representing the encrypted shares of the original image.
     """
-    img_array = np.array(image).astype(int)  # Convert PIL Image to numpy array and convert to int type
+    grid1, grid2 = encrypt_array(image_to_array(image, 'RGB'), num_bands, random_source, progress, cancel)
+    return tag_shares((array_to_image(grid1, 'RGB'), array_to_image(grid2, 'RGB')), "rg_color_additive_SS", {})
 
-    # Create the first random grid for each channel and stack them
-    grid1 = np.stack([create_random_grid(img_array.shape[:2]) for _ in range(3)], axis=-1)
-    grid1_image = Image.fromarray(grid1)
 
-    # Create the second grid using modular subtraction
-    grid2 = create_difference_grid(img_array, grid1)
-    grid2_image = Image.fromarray(grid2.astype(np.uint8))
+# Function to add two RGB grids (modulo 256, on each channel)
+def decrypt_array(img1_array, img2_array, num_bands=None, progress=None, cancel=None):
+    """
+    Combines two RGB grids by adding the second grid to the first.
+
+    Parameters:
+    img1_array (numpy.ndarray): The first grid (np.uint8), with shape (height, width, 3).
+    img2_array (numpy.ndarray): The second grid (np.uint8), with the same shape as img1_array.
+    num_bands (int): The number of bands processed in parallel. If None, the number of CPUs is used.
+    progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
 
-    return grid1_image, grid2_image
+    Returns:
+    numpy.ndarray: The decrypted RGB image (np.uint8).
+    """
+    return rg_grayscale_additive_SS.decrypt_array(img1_array, img2_array, num_bands, progress, cancel)
 
 
 # Function to decrypt two images by overlaying the grids
-def decrypt(image1, image2):
+def decrypt(image1, image2, num_bands=None, progress=None, cancel=None):
     """
     Combines two grids by adding the second grid to the first.
 
     Parameters:
     image1 (PIL.Image.Image): The first image (PIL Image object), to be converted to numpy array and processed.
     image2 (PIL.Image.Image): The second image (PIL Image object), to be converted to numpy array and processed.
+    num_bands (int): The number of bands processed in parallel. If None, the number of CPUs is used.
+    progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
 
     Returns:
     PIL.Image.Image: The resulting image (PIL Image object) after adding the two grids.
     """
-    img1_array = np.array(image1.convert('RGB'))  # Convert PIL Image to numpy array (RGB)
-    img2_array = np.array(image2.convert('RGB'))  # Convert PIL Image to numpy array (RGB)
+    check_share_headers([image1, image2])
+    check_share_pair([image1, image2], "rg_color_additive_SS")
 
     # Combine the grids using modular addition
-    decrypted = img1_array + img2_array
-    return Image.fromarray(decrypted.astype(np.uint8))  # Convert numpy array back to PIL Image
+    decrypted = decrypt_array(image_to_array(image1, 'RGB'), image_to_array(image2, 'RGB'), num_bands, progress, cancel)
+    return array_to_image(decrypted, 'RGB')  # Wrap the numpy array into a PIL Image without copying it
 
 
 if __name__ == '__main__':
-    image_path = '../images/test.png'
-    output_path = '../images/output/'
+    image_path = 'scripts/images/test.png'
+    output_path = 'scripts/images/output/'
 
     # Load and convert the input image to RGB
     image = Image.open(image_path).convert('RGB')
 
-    # ENCRYPT: Generate shares
+    # ENCRYPT: Generate shares (save_image writes their metadata, read back by decrypt)
     share1, share2 = encrypt(image)
-    share1.save(output_path + "RG1.png")
-    share2.save(output_path + "RG2.png")
+    save_image(share1, output_path + "RG1.png", NOISE_ENCODERS[0])
+    save_image(share2, output_path + "RG2.png", NOISE_ENCODERS[0])
 
     # DECRYPT: Overlay the grids
     img_share1 = Image.open(output_path + "RG1.png")  # PIL Image (RGB)
     img_share2 = Image.open(output_path + "RG2.png")  # PIL Image (RGB)
 
     out = decrypt(img_share1, img_share2)
-    out.save(output_path + "decrypted_image.png")
+    save_image(out, output_path + "decrypted_image.png", "PNG")
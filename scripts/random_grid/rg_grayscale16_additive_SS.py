@@ -0,0 +1,177 @@
+from PIL import Image
+import secrets
+from scripts.random_grid import rg_grayscale_additive_SS
+from scripts.common.arrays import image_to_array, array_to_image
+from scripts.common.encoding import NOISE_ENCODERS, save_image
+from scripts.common.metadata import tag_shares, check_share_pair
+from scripts.common.validation import check_share_headers
+
+
+# Returns a dictionary containing function mappings and metadata for the algorithm (used by the web interface).
+def get_config():
+    return {
+        "name": "RG - Grayscale 16-bit Additive Secret Sharing",
+        "description": get_description(),
+        "requirements": get_requirements(),
+        "capabilities": get_capabilities(),
+        "encrypt": encrypt,
+        "decrypt": decrypt,
+        "encrypt_array": encrypt_array,
+        "decrypt_array": decrypt_array,
+        "extension": "png",
+        "encoders": NOISE_ENCODERS,
+        "share_modes": ["I;16"],
+        "image_type": "I;16"
+    }
+
+
+# Defines the expected inputs for encryption/decryption (number of images and additional parameters)
+def get_requirements():
+    return {
+        "encryption": {
+            "num_images": 1,
+            "parameters": {}  # No extra parameters needed
+        },
+        "decryption": {
+            "num_images": 2,
+            "parameters": {}  # No extra parameters needed
+        }
+    }
+
+
+# Defines how the encryption/decryption can be executed (used by the dispatcher of the web interface).
+def get_capabilities():
+    return {
+        "encryption": {
+            "pixel_expansion": 1,
+            "cross_row_state": False,
+            "bit_packed_io": False,
+            "dtype": "uint16",
+            "max_safe_pixels": 16_000_000,
+            "bands": True
+        },
+        "decryption": {
+            "pixel_expansion": 1,
+            "cross_row_state": False,
+            "bit_packed_io": False,
+            "dtype": "uint16",
+            "max_safe_pixels": 16_000_000,
+            "bands": True
+        }
+    }
+
+
+# Returns a dictionary containing the description and reference links for the algorithm.
+def get_description():
+    return {
+        "text": "This (2,2) Visual Secret Sharing Scheme extends the general additive secret sharing scheme to 16-bit grayscale images "
+                "(e.g. medical or scientific images): the shares are 16-bit images, added modulo 65536. "
+                "8-bit images are scaled to 16 bits before the encryption.",
+        "links": [
+            {"text": "Kafri & Keren",
+             "url": "https://doi.org/10.1364/ol.12.000377"}
+        ]
+    }
+
+
+# Function to generate the two shares of a 16-bit image array (the additive scheme modulo 65536)
+def encrypt_array(img_array, num_bands=None, random_source=secrets.token_bytes, progress=None, cancel=None):
+    """
+    Generates the two shares of a 16-bit grayscale image array using random grids and difference grids.
+
+    Parameters:
+    img_array (numpy.ndarray): The grayscale image as a numpy array of np.uint16 values.
+    num_bands (int): The number of bands processed in parallel. If None, the number of CPUs is used.
+    random_source (callable): A function returning the requested number of random bytes.
+                              The system's cryptographic random number generator is used by default.
+    progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
+
+    Returns:
+    tuple: A tuple containing the two shares (np.uint16 arrays with the same shape as img_array).
+    """
+    return rg_grayscale_additive_SS.encrypt_array(img_array, num_bands, random_source, progress, cancel)
+
+
+# Function to encrypt a 16-bit image by generating two shares using random grids and difference grids
+def encrypt(image, num_bands=None, random_source=secrets.token_bytes, progress=None, cancel=None):
+    """
+    Encrypts a 16-bit grayscale image by generating two shares using random grids and difference grids.
+
+    Parameters:
+    image (PIL.Image.Image): The input image (PIL Image object) to be encrypted. 8-bit images are scaled to 16 bits.
+    num_bands (int): The number of bands processed in parallel. If None, the number of CPUs is used.
+    random_source (callable): A function returning the requested number of random bytes.
+                              The system's cryptographic random number generator is used by default.
+    progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
+
+    Returns:
+    tuple: A tuple containing two PIL.Image.Image objects (mode "I;16"), representing the encrypted shares of the
+           original image.
+    """
+    grid1, grid2 = encrypt_array(image_to_array(image, 'I;16'), num_bands, random_source, progress, cancel)
+    return tag_shares((array_to_image(grid1, 'I;16'), array_to_image(grid2, 'I;16')),
+                      "rg_grayscale16_additive_SS", {})
+
+
+# Function to add two 16-bit grids (modulo 65536)
+def decrypt_array(img1_array, img2_array, num_bands=None, progress=None, cancel=None):
+    """
+    Combines two 16-bit grids by adding the second grid to the first.
+
+    Parameters:
+    img1_array (numpy.ndarray): The first grid (np.uint16).
+    img2_array (numpy.ndarray): The second grid (np.uint16), with the same shape as img1_array.
+    num_bands (int): The number of bands processed in parallel. If None, the number of CPUs is used.
+    progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
+
+    Returns:
+    numpy.ndarray: The decrypted grayscale image (np.uint16).
+    """
+    return rg_grayscale_additive_SS.decrypt_array(img1_array, img2_array, num_bands, progress, cancel)
+
+
+# Function to decrypt two 16-bit images by overlaying the grids
+def decrypt(image1, image2, num_bands=None, progress=None, cancel=None):
+    """
+    Combines two 16-bit grids by adding the second grid to the first.
+
+    Parameters:
+    image1 (PIL.Image.Image): The first share (mode "I;16").
+    image2 (PIL.Image.Image): The second share (mode "I;16").
+    num_bands (int): The number of bands processed in parallel. If None, the number of CPUs is used.
+    progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
+
+    Returns:
+    PIL.Image.Image: The resulting 16-bit image (mode "I;16") after adding the two grids.
+    """
+    check_share_headers([image1, image2])
+    check_share_pair([image1, image2], "rg_grayscale16_additive_SS")
+
+    # Combine the grids using modular addition
+    decrypted = decrypt_array(image_to_array(image1, 'I;16'), image_to_array(image2, 'I;16'), num_bands, progress,
+                              cancel)
+    return array_to_image(decrypted, 'I;16')  # Wrap the numpy array into a PIL Image without copying it
+
+
+if __name__ == '__main__':
+    image_path = 'scripts/images/test.png'
+    output_path = 'scripts/images/output/'
+
+    # Load the input image (a 16-bit PNG is kept at 16 bits, an 8-bit image is scaled to 16 bits)
+    image = Image.open(image_path)
+
+    # ENCRYPT: Generate shares (PNG keeps the 16 bits of the shares, and save_image their metadata)
+    share1, share2 = encrypt(image)
+    save_image(share1, output_path + "RG1_16.png", NOISE_ENCODERS[0])
+    save_image(share2, output_path + "RG2_16.png", NOISE_ENCODERS[0])
+
+    # DECRYPT: Overlay the grids
+    img_share1 = Image.open(output_path + "RG1_16.png")  # PIL Image (I;16)
+    img_share2 = Image.open(output_path + "RG2_16.png")  # PIL Image (I;16)
+
+    out = decrypt(img_share1, img_share2)
+    save_image(out, output_path + "decrypted_image_16.png", "PNG")
@@ -0,0 +1,197 @@
+from PIL import Image
+import secrets
+from scripts.random_grid import rg_grayscale_bitplane
+from scripts.common.arrays import image_to_array, array_to_image
+from scripts.common.encoding import NOISE_ENCODERS, save_image
+from scripts.common.metadata import tag_shares, check_share_pair
+from scripts.common.validation import check_share_headers
+
+
+# Returns a dictionary containing function mappings and metadata for the algorithm (used by the web interface).
+def get_config():
+    return {
+        "name": "RG - Grayscale 16-bit Bitplane",
+        "description": get_description(),
+        "requirements": get_requirements(),
+        "capabilities": get_capabilities(),
+        "encrypt": encrypt,
+        "decrypt": decrypt,
+        "encrypt_array": encrypt_array,
+        "decrypt_array": decrypt_array,
+        "extension": "png",
+        "encoders": NOISE_ENCODERS,
+        "share_modes": ["I;16"],
+        "image_type": "I;16"
+    }
+
+
+# Defines the expected inputs for encryption/decryption (number of images and additional parameters)
+def get_requirements():
+    return {
+        "encryption": {
+            "num_images": 1,
+            "parameters": {
+                "bitplanes": {
+                    "type": "number",
+                    "default": 3,
+                    "label": "Number of Most Significant Bit Planes to use (up to 16):"
+                }
+            }
+        },
+        "decryption": {
+            "num_images": 2,
+            "parameters": {}  # No extra parameters needed
+        }
+    }
+
+
+# Defines how the encryption/decryption can be executed (used by the dispatcher of the web interface).
+def get_capabilities():
+    return {
+        "encryption": {
+            "pixel_expansion": 1,
+            "cross_row_state": False,
+            "bit_packed_io": False,
+            "dtype": "uint16",
+            "max_safe_pixels": 16_000_000,
+            "bands": True
+        },
+        "decryption": {
+            "pixel_expansion": 1,
+            "cross_row_state": False,
+            "bit_packed_io": False,
+            "dtype": "uint16",
+            "max_safe_pixels": 16_000_000,
+            "bands": True
+        }
+    }
+
+
+# Returns a dictionary containing the description and reference links for the algorithm.
+def get_description():
+    return {
+        "text": "This (2,2) Visual Secret Sharing Scheme extends the bitplane scheme to 16-bit grayscale images "
+                "(e.g. medical or scientific images): up to 16 most significant bitplanes can be encrypted. "
+                "8-bit images are scaled to 16 bits before the encryption.",
+        "links": [
+            {"text": "Kafri & Keren",
+             "url": "https://doi.org/10.1364/ol.12.000377"},
+            {"text": "Vahidi et al.",
+             "url": "https://www.researchgate.net/profile/Javad-Vahidi/publication/279916654_A_new_approach_for_gray_scale_image_encryption_by_random_grids/links/559e19d208aeb45d1715ed4c/A-new-approach-for-gray-scale-image-encryption-by-random-grids.pdf"},
+        ]
+    }
+
+
+# Function to encrypt a 16-bit grayscale image array, returning the final RG1 and RG2 arrays
+def encrypt_array(image_array, number_of_MSBP, num_bands=None, random_source=secrets.token_bytes,
+                  progress=None, cancel=None):
+    """
+    Encrypts a 16-bit grayscale image array, returning the final combined RG1 and RG2 arrays.
+
+    Parameters:
+    image_array (numpy.ndarray): The grayscale image (np.uint16).
+    number_of_MSBP (int): The number of most significant bitplanes to be processed and encrypted (up to 16).
+    num_bands (int): The number of bands processed in parallel. If None, the number of CPUs is used.
+    random_source (callable): A function returning the requested number of random bytes.
+                              The system's cryptographic random number generator is used by default.
+    progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
+
+    Returns:
+    tuple: The final RG1 and RG2 shares (np.uint16 arrays with the same shape as image_array).
+    """
+    return rg_grayscale_bitplane.encrypt_array(image_array, number_of_MSBP, num_bands, random_source, progress,
+                                               cancel)
+
+
+# Function to encrypt a 16-bit grayscale image, returning the final RG1 and RG2 images
+def encrypt(image, number_of_MSBP, num_bands=None, random_source=secrets.token_bytes, progress=None, cancel=None):
+    """
+    Encrypts a 16-bit grayscale image by decomposing it into bitplanes, applying random grid-based encryption,
+    and returning the final combined RG1 and RG2 images.
+
+    Parameters:
+    image (PIL.Image.Image): The input grayscale image to be encrypted. 8-bit images are scaled to 16 bits.
+    number_of_MSBP (int): The number of most significant bitplanes to be processed and encrypted (up to 16).
+    num_bands (int): The number of bands processed in parallel. If None, the number of CPUs is used.
+    random_source (callable): A function returning the requested number of random bytes.
+                              The system's cryptographic random number generator is used by default.
+    progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
+
+    Returns:
+    PIL.Image.Image: The encrypted RG1 image (mode "I;16").
+    PIL.Image.Image: The encrypted RG2 image (mode "I;16").
+    """
+    RG1_final, RG2_final = encrypt_array(image_to_array(image, 'I;16'), number_of_MSBP, num_bands, random_source,
+                                         progress, cancel)
+    return tag_shares((array_to_image(RG1_final, 'I;16'), array_to_image(RG2_final, 'I;16')),
+                      "rg_grayscale16_bitplane", {"bitplanes": number_of_MSBP})
+
+
+# Function to decrypt the final RG1 and RG2 arrays of a 16-bit image
+def decrypt_array(rg1_final_array, rg2_final_array, number_of_MSBP=16, num_bands=None, progress=None, cancel=None):
+    """
+    Decrypts the final combined RG1 and RG2 arrays and reconstructs the original 16-bit grayscale image.
+
+    Parameters:
+    rg1_final_array (numpy.ndarray): The final RG1 share (np.uint16).
+    rg2_final_array (numpy.ndarray): The final RG2 share (np.uint16), with the same shape as rg1_final_array.
+    number_of_MSBP (int): The number of most significant bitplanes to be overlapped (up to 16).
+    num_bands (int): The number of bands processed in parallel. If None, the number of CPUs is used.
+    progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
+
+    Returns:
+    numpy.ndarray: The decrypted grayscale image (np.uint16).
+    """
+    return rg_grayscale_bitplane.decrypt_array(rg1_final_array, rg2_final_array, number_of_MSBP, num_bands, progress,
+                                               cancel)
+
+
+# Function to decrypt the final RG1 and RG2 images of a 16-bit image
+def decrypt(rg1_final, rg2_final, number_of_MSBP=None, num_bands=None, progress=None, cancel=None):
+    """
+    Decrypts the final combined RG1 and RG2 images and reconstructs the original 16-bit grayscale image.
+
+    Parameters:
+    rg1_final (PIL.Image.Image): The final RG1 image (mode "I;16").
+    rg2_final (PIL.Image.Image): The final RG2 image (mode "I;16").
+    number_of_MSBP (int): The number of most significant bitplanes to be overlapped. If None, the number used for the
+                          encryption is read from the metadata of the shares (all 16 bitplanes without metadata).
+    num_bands (int): The number of bands processed in parallel. If None, the number of CPUs is used.
+    progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
+
+    Returns:
+    PIL.Image.Image: The decrypted grayscale image (mode "I;16").
+    """
+    check_share_headers([rg1_final, rg2_final])
+    metadata = check_share_pair([rg1_final, rg2_final], "rg_grayscale16_bitplane")
+    if number_of_MSBP is None:  # Use the number of bitplanes of the encryption, if the shares carry it
+        number_of_MSBP = metadata["parameters"]["bitplanes"] if metadata else 16
+
+    decrypted_image = decrypt_array(image_to_array(rg1_final, 'I;16'), image_to_array(rg2_final, 'I;16'),
+                                    number_of_MSBP, num_bands, progress, cancel)
+    return array_to_image(decrypted_image, 'I;16')
+
+
+if __name__ == "__main__":
+    image_path = 'scripts/images/test.png'
+    output_path = 'scripts/images/output/'
+    number_of_MSBP = 6  # Number of most significant bitplanes to consider when enc/dec (16 for full bitplane)
+
+    # Load the image (a 16-bit PNG is kept at 16 bits, an 8-bit image is scaled to 16 bits)
+    image = Image.open(image_path)
+
+    # ENCRYPT: Generate shares (PNG keeps the 16 bits of the shares, and save_image their metadata)
+    share1, share2 = encrypt(image, number_of_MSBP)
+    save_image(share1, output_path + "RG1_final_16.png", NOISE_ENCODERS[0])
+    save_image(share2, output_path + "RG2_final_16.png", NOISE_ENCODERS[0])
+
+    # DECRYPT: Overlay the grids: RG1_final and RG2_final
+    img_share1 = Image.open(output_path + "RG1_final_16.png")
+    img_share2 = Image.open(output_path + "RG2_final_16.png")
+
+    decrypted_image = decrypt(img_share1, img_share2)
+    save_image(decrypted_image, output_path + "final_decrypted_image_16.png", "PNG")
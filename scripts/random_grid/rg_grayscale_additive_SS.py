@@ -1,6 +1,12 @@
 import numpy as np
 from PIL import Image
 import secrets
+from scripts.common.tiling import run_in_bands
+from scripts.common.arrays import image_to_array, array_to_image
+from scripts.common.encoding import NOISE_ENCODERS, save_image
+from scripts.common.metadata import tag_shares, check_share_pair, copy_share_metadata
+from scripts.common.regions import changed_blocks, update_blocks
+from scripts.common.validation import check_share_headers
 
 
 # Returns a dictionary containing function mappings and metadata for the algorithm (used by the web interface).
@@ -9,9 +15,14 @@ def get_config():
         "name": "RG - Grayscale Additive Secret Sharing",
         "description": get_description(),
         "requirements": get_requirements(),
+        "capabilities": get_capabilities(),
         "encrypt": encrypt,
         "decrypt": decrypt,
+        "encrypt_array": encrypt_array,
+        "decrypt_array": decrypt_array,
         "extension": "png",
+        "encoders": NOISE_ENCODERS,
+        "share_modes": ["L"],
         "image_type": "L"
     }
 
@@ -30,6 +41,28 @@ def get_requirements():
     }
 
 
+# Defines how the encryption/decryption can be executed (used by the dispatcher of the web interface).
+def get_capabilities():
+    return {
+        "encryption": {
+            "pixel_expansion": 1,
+            "cross_row_state": False,
+            "bit_packed_io": False,
+            "dtype": "uint8",
+            "max_safe_pixels": 16_000_000,
+            "bands": True
+        },
+        "decryption": {
+            "pixel_expansion": 1,
+            "cross_row_state": False,
+            "bit_packed_io": False,
+            "dtype": "uint8",
+            "max_safe_pixels": 16_000_000,
+            "bands": True
+        }
+    }
+
+
 # Returns a dictionary containing the description and reference links for the algorithm.
 def get_description():
     return {
@@ -42,17 +75,21 @@ def get_description():
 
 
 # Function to create a random grid with values in the range of 0-255
-def create_random_grid(size):
+def create_random_grid(size, random_source=secrets.token_bytes, dtype=np.uint8):
     """
-    Generates a random grid of the specified size, with values in the range 0 to 255.
+    Generates a random grid of the specified size, with values in the range 0 to 255 (or to the maximum of dtype).
 
     Parameters:
-    size (tuple): The dimensions of the grid (height, width).
+    size (tuple): The dimensions of the grid (e.g. (height, width) or (height, width, channels)).
+    random_source (callable): A function returning the requested number of random bytes.
+                              The system's cryptographic random number generator is used by default.
+    dtype (numpy.dtype): The unsigned integer type of the grid (np.uint8, or np.uint16 for 16-bit images).
 
     Returns:
-    numpy.ndarray: A grid filled with random integer values between 0 and 255.
+    numpy.ndarray: A grid filled with uniformly random integer values of the given type.
     """
-    return np.array([[secrets.randbelow(256) for _ in range(size[1])] for _ in range(size[0])], dtype=np.uint8)
+    num_values = int(np.prod(size))
+    return np.frombuffer(random_source(num_values * np.dtype(dtype).itemsize), dtype=dtype).reshape(size)
 
 
 # Function to create a difference grid by subtracting the image from the random grid
@@ -70,64 +107,180 @@ def create_difference_grid(image, grid):
     return image - grid
 
 
+# Function to add two grids
+def decrypt_array(img1_array, img2_array, num_bands=None, progress=None, cancel=None):
+    """
+    Adds two grids (modulo 256) one horizontal band at a time, using the shared thread pool.
+    It works on any number of channels (e.g. grayscale or RGB arrays), and on 16-bit grids (modulo 65536).
+
+    Parameters:
+    img1_array (numpy.ndarray): The first grid (np.uint8, or np.uint16).
+    img2_array (numpy.ndarray): The second grid, with the same shape and type as img1_array.
+    num_bands (int): The number of bands processed in parallel. If None, the number of CPUs is used.
+    progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
+
+    Returns:
+    numpy.ndarray: The sum of the two grids (with their type), wrapped modulo 256 (or 65536).
+    """
+    overlaid_image = np.empty_like(img1_array)
+
+    def kernel(rows):
+        np.add(img1_array[rows], img2_array[rows], out=overlaid_image[rows])  # Unsigned integers wrap (modulo 256)
+
+    run_in_bands(kernel, img1_array.shape[0], num_bands, progress, cancel)
+    return overlaid_image
+
+
 # Function to overlay two grids by performing subtraction
-def decrypt(image1, image2):
+def decrypt(image1, image2, num_bands=None, progress=None, cancel=None):
     """
     Combines two grids by adding the second grid to the first.
 
     Parameters:
     image1 (PIL.Image.Image): The first image (PIL Image object), to be converted to numpy array and processed.
     image2 (PIL.Image.Image): The second image (PIL Image object), to be converted to numpy array and processed.
+    num_bands (int): The number of bands processed in parallel. If None, the number of CPUs is used.
+    progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
 
     Returns:
     PIL.Image.Image: The resulting image (PIL Image object) after adding the two grids.
     """
-    img1_array = np.array(image1.convert('L'))  # Convert PIL Image to numpy array (grayscale)
-    img2_array = np.array(image2.convert('L'))  # Convert PIL Image to numpy array (grayscale)
+    check_share_headers([image1, image2])
+    check_share_pair([image1, image2], "rg_grayscale_additive_SS")
+
+    overlaid_image = decrypt_array(image_to_array(image1, 'L'), image_to_array(image2, 'L'), num_bands,
+                                   progress, cancel)
+    return array_to_image(overlaid_image, 'L')  # Wrap the numpy array into a PIL Image without copying it
+
+
+# Function to generate the two shares of an image array
+def encrypt_array(img_array, num_bands=None, random_source=secrets.token_bytes, progress=None, cancel=None):
+    """
+    Generates the two shares of an image array: a random grid, and the difference grid (image - grid, modulo 256)
+    computed one horizontal band at a time using the shared thread pool.
+    It works on any number of channels (e.g. grayscale or RGB arrays), and on 16-bit images (modulo 65536).
+
+    Parameters:
+    img_array (numpy.ndarray): The image as a numpy array of np.uint8 (or np.uint16) values.
+    num_bands (int): The number of bands processed in parallel. If None, the number of CPUs is used.
+    random_source (callable): A function returning the requested number of random bytes.
+                              The system's cryptographic random number generator is used by default.
+    progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
+
+    Returns:
+    tuple: A tuple containing the two shares (arrays with the same shape and type as img_array).
+    """
+    # The random grid is drawn at once, so the result does not depend on the number of bands
+    grid1 = create_random_grid(img_array.shape, random_source, img_array.dtype)
+    grid2 = np.empty_like(grid1)
+
+    def kernel(rows):
+        np.subtract(img_array[rows], grid1[rows], out=grid2[rows])  # Unsigned integers wrap (modulo 256) below 0
 
-    overlaid_image = img1_array + img2_array
-    return Image.fromarray(overlaid_image.astype(np.uint8))  # Convert numpy array back to PIL Image
+    run_in_bands(kernel, img_array.shape[0], num_bands, progress, cancel)
+    return grid1, grid2
 
 
-def encrypt(image):
+def encrypt(image, num_bands=None, random_source=secrets.token_bytes, progress=None, cancel=None):
     """
     Encrypts an image by generating two shares using random grids and difference grids.
 
     Parameters:
     image (PIL.Image.Image): The input image (PIL Image object) to be encrypted.
+    num_bands (int): The number of bands processed in parallel. If None, the number of CPUs is used.
+    random_source (callable): A function returning the requested number of random bytes.
+                              The system's cryptographic random number generator is used by default.
+    progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
 
     Returns:
     tuple: A tuple containing two PIL.Image.Image objects (grid1_image and grid2_image),
            representing the encrypted shares of the original image.
     """
-    img_array = np.array(image).astype(int)  # Convert PIL Image to numpy array and convert to int type
+    grid1, grid2 = encrypt_array(image_to_array(image, 'L'), num_bands, random_source, progress, cancel)
+    return tag_shares((array_to_image(grid1, 'L'), array_to_image(grid2, 'L')), "rg_grayscale_additive_SS", {})
+
+
+# Function to update the difference grid in place after a change of the image
+def update_array(grid1, grid2, *, old=None, new, progress=None, cancel=None):
+    """
+    Re-encrypts a new version of an image with the random grid of its previous encryption: the difference grid is
+    a pixel-local function of the image and of the random grid, so only the tiles where the image changed are
+    recomputed, and the cost is proportional to the changed area.
+
+    The two versions of the difference grid reveal the difference between the two versions of the image to anyone
+    holding both of them: send the new version only to the holder of the previous one.
 
-    # Create the first random grid and convert it to PIL Image
-    grid1 = create_random_grid(img_array.shape)
-    grid1_image = Image.fromarray(grid1)
+    Parameters:
+    grid1 (numpy.ndarray): The random grid (np.uint8). Not modified.
+    grid2 (numpy.ndarray): The difference grid (np.uint8), with the same shape, updated in place. It can be a
+                           memory map (e.g. np.load(path, mmap_mode="r+")), so that only the changed pages of the
+                           file are written.
+    old (numpy.ndarray): The image encrypted by the grids (keyword-only). If None, it is recovered from the grids.
+    new (numpy.ndarray): The new version of the image (np.uint8), with the same shape (keyword-only).
+    progress (callable): A function called as progress(done_rows, total_rows) after each band of tiles.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
 
-    # Create the second random grid and convert it to PIL Image
-    grid2 = create_difference_grid(img_array, grid1)
-    grid2_image = Image.fromarray(grid2.astype(np.uint8))  # np.uint8 causes wrapping (modulo 256) for negative values
+    Returns:
+    list: The updated blocks of the difference grid, as (rows, columns) pairs of slices.
+    """
+    if grid1.shape != grid2.shape or grid1.shape != new.shape:
+        raise ValueError(f"The grids ({grid1.shape} and {grid2.shape}) and the new image ({new.shape}) "
+                         f"have different shapes.")
+
+    if old is None:
+        old = np.add(grid1, grid2)  # np.uint8 wraps (modulo 256), as in decrypt_array
+
+    def update_block(rows, cols):
+        np.subtract(new[rows, cols], grid1[rows, cols], out=grid2[rows, cols])
+
+    return update_blocks(changed_blocks(old, new), update_block, grid1.shape[0], progress, cancel)
+
+
+# Function to update the difference grid after a change of the image
+def update(image1, image2, *, old=None, new, progress=None, cancel=None):
+    """
+    Encrypts a new version of an image with the random grid of its previous encryption, recomputing only the
+    changed tiles of the difference grid (see update_array).
+
+    Parameters:
+    image1 (PIL.Image.Image): The random grid of the previous encryption (share 1).
+    image2 (PIL.Image.Image): The difference grid of the previous encryption (share 2, not modified).
+    old (PIL.Image.Image): The image encrypted by the shares (keyword-only). If None, it is recovered from the shares.
+    new (PIL.Image.Image): The new version of the image, with the size of the shares (keyword-only).
+    progress (callable): A function called as progress(done_rows, total_rows) after each band of tiles.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
+
+    Returns:
+    PIL.Image.Image: The new difference grid, with the metadata of the previous one.
+    """
+    check_share_headers([image1, image2])
+    check_share_pair([image1, image2], "rg_grayscale_additive_SS")
 
-    return grid1_image, grid2_image
+    grid2 = np.array(image_to_array(image2, 'L'))  # Writable copy of the previous difference grid
+    update_array(image_to_array(image1, 'L'), grid2, old=None if old is None else image_to_array(old, 'L'),
+                 new=image_to_array(new, 'L'), progress=progress, cancel=cancel)
+    return copy_share_metadata(image2, array_to_image(grid2, 'L'))
 
 
 if __name__ == '__main__':
-    image_path = '../images/test.png'
-    output_path = '../images/output/'
+    image_path = 'scripts/images/test.png'
+    output_path = 'scripts/images/output/'
 
     # Load and convert the input image to grayscale
     image = Image.open(image_path).convert('L')  # PIL Image (grayscale)
 
-    # ENCRYPT: Generate shares
+    # ENCRYPT: Generate shares (save_image writes their metadata, read back by decrypt)
     share1, share2 = encrypt(image)
-    share1.save(output_path + "RG1.png")
-    share2.save(output_path + "RG2.png")
+    save_image(share1, output_path + "RG1.png", NOISE_ENCODERS[0])
+    save_image(share2, output_path + "RG2.png", NOISE_ENCODERS[0])
 
     # DECRYPT: Overlay the grids
     img_share1 = Image.open(output_path + "RG1.png")  # PIL Image (grayscale)
     img_share2 = Image.open(output_path + "RG2.png")  # PIL Image (grayscale)
 
     out = decrypt(img_share1, img_share2)
-    out.save(output_path + "decrypted_image.png")
+    save_image(out, output_path + "decrypted_image.png", "PNG")
@@ -1,6 +1,13 @@
 import numpy as np
 from PIL import Image
+import secrets
 from scripts.random_grid.rg_grayscale_halftone import create_first_random_grid, create_second_random_grid
+from scripts.random_grid.rg_grayscale_additive_SS import create_random_grid
+from scripts.common.tiling import run_in_bands
+from scripts.common.arrays import image_to_array, array_to_image
+from scripts.common.encoding import NOISE_ENCODERS, save_image
+from scripts.common.metadata import tag_shares, check_share_pair
+from scripts.common.validation import check_share_headers
 
 
 # Returns a dictionary containing function mappings and metadata for the algorithm (used by the web interface).
@@ -9,9 +16,14 @@ def get_config():
         "name": "RG - Grayscale Bitplane",
         "description": get_description(),
         "requirements": get_requirements(),
+        "capabilities": get_capabilities(),
         "encrypt": encrypt,
         "decrypt": decrypt,
+        "encrypt_array": encrypt_array,
+        "decrypt_array": decrypt_array,
         "extension": "png",
+        "encoders": NOISE_ENCODERS,
+        "share_modes": ["L"],
         "image_type": "L"
     }
 
@@ -36,6 +48,28 @@ def get_requirements():
     }
 
 
+# Defines how the encryption/decryption can be executed (used by the dispatcher of the web interface).
+def get_capabilities():
+    return {
+        "encryption": {
+            "pixel_expansion": 1,
+            "cross_row_state": False,
+            "bit_packed_io": False,
+            "dtype": "uint8",
+            "max_safe_pixels": 16_000_000,
+            "bands": True
+        },
+        "decryption": {
+            "pixel_expansion": 1,
+            "cross_row_state": False,
+            "bit_packed_io": False,
+            "dtype": "uint8",
+            "max_safe_pixels": 16_000_000,
+            "bands": True
+        }
+    }
+
+
 # Returns a dictionary containing the description and reference links for the algorithm.
 def get_description():
     return {
@@ -132,8 +166,60 @@ def generate_final_random_grids(bit_planes, number_of_MSBP, output_path='./'):
     return RG1_final, RG2_final
 
 
+# Function to build the mask selecting the most significant bitplanes of a byte (or of a 16-bit value)
+def msb_mask(number_of_MSBP, dtype=np.uint8):
+    """
+    Builds the bit mask that keeps only the most significant bitplanes of an 8-bit (or 16-bit) value.
+
+    Parameters:
+    number_of_MSBP (int): The number of most significant bitplanes to keep (0 to 8, or 0 to 16 for np.uint16).
+    dtype (numpy.dtype): The unsigned integer type of the pixels.
+
+    Returns:
+    numpy.uint8: The mask (e.g. 0b11100000 for 3 bitplanes), of the given type (numpy.uint16 for 16-bit values).
+    """
+    bits = np.iinfo(dtype).bits
+    number_of_MSBP = min(max(int(number_of_MSBP), 0), bits)
+    full = (1 << bits) - 1
+    return np.dtype(dtype).type((full << (bits - number_of_MSBP)) & full)
+
+
+# Function to decrypt the final RG1_final and RG2_final arrays and reconstruct the original bitplanes
+def decrypt_array(rg1_final_array, rg2_final_array, number_of_MSBP=8, num_bands=None, progress=None, cancel=None):
+    """
+    Decrypts the final combined RG1_final and RG2_final arrays and reconstructs the original grayscale image.
+
+    All the bitplanes are processed at once: the XOR of the two bytes decrypts every bitplane in a single
+    operation, and the inversion restricted to the most significant bitplanes gives the reconstructed image.
+
+    Parameters:
+    rg1_final_array (numpy.ndarray): The final RG1 share (np.uint8, or np.uint16 for 16-bit images).
+    rg2_final_array (numpy.ndarray): The final RG2 share, with the same shape and type as rg1_final_array.
+    number_of_MSBP (int): The number of most significant bitplanes to be overlapped.
+    num_bands (int): The number of bands processed in parallel. If None, the number of CPUs is used.
+    progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
+
+    Returns:
+    numpy.ndarray: The decrypted grayscale image (with the type of the shares).
+    """
+    decrypted_image = np.empty_like(rg1_final_array)
+    mask = msb_mask(number_of_MSBP, rg1_final_array.dtype)
+
+    def kernel(rows):
+        band = decrypted_image[rows]
+
+        # XOR decrypts every bitplane, then each bitplane is inverted to get black and white
+        np.bitwise_xor(rg1_final_array[rows], rg2_final_array[rows], out=band)
+        np.invert(band, out=band)
+        np.bitwise_and(band, mask, out=band)  # Keep the most significant bitplanes
+
+    run_in_bands(kernel, rg1_final_array.shape[0], num_bands, progress, cancel)
+    return decrypted_image
+
+
 # Function to decrypt the final RG1_final and RG2_final images and reconstruct the original bitplanes
-def decrypt(rg1_final, rg2_final, number_of_MSBP=8):
+def decrypt(rg1_final, rg2_final, number_of_MSBP=None, num_bands=None, progress=None, cancel=None):
     """
     Decrypts the final combined RG1_final and RG2_final images to recover the original bitplanes.
     Then, it reconstructs the original grayscale image by combining the decrypted bitplanes.
@@ -141,43 +227,72 @@ def decrypt(rg1_final, rg2_final, number_of_MSBP=8):
     Parameters:
     rg1_final (PIL.Image.Image): The final RG1 image (after encryption) as a PIL Image.
     rg2_final (PIL.Image.Image): The final RG2 image (after encryption) as a PIL Image.
-    number_of_MSBP (int): The number of most significant bitplanes to be overlapped.
+    number_of_MSBP (int): The number of most significant bitplanes to be overlapped. If None, the number used for the
+                          encryption is read from the metadata of the shares (all 8 bitplanes without metadata).
+    num_bands (int): The number of bands processed in parallel. If None, the number of CPUs is used.
+    progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
 
     Returns:
     PIL.Image.Image: The decrypted grayscale image, reconstructed from the bitplanes.
                      The image is returned as a PIL Image object, ready for saving or display.
     """
-    # Convert the PIL Image inputs to numpy arrays
-    rg1_final_array = np.array(rg1_final)
-    rg2_final_array = np.array(rg2_final)
+    check_share_headers([rg1_final, rg2_final])
+    metadata = check_share_pair([rg1_final, rg2_final], "rg_grayscale_bitplane")
+    if number_of_MSBP is None:  # Use the number of bitplanes of the encryption, if the shares carry it
+        number_of_MSBP = metadata["parameters"]["bitplanes"] if metadata else 8
+
+    decrypted_image = decrypt_array(image_to_array(rg1_final, 'L'), image_to_array(rg2_final, 'L'), number_of_MSBP,
+                                    num_bands, progress, cancel)
+    return array_to_image(decrypted_image, 'L')
+
+
+def encrypt_array(image_array, number_of_MSBP, num_bands=None, random_source=secrets.token_bytes,
+                  progress=None, cancel=None):
+    """
+    Encrypts a grayscale image array, returning the final combined RG1 and RG2 arrays.
 
-    # Initialize an array to hold the final reconstructed grayscale image
-    decrypted_image = np.zeros_like(rg1_final_array, dtype=np.uint8)
+    All the bitplanes are processed at once: a random byte holds the random grids of all the bitplanes, and
+    the XOR with the (inverted) image applies the Kafri and Keren equation to every bitplane in a single
+    operation. The result is the same as generate_final_random_grids applied to the bitplanes of the image
+    inverted bitwise, so with all the bitplanes the decrypted image is exactly the source.
 
-    # List to store the decrypted bitplanes
-    decrypted_bitplanes = []
+    Parameters:
+    image_array (numpy.ndarray): The grayscale image (np.uint8, or np.uint16 for 16-bit images).
+    number_of_MSBP (int): The number of most significant bitplanes to be processed and encrypted.
+    num_bands (int): The number of bands processed in parallel. If None, the number of CPUs is used.
+    random_source (callable): A function returning the requested number of random bytes.
+                              The system's cryptographic random number generator is used by default.
+    progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
 
-    # Loop over each of the most significant bitplanes
-    for i in range(number_of_MSBP):
-        # Extract the relevant bits for the i-th bitplane from RG1_final and RG2_final
-        bitplane_rg1 = (rg1_final_array >> (7 - i)) & 1  # Extract the i-th bit from RG1_final
-        bitplane_rg2 = (rg2_final_array >> (7 - i)) & 1  # Extract the i-th bit from RG2_final
+    Returns:
+    tuple: The final RG1 and RG2 shares (arrays with the same shape and type as image_array).
+    """
+    mask = msb_mask(number_of_MSBP, image_array.dtype)
 
-        # Reconstruct the original bitplane by performing XOR operation on the extracted bits
-        overlaid_image = np.bitwise_xor(bitplane_rg1, bitplane_rg2)
-        overlaid_image = 1 - overlaid_image  # Invert the image to get black and white
+    # One random value per pixel, drawn at once so the result does not depend on the number of bands
+    random_bytes = create_random_grid(image_array.shape, random_source, image_array.dtype)
+    RG1_final = np.empty_like(image_array)
+    RG2_final = np.empty_like(image_array)
 
-        # Append the decrypted bitplane to the list
-        decrypted_bitplanes.append(overlaid_image)
+    def kernel(rows):
+        # Random grids of the most significant bitplanes (the other bitplanes are left at 0)
+        np.bitwise_and(random_bytes[rows], mask, out=RG1_final[rows])
 
-        # Shift each decrypted bitplane to its correct position and add it to the final image
-        decrypted_image += decrypted_bitplanes[i] * (1 << (7 - i))  # Shift and combine
+        # Bitplanes of the inverted image (1 - bit on every bitplane), restricted to the most significant ones.
+        # The inversion is bitwise: the arithmetic 1 - pixel is off by 2 and shifted every decrypted pixel
+        np.invert(image_array[rows], out=RG2_final[rows])
+        np.bitwise_and(RG2_final[rows], mask, out=RG2_final[rows])
 
-    # Return the final decrypted grayscale image
-    return Image.fromarray(decrypted_image)
+        # Kafri and Keren equation on every bitplane: the random bit is flipped where the image bit is 1
+        np.bitwise_xor(RG2_final[rows], RG1_final[rows], out=RG2_final[rows])
 
+    run_in_bands(kernel, image_array.shape[0], num_bands, progress, cancel)
+    return RG1_final, RG2_final
 
-def encrypt(image, number_of_MSBP):
+
+def encrypt(image, number_of_MSBP, num_bands=None, random_source=secrets.token_bytes, progress=None, cancel=None):
     """
     Encrypts a grayscale image by decomposing it into bitplanes, applying random grid-based encryption,
     and returning the final combined RG1 and RG2 images.
@@ -185,43 +300,38 @@ def encrypt(image, number_of_MSBP):
     Parameters:
     image (PIL.Image.Image): The input grayscale image to be encrypted.
     number_of_MSBP (int): The number of most significant bitplanes to be processed and encrypted.
+    num_bands (int): The number of bands processed in parallel. If None, the number of CPUs is used.
+    random_source (callable): A function returning the requested number of random bytes.
+                              The system's cryptographic random number generator is used by default.
+    progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
 
     Returns:
     PIL.Image.Image: The encrypted RG1 image (final version after applying random grids).
     PIL.Image.Image: The encrypted RG2 image (final version after applying random grids).
     """
-    image_array = 1 - np.array(image).astype(int)
-
-    # Decompose the grayscale image into bitplanes
-    bit_planes = extract_bitplanes(image_array)
-    # save_bitplanes(bit_planes, output_path)
-
-    # Generate final RG1 and RG2 images by combining the random grids for the most significant bitplanes
-    RG1_final, RG2_final = generate_final_random_grids(bit_planes, number_of_MSBP)
-
-    # Save the combined RG1 and RG2 images
-    image_RG1_final = Image.fromarray(RG1_final)
-    image_RG2_final = Image.fromarray(RG2_final)
-
-    return image_RG1_final, image_RG2_final
+    RG1_final, RG2_final = encrypt_array(image_to_array(image, 'L'), number_of_MSBP, num_bands, random_source,
+                                         progress, cancel)
+    return tag_shares((array_to_image(RG1_final, 'L'), array_to_image(RG2_final, 'L')), "rg_grayscale_bitplane",
+                      {"bitplanes": number_of_MSBP})
 
 
 if __name__ == "__main__":
-    image_path = '../images/test.png'
-    output_path = '../images/output/'
+    image_path = 'scripts/images/test.png'
+    output_path = 'scripts/images/output/'
     number_of_MSBP = 3  # Number of most significant bitplanes to consider when enc/dec (8 for full bitplane)
 
     # Load the image and convert to grayscale ('L' mode for 8-bit grayscale)
     image = Image.open(image_path).convert('L')
 
-    # ENCRYPT: Generate shares
+    # ENCRYPT: Generate shares (save_image writes their metadata, read back by decrypt)
     share1, share2 = encrypt(image, number_of_MSBP)
-    share1.save(output_path + "RG1_final.png")
-    share2.save(output_path + "RG2_final.png")
+    save_image(share1, output_path + "RG1_final.png", NOISE_ENCODERS[0])
+    save_image(share2, output_path + "RG2_final.png", NOISE_ENCODERS[0])
 
     # DECRYPT: Overlay the grids: RG1_final and RG2_final
     img_share1 = Image.open(output_path + "RG1_final.png")
     img_share2 = Image.open(output_path + "RG2_final.png")
 
     decrypted_image = decrypt(img_share1, img_share2)
-    decrypted_image.save(output_path + "final_decrypted_image.png")
+    save_image(decrypted_image, output_path + "final_decrypted_image.png", "PNG")
@@ -1,6 +1,15 @@
 from PIL import Image
 import numpy as np
 import secrets
+from scripts.common.halftoning import HALFTONING_METHODS, band_halftoner
+from scripts.common.tiling import run_in_bands
+from scripts.common.arrays import image_to_array, array_to_image, as_binary
+from scripts.common.regions import REGIONS_REQUIREMENT, REGION_TILE, region_mask, encrypt_regions, changed_blocks, \
+    update_blocks
+from scripts.common.alignment import ALIGNMENT_REQUIREMENT, align_shares
+from scripts.common.encoding import BINARY_ENCODERS, save_image
+from scripts.common.metadata import tag_shares, check_share_pair, copy_share_metadata
+from scripts.common.validation import check_share_headers, BINARY_SHARE_MODES
 
 
 # Returns a dictionary containing function mappings and metadata for the algorithm (used by the web interface).
@@ -9,10 +18,15 @@ def get_config():
         "name": "RG - Grayscale Halftone",
         "description": get_description(),
         "requirements": get_requirements(),
+        "capabilities": get_capabilities(),
         "encrypt": encrypt,
         "decrypt": decrypt,
+        "encrypt_array": encrypt_array,
+        "decrypt_array": decrypt_array,
         "extension": "png",
-        "image_type": "1"
+        "encoders": BINARY_ENCODERS,
+        "share_modes": BINARY_SHARE_MODES,
+        "image_type": "L"
     }
 
 
@@ -21,7 +35,15 @@ def get_requirements():
     return {
         "encryption": {
             "num_images": 1,
-            "parameters": {}  # No additional parameters needed
+            "parameters": {
+                "halftoning": {
+                    "type": "select",
+                    "options": HALFTONING_METHODS,
+                    "default": "Floyd-Steinberg",
+                    "label": "Choose the halftoning method:"
+                },
+                "regions": REGIONS_REQUIREMENT
+            }
         },
         "decryption": {
             "num_images": 2,
@@ -31,17 +53,40 @@ def get_requirements():
                     "options": ["OR", "XOR"],
                     "default": "OR",
                     "label": "Choose whether to decrypt using OR or XOR:"
-                }
+                },
+                "alignment": ALIGNMENT_REQUIREMENT
             }
         }
     }
 
 
+# Defines how the encryption/decryption can be executed (used by the dispatcher of the web interface).
+def get_capabilities():
+    return {
+        "encryption": {
+            "pixel_expansion": 1,
+            "cross_row_state": {"halftoning": {"Floyd-Steinberg": True, "Bayer": False, "Blue noise": False}},
+            "bit_packed_io": True,
+            "dtype": "uint8",
+            "max_safe_pixels": 16_000_000,
+            "bands": True
+        },
+        "decryption": {
+            "pixel_expansion": 1,
+            "cross_row_state": {"alignment": {"None": False, "Translation": True, "Rotation and scale": True}},
+            "bit_packed_io": True,
+            "dtype": "uint8",
+            "max_safe_pixels": 16_000_000,
+            "bands": True
+        }
+    }
+
+
 # Returns a dictionary containing the description and reference links for the algorithm.
 def get_description():
     return {
         "text": "This (2,2) Visual Secret Sharing Scheme is similar to the vc_grayscale_halftone approach, where a black or grayscale image can be used for encryption. "
-                "The Steinberg dithering process is applied to convert the image into binary, and then the typical random grid approach by Kafri and Keren is implemented. "
+                "The Floyd-Steinberg dithering process (or, alternatively, Bayer or blue-noise ordered dithering) is applied to convert the image into binary, and then the typical random grid approach by Kafri and Keren is implemented. "
                 "Decryption can be performed using the OR operation (a classic approach, but with lower quality) or the XOR operation (to recover the exact image as after dithering).",
         "links": [
             {"text": "Kafri & Keren",
@@ -53,17 +98,23 @@ def get_description():
 
 
 # Function to generate the first random binary grid for encryption
-def create_first_random_grid(size):
+def create_first_random_grid(size, random_source=secrets.token_bytes):
     """
     Generates a random binary grid of specified dimensions.
 
     Parameters:
     size (tuple): The dimensions of the grid (height, width).
+    random_source (callable): A function returning the requested number of random bytes.
+                              The system's cryptographic random number generator is used by default.
 
     Returns:
     numpy.ndarray: A random binary grid (0s and 1s) of the specified size.
     """
-    grid = np.array([[secrets.randbelow(2) for _ in range(size[1])] for _ in range(size[0])])
+    num_pixels = int(np.prod(size))
+
+    # Draw all the random bits at once (8 pixels per byte)
+    random_bytes = np.frombuffer(random_source((num_pixels + 7) // 8), dtype=np.uint8)
+    grid = np.unpackbits(random_bytes)[:num_pixels].reshape(size)
     return grid
 
 
@@ -83,55 +134,129 @@ def create_second_random_grid(image, grid):
     return transformed_grid
 
 
+# Function to combine two binary arrays using the XOR operation
+def decrypt_with_XOR_array(img1_array, img2_array, num_bands=None, progress=None, cancel=None):
+    """
+    Combines two binary arrays using the XOR operation.
+
+    Parameters:
+    img1_array (numpy.ndarray): The first binary share (bool, or any integer type where non-zero is white).
+    img2_array (numpy.ndarray): The second binary share, with the same shape as img1_array.
+    num_bands (int): The number of bands processed in parallel. If None, the number of CPUs is used.
+    progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
+
+    Returns:
+    numpy.ndarray: The result of the XOR operation, inverted to black and white (np.uint8 values 0 and 255).
+    """
+    img1_array, img2_array = as_binary(img1_array), as_binary(img2_array)
+    overlaid_image = np.empty(img1_array.shape, dtype=np.uint8)
+
+    def kernel(rows):
+        band = overlaid_image[rows]
+        np.equal(img1_array[rows], img2_array[rows], out=band)  # Inverted XOR: 1 where the shares are equal
+        np.multiply(band, 255, out=band)  # Scale to black and white
+
+    run_in_bands(kernel, img1_array.shape[0], num_bands, progress, cancel)
+    return overlaid_image
+
+
+# Function to combine two binary arrays using the OR operation
+def decrypt_with_OR_array(img1_array, img2_array, num_bands=None, progress=None, cancel=None):
+    """
+    Combines two binary arrays using the OR operation.
+
+    Parameters:
+    img1_array (numpy.ndarray): The first binary share (bool, or any integer type where non-zero is white).
+    img2_array (numpy.ndarray): The second binary share, with the same shape as img1_array.
+    num_bands (int): The number of bands processed in parallel. If None, the number of CPUs is used.
+    progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
+
+    Returns:
+    numpy.ndarray: The result of the OR operation, inverted to black and white (np.uint8 values 0 and 255).
+    """
+    img1_array, img2_array = as_binary(img1_array), as_binary(img2_array)
+    overlaid_image = np.empty(img1_array.shape, dtype=np.uint8)
+
+    def kernel(rows):
+        band = overlaid_image[rows]
+        np.logical_or(img1_array[rows], img2_array[rows], out=band)  # Perform the OR operation
+        np.equal(band, 0, out=band)  # Invert the image to get black and white
+        np.multiply(band, 255, out=band)
+
+    run_in_bands(kernel, img1_array.shape[0], num_bands, progress, cancel)
+    return overlaid_image
+
+
 # Function to combine two binary images using the XOR operation
-def decrypt_with_XOR(image1, image2):
+def decrypt_with_XOR(image1, image2, num_bands=None, progress=None, cancel=None):
     """
     Combines two binary images using the XOR operation.
 
     Parameters:
     image1 (PIL.Image.Image): The first binary image (PIL Image).
     image2 (PIL.Image.Image): The second binary image (PIL Image).
+    num_bands (int): The number of bands processed in parallel. If None, the number of CPUs is used.
+    progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
 
     Returns:
     PIL.Image.Image: The result of the XOR operation applied to the two input images, with values inverted to black and white.
     """
-    # Convert PIL images to numpy arrays
-    img1_array = np.array(image1.convert('1'))  # Convert to binary (1-bit) image
-    img2_array = np.array(image2.convert('1'))  # Convert to binary (1-bit) image
-
-    # Perform the XOR operation
-    overlaid_image = np.bitwise_xor(img1_array, img2_array)
-    overlaid_image = 1 - overlaid_image  # Invert the image to get black and white
+    check_share_headers([image1, image2])
 
-    # Convert back to PIL image and return
-    return Image.fromarray(overlaid_image.astype(np.uint8) * 255)
+    overlaid_image = decrypt_with_XOR_array(image_to_array(image1, '1'), image_to_array(image2, '1'), num_bands,
+                                            progress, cancel)
+    return array_to_image(overlaid_image, 'L')
 
 
 # Function to combine two binary images using the OR operation
-def decrypt_with_OR(image1, image2):
+def decrypt_with_OR(image1, image2, num_bands=None, progress=None, cancel=None):
     """
     Combines two binary images using the OR operation.
 
     Parameters:
     image1 (PIL.Image.Image): The first binary image (PIL Image).
     image2 (PIL.Image.Image): The second binary image (PIL Image).
+    num_bands (int): The number of bands processed in parallel. If None, the number of CPUs is used.
+    progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
 
     Returns:
     PIL.Image.Image: The result of the OR operation applied to the two input images, with values inverted to black and white.
     """
-    # Convert PIL images to numpy arrays
-    img1_array = np.array(image1.convert('1'))  # Convert to binary (1-bit) image
-    img2_array = np.array(image2.convert('1'))  # Convert to binary (1-bit) image
+    check_share_headers([image1, image2])
 
-    # Perform the OR operation
-    overlaid_image = np.bitwise_or(img1_array, img2_array)
-    overlaid_image = 1 - overlaid_image  # Invert the image to get black and white
+    overlaid_image = decrypt_with_OR_array(image_to_array(image1, '1'), image_to_array(image2, '1'), num_bands,
+                                           progress, cancel)
+    return array_to_image(overlaid_image, 'L')
 
-    # Convert back to PIL image and return
-    return Image.fromarray(overlaid_image.astype(np.uint8) * 255)
 
+def decrypt_array(img1_array, img2_array, operation, num_bands=None, progress=None, cancel=None):
+    """
+    Decrypts two binary arrays using the specified operation (XOR or OR).
+
+    Parameters:
+    img1_array (numpy.ndarray): The first binary share (bool, or any integer type where non-zero is white).
+    img2_array (numpy.ndarray): The second binary share, with the same shape as img1_array.
+    operation (str): The operation to use for decryption ("XOR" or "OR").
+    num_bands (int): The number of bands processed in parallel. If None, the number of CPUs is used.
+    progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
 
-def decrypt(image1, image2, operation):
+    Returns:
+    numpy.ndarray: The decrypted image (np.uint8 values 0 and 255).
+    """
+    if operation.upper() == "XOR":
+        return decrypt_with_XOR_array(img1_array, img2_array, num_bands, progress, cancel)
+    elif operation.upper() == "OR":
+        return decrypt_with_OR_array(img1_array, img2_array, num_bands, progress, cancel)
+    else:
+        raise ValueError(f"Invalid decryption operation: {operation}. Choose 'XOR' or 'OR'.")
+
+
+def decrypt(image1, image2, operation, alignment="None", num_bands=None, progress=None, cancel=None):
     """
     Decrypts two binary images using the specified operation (XOR or OR).
 
@@ -139,19 +264,76 @@ def decrypt(image1, image2, operation):
     image1 (PIL.Image.Image): The first binary image (PIL Image).
     image2 (PIL.Image.Image): The second binary image (PIL Image).
     operation (str): The operation to use for decryption ("XOR" or "OR").
+    alignment (str): "None" for shares with the same pixel grid, or "Translation" or "Rotation and scale" to align
+                     the second share to the first one (e.g. printed and scanned shares, see align_shares in
+                     scripts/common/alignment.py).
+    num_bands (int): The number of bands processed in parallel. If None, the number of CPUs is used.
+    progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
 
     Returns:
     PIL.Image.Image: The result of the selected decryption operation applied to the two input images.
     """
-    if operation.upper() == "XOR":
-        return decrypt_with_XOR(image1, image2)
-    elif operation.upper() == "OR":
-        return decrypt_with_OR(image1, image2)
-    else:
-        raise ValueError(f"Invalid decryption operation: {operation}. Choose 'XOR' or 'OR'.")
+    image1, image2 = align_shares([image1, image2], alignment)
+    check_share_headers([image1, image2])
+    check_share_pair([image1, image2], "rg_grayscale_halftone", allow_missing=alignment.upper() != "NONE")
+
+    overlaid_image = decrypt_array(image_to_array(image1, '1'), image_to_array(image2, '1'), operation, num_bands,
+                                   progress, cancel)
+    return array_to_image(overlaid_image, 'L')
+
+
+def encrypt_array(image_array, halftoning="Floyd-Steinberg", regions=None, num_bands=None,
+                  random_source=secrets.token_bytes, progress=None, cancel=None):
+    """
+    Encrypts an image array by applying a binary inversion and creating two random grids
+    based on the binary representation of the image.
+
+    Parameters:
+    image_array (numpy.ndarray): The grayscale image (np.uint8), or a binary image (bool) which is not halftoned.
+    halftoning (str): The method used to convert the image into binary ("Floyd-Steinberg", "Bayer" or "Blue noise").
+    regions: The regions of interest (see region_mask in scripts/common/regions.py). If given, only they are
+             halftoned and encrypted, and the rest of the shares decrypts to white. None for the whole image.
+    num_bands (int): The number of bands processed in parallel. If None, the number of CPUs is used.
+    random_source (callable): A function returning the requested number of random bytes.
+                              The system's cryptographic random number generator is used by default.
+    progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
+
+    Returns:
+    tuple: A tuple containing the two shares as numpy arrays (np.uint8 values 0 and 255).
+    """
+    mask = region_mask(image_array.shape[:2], regions)
+    if mask is not None:
+        # Outside the regions, the shares of a white page: the same random grid twice, without halftoning
+        return encrypt_regions(image_array, mask,
+                               lambda block: encrypt_array(block, halftoning, None, num_bands, random_source),
+                               lambda: encrypt_array(np.ones(mask.shape, dtype=bool), halftoning, None, num_bands,
+                                                     random_source),
+                               1, True if image_array.dtype == bool else 255, progress, cancel)
+
+    halftone_rows = band_halftoner(image_array, halftoning)
+    size = image_array.shape[:2]
+
+    # Create the first random grid (drawn at once, so the result does not depend on the number of bands)
+    rg1 = create_first_random_grid(size, random_source)
+    share1 = np.empty(size, dtype=np.uint8)
+    share2 = np.empty(size, dtype=np.uint8)
+
+    def kernel(rows):
+        image_band = ~halftone_rows(rows)  # Binary inversion: 1 for black pixels, 0 for white ones
 
+        # Create the second random grid (create_second_random_grid written as a XOR) and scale both to black and white
+        np.bitwise_xor(rg1[rows], image_band, out=share2[rows])
+        np.multiply(share2[rows], 255, out=share2[rows])
+        np.multiply(rg1[rows], 255, out=share1[rows])
 
-def encrypt(image):
+    run_in_bands(kernel, size[0], num_bands, progress, cancel)
+    return share1, share2
+
+
+def encrypt(image, halftoning="Floyd-Steinberg", regions=None, num_bands=None, random_source=secrets.token_bytes,
+            progress=None, cancel=None):
     """
     Encrypts an image by applying a binary inversion and creating two random grids
     based on the binary representation of the image. The random grids are generated
@@ -159,35 +341,142 @@ def encrypt(image):
 
     Parameters:
     image (PIL.Image.Image): The input image to be encrypted. It will be processed in its binary form.
+    halftoning (str): The method used to convert the image into binary ("Floyd-Steinberg", "Bayer" or "Blue noise").
+                      Binary images are left unchanged by every method.
+    regions: The regions of interest (see region_mask in scripts/common/regions.py). If given, only they are
+             halftoned and encrypted, and the rest of the shares decrypts to white. None for the whole image.
+    num_bands (int): The number of bands processed in parallel. If None, the number of CPUs is used.
+    random_source (callable): A function returning the requested number of random bytes.
+                              The system's cryptographic random number generator is used by default.
+    progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
 
     Returns:
     tuple: A tuple containing two PIL images (image_rg1 and image_rg2), which are the
            generated random grids used in the encryption process.
     """
-    image_array = 1 - np.array(image).astype(int)
+    image_array = image_to_array(image, None if image.mode == '1' else 'L')
+    share1, share2 = encrypt_array(image_array, halftoning, regions, num_bands, random_source, progress, cancel)
+
+    return tag_shares((array_to_image(share1, 'L'), array_to_image(share2, 'L')), "rg_grayscale_halftone",
+                      {"halftoning": halftoning})
+
+
+# Function to update the second share in place after a change of the image
+def update_array(share1, share2, *, old=None, new, halftoning="Floyd-Steinberg", progress=None, cancel=None):
+    """
+    Re-encrypts a new version of an image with the random grid of its previous encryption: share 2 is a pixel-local
+    function of the halftoned image and of share 1, so only the tiles where the halftoned image changed are
+    recomputed. The cost is proportional to the changed area with ordered halftoning (or binary images); with
+    Floyd-Steinberg, a change diffuses to the following pixels, so the whole new image is halftoned and compared
+    with the previous halftoned image (recovered from the shares), but share 2 is still written only where it changed.
+
+    The two versions of share 2 reveal where (and how) the halftoned image changed to anyone holding both of them:
+    send the new version only to the holder of the previous one.
+
+    Parameters:
+    share1 (numpy.ndarray): The first share (bool, or any integer type where non-zero is white). Not modified.
+    share2 (numpy.ndarray): The second share, with the same shape, updated in place (bool or np.uint8 0/255 values).
+                            It can be a memory map (e.g. np.load(path, mmap_mode="r+")), so that only the changed
+                            pages of the file are written.
+    old (numpy.ndarray): The image encrypted by the shares (see encrypt_array), keyword-only. If None, it is not
+                         needed: the previous halftoned image is recovered from the shares.
+    new (numpy.ndarray): The new version of the image, with the same size (keyword-only).
+    halftoning (str): The halftoning method of the encryption ("Floyd-Steinberg", "Bayer" or "Blue noise").
+    progress (callable): A function called as progress(done_rows, total_rows) after each band of tiles.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
+
+    Returns:
+    list: The updated blocks of share 2, as (rows, columns) pairs of slices.
+    """
+    if share1.shape != share2.shape or share1.shape != new.shape[:2]:
+        raise ValueError(f"The shares ({share1.shape[::-1]} and {share2.shape[::-1]}) and the new image "
+                         f"({new.shape[1::-1]}) have different sizes.")
+
+    halftone_rows = band_halftoner(new, halftoning)
+    local = new.dtype == bool or halftoning.upper() != "FLOYD-STEINBERG"
+
+    if old is not None and local:
+        # Ordered halftoning: a tile of the halftoned image only depends on the same tile of the image
+        new_halftone = None
+        blocks = changed_blocks(old, new)
+    else:
+        # The error diffusion is causal: the halftoned image can only change from the first changed row of the image
+        first_row = 0
+        if old is not None:
+            changed_rows = np.flatnonzero((old != new).reshape(share1.shape[0], -1).any(axis=1))
+            if changed_rows.size == 0:
+                return []
+            first_row = changed_rows[0] // REGION_TILE * REGION_TILE
+
+        # The shares are equal where the halftoned image is white (share 2 = share 1 XOR black pixels)
+        new_halftone = halftone_rows(slice(None))
+        rows = slice(first_row, None)
+        blocks = [(slice(block_rows.start + first_row, block_rows.stop + first_row), cols) for block_rows, cols in
+                  changed_blocks(as_binary(share1[rows]) == as_binary(share2[rows]), new_halftone[rows])]
+
+    def update_block(rows, cols):
+        if new_halftone is None:
+            # The tiles start on multiples of the threshold masks, so the block is halftoned as in the whole image
+            white = band_halftoner(new[rows, cols], halftoning)(slice(None))
+        else:
+            white = new_halftone[rows, cols]
+
+        share2[rows, cols] = as_binary(share1[rows, cols]) == white
+        if share2.dtype != bool:
+            share2[rows, cols] *= 255
+
+    return update_blocks(blocks, update_block, share1.shape[0], progress, cancel)
+
+
+# Function to update the second share after a change of the image
+def update(share1, share2, *, old=None, new, halftoning=None, progress=None, cancel=None):
+    """
+    Encrypts a new version of an image with the first share of its previous encryption, recomputing only the
+    changed tiles of the second share (see update_array).
+
+    Parameters:
+    share1 (PIL.Image.Image): The first share of the previous encryption.
+    share2 (PIL.Image.Image): The second share of the previous encryption (not modified).
+    old (PIL.Image.Image): The image encrypted by the shares (keyword-only). If None, the previous halftoned image
+                           is recovered from the shares (the whole new image is halftoned).
+    new (PIL.Image.Image): The new version of the image, with the size of the shares (keyword-only).
+    halftoning (str): The halftoning method of the encryption. If None, the method recorded in the metadata of the
+                      shares is used ("Floyd-Steinberg" for shares without metadata).
+    progress (callable): A function called as progress(done_rows, total_rows) after each band of tiles.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
 
-    # Create the first and second random grids
-    rg1 = create_first_random_grid(image_array.shape)
-    rg2 = create_second_random_grid(image_array, rg1)
+    Returns:
+    PIL.Image.Image: The new second share, with the mode and the metadata of the previous one.
+    """
+    check_share_headers([share1, share2])
+    metadata = check_share_pair([share1, share2], "rg_grayscale_halftone")
+    recorded = metadata["parameters"].get("halftoning") if metadata is not None else None
+    if halftoning is not None and recorded is not None and halftoning != recorded:
+        raise ValueError(f"The shares were halftoned with {recorded}, not {halftoning}.")
+    halftoning = halftoning or recorded or "Floyd-Steinberg"
 
-    image_rg1 = Image.fromarray(rg1.astype(np.uint8) * 255)
-    image_rg2 = Image.fromarray(rg2.astype(np.uint8) * 255)
+    def to_array(image):
+        return None if image is None else image_to_array(image, None if image.mode == '1' else 'L')
 
-    return image_rg1, image_rg2
+    share2_array = np.array(image_to_array(share2))  # Writable copy of the pixels of the previous share
+    update_array(image_to_array(share1), share2_array, old=to_array(old), new=to_array(new), halftoning=halftoning,
+                 progress=progress, cancel=cancel)
+    return copy_share_metadata(share2, array_to_image(share2_array, share2.mode))
 
 
 if __name__ == "__main__":
-    image_path = '../images/test.png'
-    output_path = '../images/output/'
+    image_path = 'scripts/images/test.png'
+    output_path = 'scripts/images/output/'
 
     # Load and convert the input image to binary
     image = Image.open(image_path).convert('1')
-    image.save(output_path + "halftoned.png")
+    save_image(image, output_path + "halftoned.png", "PNG")
 
-    # ENCRYPT: Generate shares
+    # ENCRYPT: Generate shares (save_image writes their metadata, read back by decrypt)
     share1, share2 = encrypt(image)
-    share1.save(output_path + "RG1.png")
-    share2.save(output_path + "RG2.png")
+    save_image(share1, output_path + "RG1.png", BINARY_ENCODERS[0])
+    save_image(share2, output_path + "RG2.png", BINARY_ENCODERS[0])
 
     # DECRYPT: Overlay the grids using OR and XOR
     img_share1 = Image.open(output_path + "RG1.png")
@@ -195,8 +484,8 @@ if __name__ == "__main__":
 
     out = decrypt_with_OR(img_share1, img_share2)
     # out = decrypt(img_share1, img_share2, "OR")
-    out.save(output_path + "overlap_OR.png")
+    save_image(out, output_path + "overlap_OR.png", "PNG")
 
     out = decrypt_with_XOR(img_share1, img_share2)
     # out = decrypt(img_share1, img_share2, "XOR")
-    out.save(output_path + "overlap_XOR.png")
+    save_image(out, output_path + "overlap_XOR.png", "PNG")
@@ -1,5 +1,20 @@
 from PIL import Image
-from scripts.visual_cryptography.vc_grayscale_halftone import encrypt as encrypt_bin_img, decrypt as decrypt_bin_img
+import numpy as np
+import secrets
+from scripts.visual_cryptography.vc_grayscale_halftone import subpixel_patterns, random_indices, random_pattern_indices
+from scripts.random_grid.rg_grayscale_halftone import create_first_random_grid
+from scripts.common.halftoning import HALFTONING_METHODS, ordered_dithering
+from scripts.common.kernels import floyd_steinberg
+from scripts.common.halftone_cache import get_halftone_cache, halftone_key
+from scripts.common.arrays import image_to_array, array_to_image
+from scripts.common.regions import REGIONS_REQUIREMENT, region_mask, encrypt_regions
+from scripts.common.progress import STRIP_ROWS, ProgressReporter
+from scripts.common.tiling import run_in_bands
+from scripts.common.encoding import CMYK_ENCODERS, save_image
+from scripts.common.metadata import tag_shares, check_share_pair
+from scripts.common.validation import check_share_headers
+
+DITHER_BLOCK_ROWS = 4 * STRIP_ROWS  # Rows dithered at once by Floyd-Steinberg (fewer, longer wavefronts for NumPy)
 
 
 # Returns a dictionary containing function mappings and metadata for the algorithm (used by the web interface).
@@ -8,9 +23,14 @@ def get_config():
         "name": "VC - Color (CMYK) Halftone",
         "description": get_description(),
         "requirements": get_requirements(),
+        "capabilities": get_capabilities(),
         "encrypt": encrypt,
         "decrypt": decrypt,
+        "encrypt_array": encrypt_array,
+        "decrypt_array": decrypt_array,
         "extension": "tiff",
+        "encoders": CMYK_ENCODERS,
+        "share_modes": ["CMYK"],
         "image_type": "CMYK"
     }
 
@@ -20,7 +40,21 @@ def get_requirements():
     return {
         "encryption": {
             "num_images": 1,
-            "parameters": {}  # No extra parameters needed
+            "parameters": {
+                "expansion": {
+                    "type": "select",
+                    "options": ["2x2", "Probabilistic"],
+                    "default": "2x2",
+                    "label": "Choose the pixel expansion of the shares (Probabilistic keeps the original size):"
+                },
+                "halftoning": {
+                    "type": "select",
+                    "options": HALFTONING_METHODS,
+                    "default": "Floyd-Steinberg",
+                    "label": "Choose the halftoning method:"
+                },
+                "regions": REGIONS_REQUIREMENT
+            }
         },
         "decryption": {
             "num_images": 2,
@@ -29,10 +63,32 @@ def get_requirements():
     }
 
 
+# Defines how the encryption/decryption can be executed (used by the dispatcher of the web interface).
+def get_capabilities():
+    return {
+        "encryption": {
+            "pixel_expansion": {"expansion": {"2x2": 2, "Probabilistic": 1}},
+            "cross_row_state": {"halftoning": {"Floyd-Steinberg": True, "Bayer": False, "Blue noise": False}},
+            "bit_packed_io": False,
+            "dtype": "uint8",
+            "max_safe_pixels": 4_000_000,
+            "bands": False
+        },
+        "decryption": {
+            "pixel_expansion": 1,
+            "cross_row_state": False,
+            "bit_packed_io": False,
+            "dtype": "uint8",
+            "max_safe_pixels": 16_000_000,
+            "bands": True
+        }
+    }
+
+
 # Returns a dictionary containing the description and reference links for the algorithm.
 def get_description():
     return {
-        "text": "This (2,2) Visual Cryptography Scheme is inspired by the approach outlined in the paper by Qiao et al. The scheme utilizes CMYK images, designed to work with .TIFF image files. Additionally, the encoding process makes the image appear entirely white for code reuse purposes. For further details, refer to the script.",
+        "text": "This (2,2) Visual Cryptography Scheme is inspired by the approach outlined in the paper by Qiao et al. The scheme utilizes CMYK images, designed to work with .TIFF image files. Each channel is halftoned with Floyd-Steinberg dithering or, alternatively, with Bayer or blue-noise ordered dithering. Additionally, the encoding process makes the image appear entirely white for code reuse purposes. For further details, refer to the script.",
         "links": [
             {"text": "Adi Shamir",
              "url": "https://doi.org/10.1145/359168.359176"},
@@ -61,6 +117,49 @@ def extract_cmyk_channel(image, channel):
     return image.split()[channel]
 
 
+# Function to apply Floyd-Steinberg dithering to a single row of a grayscale channel
+def floyd_steinberg_row(current_row, next_row):
+    """
+    Applies Floyd-Steinberg dithering to one row of a grayscale channel. The quantization error of each pixel
+    is diffused in place to the following pixels of the current row and to the pixels of the next row.
+    This is the reference implementation of the compiled and NumPy kernels of scripts/common/kernels.py,
+    which must give bit-identical results (see scripts/benchmarks/kernels.py).
+
+    Parameters:
+    current_row (list): The pixel values (0-255) of the row to be dithered, already including the error
+                        diffused by the previous row. It is modified in place.
+    next_row (list): The pixel values of the following row, which receive part of the error. It is modified in place.
+                     None if current_row is the last row of the image.
+
+    Returns:
+    list: A list of booleans, True where the dithered pixel is black (0) and False where it is white (255).
+    """
+    width = len(current_row)
+    black_pixels = [False] * width
+
+    for x in range(width):
+        old_value = current_row[x]  # Original pixel value
+        new_value = 255 if old_value > 128 else 0  # Threshold for binary dithering
+        black_pixels[x] = new_value == 0
+
+        quant_error = old_value - new_value  # Calculate quantization error
+
+        # Diffuse quantization error to neighboring pixels
+        if x < width - 1:  # Right neighbor
+            current_row[x + 1] = min(max(current_row[x + 1] + quant_error * 7 // 16, 0), 255)
+
+            if next_row is not None:  # Bottom-right neighbor
+                next_row[x + 1] = min(max(next_row[x + 1] + quant_error * 1 // 16, 0), 255)
+
+        if next_row is not None:  # Bottom neighbor
+            next_row[x] = min(max(next_row[x] + quant_error * 5 // 16, 0), 255)
+
+            if x > 0:  # Bottom-left neighbor
+                next_row[x - 1] = min(max(next_row[x - 1] + quant_error * 3 // 16, 0), 255)
+
+    return black_pixels
+
+
 # Function to apply Floyd-Steinberg dithering to a grayscale image
 def floyd_steinberg_dithering(img):
     """
@@ -74,34 +173,11 @@ def floyd_steinberg_dithering(img):
     Returns:
     PIL.Image.Image: A new dithered grayscale image (mode "L").
     """
-    dithered_image = Image.new("L", img.size)
-
-    for y in range(img.size[1]):  # Loop through rows (image height)
-        for x in range(img.size[0]):  # Loop through columns (image width)
-            old_value = img.getpixel((x, y))  # Original pixel value
-            new_value = 255 if old_value > 128 else 0  # Threshold for binary dithering
-            dithered_image.putpixel((x, y), new_value)  # Set dithered pixel value
-
-            quant_error = old_value - new_value  # Calculate quantization error
-
-            # Diffuse quantization error to neighboring pixels
-            if x < img.size[0] - 1:  # Right neighbor
-                pixel = img.getpixel((x + 1, y))
-                img.putpixel((x + 1, y), min(max(pixel + quant_error * 7 // 16, 0), 255))
-
-                if y < img.size[1] - 1:  # Bottom-right neighbor
-                    pixel = img.getpixel((x + 1, y + 1))
-                    img.putpixel((x + 1, y + 1), min(max(pixel + quant_error * 1 // 16, 0), 255))
-
-            if y < img.size[1] - 1:  # Bottom neighbor
-                pixel = img.getpixel((x, y + 1))
-                img.putpixel((x, y + 1), min(max(pixel + quant_error * 5 // 16, 0), 255))
+    pixels = np.asarray(img)
+    work = pixels.astype(np.int32).reshape(*pixels.shape, 1)
+    black_pixels = floyd_steinberg(work, pixels.shape[0])[..., 0]
 
-                if x > 0:  # Bottom-left neighbor
-                    pixel = img.getpixel((x - 1, y + 1))
-                    img.putpixel((x - 1, y + 1), min(max(pixel + quant_error * 3 // 16, 0), 255))
-
-    return dithered_image
+    return Image.fromarray(np.where(black_pixels, 0, 255).astype(np.uint8))
 
 
 # Function to decompose a CMYK image into individual channels, apply dithering, and return the results
@@ -137,40 +213,255 @@ def decompose_and_dither(image):
     return dthrd_cyan, dthrd_magenta, dthrd_yellow
 
 
-def combine_cmyk_channels(share_c, share_m, share_y):
+# Function to dither the Cyan, Magenta and Yellow channels of a CMYK image, one row at a time
+def dither_cmy_rows(pixels, halftoning="Floyd-Steinberg"):
     """
-    Combines the Cyan, Magenta, and Yellow shares into a single CMYK image.
+    Dithers the Cyan, Magenta and Yellow channels of a CMYK image together, in a single sweep over its rows.
+    Floyd-Steinberg dithers blocks of DITHER_BLOCK_ROWS rows with the kernel of the active backend, carrying
+    the error diffused below each block to the next one, while the ordered methods (Bayer and blue noise)
+    dither each row independently with a threshold mask.
 
     Parameters:
-    share_c (PIL.Image.Image): The Cyan channel share.
-    share_m (PIL.Image.Image): The Magenta channel share.
-    share_y (PIL.Image.Image): The Yellow channel share.
+    pixels (numpy.ndarray): The CMYK image as an array with shape (height, width, 4).
+    halftoning (str): The halftoning method ("Floyd-Steinberg", "Bayer" or "Blue noise").
+
+    Yields:
+    numpy.ndarray: For each row, a boolean array of shape (width, 3), True where the dithered channel is black.
+    """
+    height = pixels.shape[0]
+
+    if halftoning.upper() == "FLOYD-STEINBERG":
+        carry = None
+        for top in range(0, height, DITHER_BLOCK_ROWS):
+            num_rows = min(DITHER_BLOCK_ROWS, height - top)
+
+            # The block and the row below it, which receives the error diffused by the last row of the block
+            work = pixels[top:top + num_rows + 1, :, :3].astype(np.int32, order='C')
+            if carry is not None:
+                work[0] = carry  # The first row already received the error of the previous block
+
+            yield from floyd_steinberg(work, num_rows)
+            carry = work[num_rows] if num_rows < work.shape[0] else None
+
+    elif halftoning.upper() in ("BAYER", "BLUE NOISE"):
+        for y in range(height):
+            yield ~ordered_dithering(pixels[y:y + 1, :, :3], halftoning, row_offset=y)[0]
+
+    else:
+        raise ValueError(f"Invalid halftoning method: {halftoning}. Choose one of {', '.join(HALFTONING_METHODS)}.")
+
+
+# Function to dither the Cyan, Magenta and Yellow channels of a CMYK image through the halftone cache
+def cached_cmy_rows(pixels, halftoning="Floyd-Steinberg"):
+    """
+    Yields the rows of dither_cmy_rows, read from the halftone cache of the process when the same image was
+    already dithered with the same method (see scripts/common/halftone_cache.py). On a miss, the dithered rows
+    are collected while they are yielded, and cached once the whole image is dithered.
+
+    Parameters:
+    pixels (numpy.ndarray): The CMYK image as an array with shape (height, width, 4).
+    halftoning (str): The halftoning method ("Floyd-Steinberg", "Bayer" or "Blue noise").
+
+    Yields:
+    numpy.ndarray: For each row, a boolean array of shape (width, 3), True where the dithered channel is black.
+    """
+    cache = get_halftone_cache()
+    if cache is None:
+        yield from dither_cmy_rows(pixels, halftoning)
+        return
+
+    key = halftone_key("cmy", pixels, halftoning)
+    shape = pixels.shape[:2] + (3,)
+    black_pixels = cache.get(key, shape)
+    if black_pixels is not None:
+        yield from black_pixels
+        return
+
+    black_pixels = np.empty(shape, dtype=bool)
+    for y, row in enumerate(dither_cmy_rows(pixels, halftoning)):
+        black_pixels[y] = row
+        yield row
+    cache.put(key, black_pixels)
+
+
+# Function to write the shares of one dithered row straight into the two share buffers
+def populate_share_rows(share1, share2, y, black_pixels, expansion, random_source=secrets.token_bytes):
+    """
+    Encrypts one dithered row of the Cyan, Magenta and Yellow channels and writes the resulting
+    subpixels into the rows of the two CMYK share buffers.
+
+    Parameters:
+    share1 (numpy.ndarray): The first share buffer, with shape (height, width, 4).
+    share2 (numpy.ndarray): The second share buffer, with shape (height, width, 4).
+    y (int): The index of the source row.
+    black_pixels (numpy.ndarray): A boolean array of shape (width, 3), True where the dithered channel is black.
+    expansion (str): "2x2" to expand each pixel into four subpixels, "Probabilistic" to keep the original size.
+    random_source (callable): A function returning the requested number of random bytes.
+    """
+    if expansion.upper() == "2X2":
+        # One random subpixel pattern per pixel and channel (random column permutation of the basis matrix)
+        indices = random_pattern_indices(black_pixels.size, random_source)
+        patterns = subpixel_patterns[indices].reshape(*black_pixels.shape, 4)
+        patterns2 = patterns ^ black_pixels[..., np.newaxis]  # Complementary row for black pixels
+
+        # Subpixels are ordered as (top-left, bottom-left, top-right, bottom-right), as in subpixel_patterns
+        for share, pattern in ((share1, patterns), (share2, patterns2)):
+            share[2 * y, 0::2, :3] = pattern[..., 0]
+            share[2 * y + 1, 0::2, :3] = pattern[..., 1]
+            share[2 * y, 1::2, :3] = pattern[..., 2]
+            share[2 * y + 1, 1::2, :3] = pattern[..., 3]
+
+    else:
+        # One random column of the basis matrix per pixel and channel
+        random_column = create_first_random_grid(black_pixels.shape, random_source)
+        share1[y, :, :3] = random_column
+        share2[y, :, :3] = random_column ^ black_pixels
+
+
+# Function to build the subpixels of a blank pixel of each share, for every combination of the random patterns
+def blank_pixel_rows(scale):
+    """
+    A blank pixel draws an independent random pattern on the Cyan, Magenta and Yellow channels (one of the
+    subpixel_patterns with the 2x2 expansion, one random bit without it). The subpixels of a row of its block
+    (scale subpixels of 4 channels) are 4 or 8 contiguous bytes of the share, so they are stored as one integer,
+    and the blank shares are written with one lookup per row of subpixels.
+
+    Parameters:
+    scale (int): The pixel expansion (2 or 1).
 
     Returns:
-    PIL.Image.Image: The combined CMYK image.
+    tuple: The rows of subpixels of the first and of the second share, as integer arrays with shape
+           (combinations, scale), indexed by combination (the patterns of the Cyan, Magenta and Yellow channels).
     """
-    combined_image = Image.new("CMYK", share_c.size)
+    if scale == 2:
+        patterns = subpixel_patterns.reshape(-1, 2, 2).transpose(0, 2, 1)  # [pattern, row, column]
+    else:
+        patterns = np.arange(2, dtype=np.uint8).reshape(-1, 1, 1)
+    count = len(patterns)
+
+    blocks = np.zeros((count, count, count, scale, scale, 4), dtype=np.uint8)
+    for channel in range(3):
+        shape = [1, 1, 1, scale, scale]
+        shape[channel] = count
+        blocks[..., channel] = patterns.reshape(shape)
 
-    for y in range(share_c.size[1]):
-        for x in range(share_c.size[0]):
-            cyan_value = share_c.getpixel((x, y))
-            magenta_value = share_m.getpixel((x, y))
-            yellow_value = share_y.getpixel((x, y))
+    complement = blocks.copy()
+    complement[..., :3] = 1 - blocks[..., :3]  # A channel without ink is black: complementary subpixels
 
-            # Combine values into a single CMYK pixel
-            pixels = (cyan_value, magenta_value, yellow_value, 0)
-            combined_image.putpixel((x, y), pixels)
+    dtype = np.uint64 if scale == 2 else np.uint32
+    return tuple(np.ascontiguousarray(share.reshape(count ** 3, scale, 4 * scale)).view(dtype)[..., 0]
+                 for share in (blocks, complement))
 
-    return combined_image
 
+BLANK_ROWS = {scale: blank_pixel_rows(scale) for scale in (1, 2)}
 
-def encrypt(image):
+
+# Function to encrypt a blank CMYK page (no ink), without dithering
+def encrypt_blank(size, expansion, random_source=secrets.token_bytes):
+    """
+    A channel without ink (0) is dithered to black pixels (VC value 1) everywhere, so the second share is the
+    complement of the first one on the Cyan, Magenta and Yellow channels. One random combination of the patterns
+    of the three channels is drawn per pixel, and each row of subpixels of both shares is written with a single
+    lookup (see blank_pixel_rows), instead of expanding the patterns channel by channel.
+
+    Parameters:
+    size (tuple): The (height, width) of the page.
+    expansion (str): "2x2" to expand each pixel into four subpixels, "Probabilistic" to keep the original size.
+    random_source (callable): A function returning the requested number of random bytes.
+
+    Returns:
+    tuple: The two shares, as returned by encrypt_array for a page without ink.
+    """
+    scale = 2 if expansion.upper() == "2X2" else 1
+    height, width = size
+    rows1, rows2 = BLANK_ROWS[scale]
+
+    indices = random_indices(height * width, len(rows1), random_source).reshape(height, width)
+
+    shares = []
+    for rows in (rows1, rows2):
+        share = np.empty((height * scale, width * scale, 4), dtype=np.uint8)
+        subpixel_rows = share.reshape(height, scale, width * scale * 4).view(rows.dtype)  # [y, row, x]
+        for row in range(scale):
+            subpixel_rows[:, row] = rows[indices, row]
+        shares.append(share)
+
+    return tuple(shares)
+
+
+# Function to encrypt a CMYK image array, dithering and encrypting one row at a time
+def encrypt_array(pixels, expansion="2x2", halftoning="Floyd-Steinberg", regions=None,
+                  random_source=secrets.token_bytes, progress=None, cancel=None):
+    """
+    Encrypts a CMYK image array, generating the two CMYK share arrays.
+
+    The Cyan, Magenta and Yellow channels are dithered together in a single sweep over the rows of the image,
+    and each dithered row is immediately encrypted into the rows of the two output shares. Apart from the two
+    share buffers, only a block of rows of the image is kept in memory.
+
+    Parameters:
+    pixels (numpy.ndarray): The CMYK image as an array with shape (height, width, 4).
+    expansion (str): "2x2" to expand each pixel into four subpixels, "Probabilistic" to keep the original size.
+    halftoning (str): The halftoning method applied to each channel ("Floyd-Steinberg", "Bayer" or "Blue noise").
+    regions: The regions of interest (see region_mask in scripts/common/regions.py). If given, only they are
+             dithered and encrypted, and the rest of the shares decrypts to a page without ink. None for the
+             whole image.
+    random_source (callable): A function returning the requested number of random bytes.
+                              The system's cryptographic random number generator is used by default.
+    progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
+
+    Returns:
+    tuple: The two shares as np.uint8 arrays with shape (scale * height, scale * width, 4), where each of
+           the Cyan, Magenta and Yellow channels holds 0 (black subpixel) or 1 (white subpixel).
+    """
+    if expansion.upper() not in ("2X2", "PROBABILISTIC"):
+        raise ValueError(f"Invalid pixel expansion: {expansion}. Choose '2x2' or 'Probabilistic'.")
+
+    scale = 2 if expansion.upper() == "2X2" else 1
+    height, width = pixels.shape[:2]
+
+    mask = region_mask((height, width), regions)
+    if mask is not None:
+        # Outside the regions, the shares of a page without ink, drawn in bulk without dithering
+        return encrypt_regions(pixels, mask,
+                               lambda block: encrypt_array(block, expansion, halftoning, None, random_source),
+                               lambda: encrypt_blank((height, width), expansion, random_source), scale, 0,
+                               progress, cancel)
+
+    # The Black channel of the shares is left empty
+    share1 = np.zeros((height * scale, width * scale, 4), dtype=np.uint8)
+    share2 = np.zeros((height * scale, width * scale, 4), dtype=np.uint8)
+
+    reporter = ProgressReporter(height, progress, cancel)
+    reporter.check()
+
+    for y, black_pixels in enumerate(cached_cmy_rows(pixels, halftoning)):
+        populate_share_rows(share1, share2, y, black_pixels, expansion, random_source)
+
+        # Report the progress (and check for cancellation) once per strip of rows
+        if (y + 1) % STRIP_ROWS == 0 or y + 1 == height:
+            reporter.advance(y + 1 - reporter.done_rows)
+
+    return share1, share2
+
+
+def encrypt(image, expansion="2x2", halftoning="Floyd-Steinberg", regions=None, random_source=secrets.token_bytes,
+            progress=None, cancel=None):
     """
     Encrypts a CMYK image using visual cryptography principles, generating two shares that can
     be combined to reconstruct the original image.
 
     Parameters:
     image (PIL.Image.Image): The input CMYK image to be encrypted.
+    expansion (str): "2x2" to expand each pixel into four subpixels, "Probabilistic" to keep the original size.
+    halftoning (str): The halftoning method applied to each channel ("Floyd-Steinberg", "Bayer" or "Blue noise").
+    regions: The regions of interest (see region_mask in scripts/common/regions.py). If given, only they are
+             dithered and encrypted. None for the whole image.
+    random_source (callable): A function returning the requested number of random bytes.
+                              The system's cryptographic random number generator is used by default.
+    progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
 
     Returns:
     tuple: A pair of images (combined_image1, combined_image2) representing the two encrypted shares.
@@ -178,71 +469,84 @@ def encrypt(image):
            derived from the dithering and encryption process.
 
     Notes:
-    Since the `encrypt_bin_img` function of vc_basic has been reused, the individual channel shares are
+    As in the `encrypt` function of vc_grayscale_halftone, the individual channel shares are
     treated as binary images. This means that, for each channel, a pixel can take a value of 0 or 1.
     In binary images, this corresponds to black or white, but in CMYK images, this trivially translates
     to 0 (white) or 1 (also white), making the difference visually indistinguishable.
     For this reason the exported combined_share will look like full white images.
     """
-    # Decompose, dither, and get individual channels (images in CMYK mode)
-    print("Starting extraction and dithering...", end="")
-    dthrd_cyan, dthrd_magenta, dthrd_yellow = decompose_and_dither(image)
-    print(" done.")
+    share1, share2 = encrypt_array(image_to_array(image, 'CMYK'), expansion, halftoning, regions, random_source,
+                                   progress, cancel)
+    return tag_shares((array_to_image(share1, 'CMYK'), array_to_image(share2, 'CMYK')), "vc_color_cmyk",
+                      {"expansion": expansion, "halftoning": halftoning})
 
-    # Generate shares for each channel (Cyan, Magenta, Yellow)
-    print("Starting encryption...")
-    share1_c, share2_c = encrypt_bin_img(dthrd_cyan)
-    share1_m, share2_m = encrypt_bin_img(dthrd_magenta)
-    share1_y, share2_y = encrypt_bin_img(dthrd_yellow)
-    print("\t 6 shares generated.")
 
-    # Combine shares to reduce them to just 2 combined shares
-    combined_image1 = combine_cmyk_channels(share1_c, share1_m, share1_y)
-    combined_image2 = combine_cmyk_channels(share2_c, share2_m, share2_y)
-    print("\t 2 combined shares generated.")
+# Function to overlay two CMYK share arrays
+def decrypt_array(share1_array, share2_array, num_bands=None, progress=None, cancel=None):
+    """
+    Overlays two CMYK share arrays. On each of the Cyan, Magenta and Yellow channels, a pixel is white (255)
+    only if it is white (non-zero) on both shares, as in the decryption of vc_grayscale_halftone.
+
+    Parameters:
+    share1_array (numpy.ndarray): The first share, with shape (height, width, 4).
+    share2_array (numpy.ndarray): The second share, with the same shape as share1_array.
+    num_bands (int): The number of bands processed in parallel. If None, the number of CPUs is used.
+    progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
+
+    Returns:
+    numpy.ndarray: The reconstructed CMYK image (np.uint8), with an empty Black channel.
+    """
+    if share1_array.shape != share2_array.shape:
+        raise ValueError(f"The shares must have the same size, got {share1_array.shape} and {share2_array.shape}.")
 
-    return combined_image1, combined_image2
+    decrypted = np.zeros(share1_array.shape, dtype=np.uint8)
 
+    def kernel(rows):
+        cmy = decrypted[rows, :, :3]
+        np.logical_and(share1_array[rows, :, :3], share2_array[rows, :, :3], out=cmy)
+        np.multiply(cmy, 255, out=cmy)
 
-def decrypt(share1, share2):
+    run_in_bands(kernel, share1_array.shape[0], num_bands, progress, cancel)
+    return decrypted
+
+
+def decrypt(share1, share2, num_bands=None, progress=None, cancel=None):
     """
     Decrypts two encrypted CMYK shares to reconstruct the original image using visual cryptography.
 
     Parameters:
     share1 (PIL.Image.Image): The first encrypted share (CMYK image).
     share2 (PIL.Image.Image): The second encrypted share (CMYK image).
+    progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
 
     Returns:
     PIL.Image.Image: A reconstructed CMYK image that combines the information from both shares.
     """
-    # Reconstruct the Cyan, Magenta, and Yellow channels by decrypting the combined shares
-    print("Starting decryption...")
-    cyan_overlap = decrypt_bin_img(share1.split()[0], share2.split()[0])
-    magenta_overlap = decrypt_bin_img(share1.split()[1], share2.split()[1])
-    yellow_overlap = decrypt_bin_img(share1.split()[2], share2.split()[2])
+    check_share_headers([share1, share2])
+    check_share_pair([share1, share2], "vc_color_cmyk")
 
-    # Combine the overlapped channels into a single CMYK image
-    decrypted = combine_cmyk_channels(cyan_overlap, magenta_overlap, yellow_overlap)
-    print("\t 2 overlapping completed.")
-
-    return decrypted
+    decrypted = decrypt_array(image_to_array(share1, 'CMYK'), image_to_array(share2, 'CMYK'), num_bands,
+                               progress, cancel)
+    return array_to_image(decrypted, 'CMYK')
 
 
 if __name__ == "__main__":
-    image_path = '../images/test.png'
-    output_path = '../images/output/'
+    image_path = 'scripts/images/test.png'
+    output_path = 'scripts/images/output/'
 
     # Load the image and convert to CMYK
     image = Image.open(image_path).convert("CMYK")
 
-    # ENCRYPT: Generate shares
+    # ENCRYPT: Generate shares (save_image writes their metadata, read back by decrypt)
     combined_image1, combined_image2 = encrypt(image)
-    combined_image1.save(output_path + "combined_share1.tiff")
-    combined_image2.save(output_path + "combined_share2.tiff")
+    save_image(combined_image1, output_path + "combined_share1.tiff", CMYK_ENCODERS[0])
+    save_image(combined_image2, output_path + "combined_share2.tiff", CMYK_ENCODERS[0])
 
     # DECRYPT: Overlay shares to reconstruct the image
     img_share1 = Image.open(output_path + "combined_share1.tiff")
     img_share2 = Image.open(output_path + "combined_share2.tiff")
 
     out = decrypt(img_share1, img_share2)
-    out.save(output_path + "overlap.tiff")
+    save_image(out, output_path + "overlap.tiff", CMYK_ENCODERS[0])
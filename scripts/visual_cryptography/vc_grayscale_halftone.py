@@ -1,6 +1,16 @@
 from PIL import Image
-import copy
+import numpy as np
+import itertools
 import secrets
+from scripts.random_grid.rg_grayscale_halftone import create_first_random_grid
+from scripts.common.halftoning import HALFTONING_METHODS, band_halftoner
+from scripts.common.tiling import run_in_bands
+from scripts.common.arrays import image_to_array, array_to_image
+from scripts.common.regions import REGIONS_REQUIREMENT, region_mask, encrypt_regions
+from scripts.common.alignment import ALIGNMENT_REQUIREMENT, align_shares
+from scripts.common.encoding import BINARY_ENCODERS, save_image
+from scripts.common.metadata import tag_shares, check_share_pair
+from scripts.common.validation import check_share_headers, BINARY_SHARE_MODES
 
 # Returns a dictionary containing function mappings and metadata for the algorithm (used by the web interface).
 def get_config():
@@ -8,10 +18,15 @@ def get_config():
         "name": "VC - Grayscale Halftone",
         "description": get_description(),
         "requirements": get_requirements(),
+        "capabilities": get_capabilities(),
         "encrypt": encrypt,
         "decrypt": decrypt,
+        "encrypt_array": encrypt_array,
+        "decrypt_array": decrypt_array,
         "extension": "png",
-        "image_type": "1"
+        "encoders": BINARY_ENCODERS,
+        "share_modes": BINARY_SHARE_MODES,
+        "image_type": "L"
     }
 
 
@@ -20,11 +35,49 @@ def get_requirements():
     return {
         "encryption": {
             "num_images": 1,
-            "parameters": {}  # No extra parameters needed
+            "parameters": {
+                "expansion": {
+                    "type": "select",
+                    "options": ["2x2", "Probabilistic"],
+                    "default": "2x2",
+                    "label": "Choose the pixel expansion of the shares (Probabilistic keeps the original size):"
+                },
+                "halftoning": {
+                    "type": "select",
+                    "options": HALFTONING_METHODS,
+                    "default": "Floyd-Steinberg",
+                    "label": "Choose the halftoning method:"
+                },
+                "regions": REGIONS_REQUIREMENT
+            }
         },
         "decryption": {
             "num_images": 2,
-            "parameters": {}  # No extra parameters needed
+            "parameters": {
+                "alignment": ALIGNMENT_REQUIREMENT
+            }
+        }
+    }
+
+
+# Defines how the encryption/decryption can be executed (used by the dispatcher of the web interface).
+def get_capabilities():
+    return {
+        "encryption": {
+            "pixel_expansion": {"expansion": {"2x2": 2, "Probabilistic": 1}},
+            "cross_row_state": {"halftoning": {"Floyd-Steinberg": True, "Bayer": False, "Blue noise": False}},
+            "bit_packed_io": True,
+            "dtype": "uint8",
+            "max_safe_pixels": 4_000_000,
+            "bands": False
+        },
+        "decryption": {
+            "pixel_expansion": 1,
+            "cross_row_state": {"alignment": {"None": False, "Translation": True, "Rotation and scale": True}},
+            "bit_packed_io": True,
+            "dtype": "uint8",
+            "max_safe_pixels": 16_000_000,
+            "bands": True
         }
     }
 
@@ -32,7 +85,7 @@ def get_requirements():
 # Returns a dictionary containing the description and reference links for the algorithm.
 def get_description():
     return {
-        "text": "This (2,2) Visual Cryptography Scheme is one of the simplest implementations of a VC scheme. This script allows for the encryption and decryption of binary images (composed of black and white pixels) as well as grayscale images. In the case of grayscale images, they are first converted into binary images using the Floyd-Steinberg dithering process before applying the classic VC scheme.",
+        "text": "This (2,2) Visual Cryptography Scheme is one of the simplest implementations of a VC scheme. This script allows for the encryption and decryption of binary images (composed of black and white pixels) as well as grayscale images. In the case of grayscale images, they are first converted into binary images using the Floyd-Steinberg dithering process (or, alternatively, Bayer or blue-noise ordered dithering) before applying the classic VC scheme.",
         "links": [
             {"text": "Adi Shamir",
              "url": "https://doi.org/10.1145/359168.359176"},
@@ -50,173 +103,361 @@ def get_description():
 white_matrix = [[1, 1, 0, 0], [1, 1, 0, 0]]
 black_matrix = [[1, 1, 0, 0], [0, 0, 1, 1]]
 
+# All the distinct column permutations of a basis matrix row, i.e. the 6 possible subpixel patterns of a share.
+# Each pattern lists the subpixels of the 2x2 block in the order (top-left, bottom-left, top-right, bottom-right)
+subpixel_patterns = np.array(sorted(set(itertools.permutations(white_matrix[0]))), dtype=np.uint8)
+
+# The same patterns as 4-bit codes (top-left subpixel in the highest bit), expanded with bit operations
+pattern_codes = np.packbits(subpixel_patterns, axis=1)[:, 0] >> 4
+
+
+# Function to draw random indices in bulk
+def random_indices(count, num_values, random_source=secrets.token_bytes):
+    """
+    Draws uniformly distributed indices from random bytes, rejecting the bytes that would bias the modulo.
+
+    Parameters:
+    count (int): The number of indices to draw.
+    num_values (int): The number of possible indices (at most 256).
+    random_source (callable): A function returning the requested number of random bytes.
+                              The system's cryptographic random number generator is used by default.
+
+    Returns:
+    numpy.ndarray: An array of `count` indices in the range [0, num_values) (np.uint8).
+    """
+    limit = 256 - 256 % num_values  # Bytes above this limit are rejected to avoid modulo bias
+    chunks = []
+    drawn = 0
+
+    while drawn < count:
+        missing = count - drawn
+        random_bytes = np.frombuffer(random_source(missing * 256 // limit + missing // 32 + 8), dtype=np.uint8)
+        chunks.append(random_bytes[random_bytes < limit] % num_values)
+        drawn += chunks[-1].size
+
+    # A single draw is almost always enough: its indices are not copied
+    return (chunks[0] if len(chunks) == 1 else np.concatenate(chunks))[:count]
+
 
-# Function to map a pixel value from RGB encoding (0 = black, 1 = white) to VC encoding
-def map_rgb_to_bit(rgb_value):
+# Function to draw random subpixel patterns in bulk
+def random_pattern_indices(count, random_source=secrets.token_bytes):
     """
-    Maps the pixel value from RGB encoding to visual cryptography (VC) encoding.
-    In this mapping, a pixel value of 0 (black) is converted to 1, and any non-zero value (white) is converted to 0.
+    Draws uniformly distributed indices of subpixel_patterns, equivalent to a random permutation of the columns
+    of a basis matrix once per pixel, using bulk draws of random bytes.
 
     Parameters:
-    rgb_value (int): The pixel value in RGB format (0 for black, 255 for white).
+    count (int): The number of indices to draw.
+    random_source (callable): A function returning the requested number of random bytes.
+                              The system's cryptographic random number generator is used by default.
 
     Returns:
-    int: 1 for black, 0 for white (VC encoding).
+    numpy.ndarray: An array of `count` indices in the range [0, len(subpixel_patterns)).
     """
-    return 1 if rgb_value == 0 else 0
+    return random_indices(count, len(subpixel_patterns), random_source)
 
 
-# Function to map a pixel value from VC encoding to RGB encoding
-def map_bit_to_rgb(vc_value):
+# Function to place the subpixel patterns of each pixel into the 2x2 blocks of a share
+def expand_subpixels(patterns):
     """
-    Maps the VC encoding value (1 = black, 0 = white) back to RGB encoding.
-    In this mapping, a VC value of 1 (black) is converted to RGB value 0 (black),
-    and a VC value of 0 (white) is converted to RGB value 255 (white).
+    Places the subpixel pattern of each pixel into the corresponding 2x2 block of an expanded share.
 
     Parameters:
-    vc_value (int): The pixel value in VC encoding (1 for black, 0 for white).
+    patterns (numpy.ndarray): The subpixel patterns, with shape (height, width, 4), ordered as
+                              (top-left, bottom-left, top-right, bottom-right).
 
     Returns:
-    int: 0 for black, 255 for white (RGB encoding).
+    numpy.ndarray: The expanded share, with shape (2 * height, 2 * width).
     """
-    return 0 if vc_value == 1 else 255
+    height, width = patterns.shape[:2]
 
+    # patterns[y, x, 2 * column + row] is the subpixel (2 * y + row, 2 * x + column) of the share
+    blocks = patterns.reshape(height, width, 2, 2).transpose(0, 3, 1, 2)
+    return blocks.reshape(2 * height, 2 * width)
 
-# Function to randomly permute the columns of a matrix
-def random_col_permutation(matrix):
+
+# Function to write random subpixel patterns into the 2x2 blocks of a share
+def fill_subpixels(share, indices):
     """
-    Randomly permutes the columns of a given matrix.
+    Writes the subpixel pattern of each pixel into its 2x2 block, as expand_subpixels, but from the 4-bit codes
+    of the patterns: one strided write per subpixel position, without a (height, width, 4) temporary array.
 
     Parameters:
-    matrix (list of lists): A 2D matrix to be permuted.
+    share (numpy.ndarray): The share to be filled (bool or np.uint8), with shape (2 * height, 2 * width) or
+                           (2 * height, 2 * width, channels). It can be a view (e.g. the CMY channels of a share).
+    indices (numpy.ndarray): The indices of subpixel_patterns, with shape (height, width) or (height, width, channels).
+    """
+    codes = pattern_codes[indices]
+
+    # Bits 8, 4, 2 and 1 are the top-left, bottom-left, top-right and bottom-right subpixels
+    for bit, (row, column) in zip((8, 4, 2, 1), ((0, 0), (1, 0), (0, 1), (1, 1))):
+        np.not_equal(codes & bit, 0, out=share[row::2, column::2])
 
+
+# Function to build the subpixels of two horizontally adjacent white pixels, for every pair of random patterns
+def white_pair_rows():
+    """
     Returns:
-    list of lists: A new matrix with columns permuted randomly.
+    numpy.ndarray: The rows of subpixels of the 2x2 blocks of the two pixels (4 contiguous booleans of a share,
+                   stored as one np.uint32), with shape (pairs of patterns, 2 rows).
     """
-    n_rows = len(matrix)
-    n_cols = len(matrix[0])
-    new_matrix = copy.deepcopy(matrix)
+    patterns = subpixel_patterns.reshape(-1, 2, 2).transpose(0, 2, 1).astype(bool)  # [pattern, row, column]
+    count = len(patterns)
 
-    # Generate a random permutation of column indices.
-    # Note that: secrets.SystemRandom is a class that uses the system's cryptographic random number generator
-    col_indices = list(range(n_cols))
-    secrets.SystemRandom().shuffle(col_indices)
+    pairs = np.zeros((count, count, 2, 4), dtype=bool)  # [left pattern, right pattern, row, subpixel]
+    pairs[..., :2] = patterns[:, None]
+    pairs[..., 2:] = patterns[None, :]
+    return np.ascontiguousarray(pairs.reshape(count ** 2, 2, 4)).view(np.uint32)[..., 0]
 
-    # Apply the column permutation to the matrix
-    for i in range(n_rows):
-        for j in range(n_cols):
-            new_matrix[i][j] = matrix[i][col_indices[j]]
 
-    return new_matrix
+WHITE_PAIR_ROWS = white_pair_rows()
 
 
-# Function to populate the subpixels for both shares based on the matrix
-def populate_subpixels(share1, share2, i, j, matrix):
+# Function to encrypt a white page, without halftoning
+def encrypt_blank(size, expansion, random_source=secrets.token_bytes):
     """
-    Populates the subpixels for two shares based on a given 2x2 matrix.
-    Each share's corresponding pixels are set according to the values in the matrix.
+    White pixels get the same subpixels on both shares, so the second share is a copy of the first one. With the
+    2x2 expansion, one random pair of patterns is drawn for two adjacent pixels (one byte for both), and each row
+    of subpixels of the pair is written with a single lookup (see white_pair_rows).
 
     Parameters:
-    share1 (PIL.Image.Image): The first share image.
-    share2 (PIL.Image.Image): The second share image.
-    i (int): The x-coordinate of the pixel.
-    j (int): The y-coordinate of the pixel.
-    matrix (list of lists): A 2x2 matrix containing pixel values for the subpixels.
+    size (tuple): The (height, width) of the page.
+    expansion (str): "2x2" to expand each pixel into four subpixels, "Probabilistic" to keep the original size.
+    random_source (callable): A function returning the requested number of random bytes.
+
+    Returns:
+    tuple: The two shares, as returned by encrypt_array for a white page.
     """
-    # Populate subpixels for Share1
-    share1.putpixel((i * 2, j * 2), matrix[0][0])
-    share1.putpixel((i * 2, j * 2 + 1), matrix[0][1])
-    share1.putpixel((i * 2 + 1, j * 2), matrix[0][2])
-    share1.putpixel((i * 2 + 1, j * 2 + 1), matrix[0][3])
+    if expansion.upper() == "2X2":
+        height, width = size
+        pairs = -(-width // 2)  # A page of odd width is drawn with one more column, cut off below
+        indices = random_indices(height * pairs, len(WHITE_PAIR_ROWS), random_source).reshape(height, pairs)
 
-    # Populate subpixels for Share2
-    share2.putpixel((i * 2, j * 2), matrix[1][0])
-    share2.putpixel((i * 2, j * 2 + 1), matrix[1][1])
-    share2.putpixel((i * 2 + 1, j * 2), matrix[1][2])
-    share2.putpixel((i * 2 + 1, j * 2 + 1), matrix[1][3])
+        share1 = np.empty((2 * height, 4 * pairs), dtype=bool)
+        subpixel_rows = share1.reshape(height, 2, 4 * pairs).view(np.uint32)  # [y, row, pair]
+        for row in range(2):
+            subpixel_rows[:, row] = WHITE_PAIR_ROWS[indices, row]
+        if 2 * pairs != width:
+            share1 = np.ascontiguousarray(share1[:, :2 * width])
+    else:
+        share1 = create_first_random_grid(size, random_source).astype(bool)
 
+    return share1, share1.copy()
 
-# Function to encrypt the image into two shares
-def encrypt(image):
+
+# Function to encrypt a binary array into two shares with a 2x2 pixel expansion
+def encrypt_expanded(black_pixels, random_source=secrets.token_bytes, progress=None, cancel=None):
     """
-    Encrypts the input image using visual cryptography, generating two shares.
+    Encrypts a binary image using visual cryptography, generating two shares.
 
-    The image is processed pixel by pixel, and each pixel is encoded using either a white or black matrix,
-    which is then randomly permuted. The resulting subpixels are placed into two separate share images.
+    Each pixel is encoded using either a white or black matrix, which is randomly permuted. A random permutation
+    of the basis matrix is drawn for each pixel (at once, for the whole image), its first row gives the subpixels
+    of the first share, and its second row (the same row for white pixels, the complementary row for black
+    pixels) gives the subpixels of the second share. The shares are then filled in horizontal bands.
 
     Parameters:
-    image (PIL.Image.Image): The input image to be encrypted (must be black and white).
+    black_pixels (numpy.ndarray): A boolean array, True for black pixels and False for white ones.
+    random_source (callable): A function returning the requested number of random bytes.
+    progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
 
     Returns:
-    tuple: A tuple containing two share images (share1, share2).
+    tuple: A tuple containing the two shares as boolean arrays, with shape (2 * height, 2 * width).
+    """
+    height, width = black_pixels.shape
+    indices = random_pattern_indices(black_pixels.size, random_source).reshape(black_pixels.shape)
+
+    share1 = np.empty((2 * height, 2 * width), dtype=bool)
+    share2 = np.empty((2 * height, 2 * width), dtype=bool)
+
+    def kernel(rows):
+        patterns = subpixel_patterns[indices[rows]]
+        subpixel_rows = slice(2 * rows.start, 2 * rows.stop)
+
+        share1[subpixel_rows] = expand_subpixels(patterns)
+        share2[subpixel_rows] = expand_subpixels(patterns ^ black_pixels[rows, :, np.newaxis])  # Complementary row
+
+    run_in_bands(kernel, height, progress=progress, cancel=cancel)
+    return share1, share2
+
+
+# Function to encrypt a binary array into two shares of the same size as the image (no pixel expansion)
+def encrypt_probabilistic(black_pixels, random_source=secrets.token_bytes, progress=None, cancel=None):
     """
-    share1 = Image.new("1", (image.size[0] * 2, image.size[1] * 2))
-    share2 = Image.new("1", (image.size[0] * 2, image.size[1] * 2))
+    Encrypts a binary image using probabilistic (non-expansible) visual cryptography, generating two shares.
 
-    for i in range(image.size[0]):
-        for j in range(image.size[1]):
-            # Get the pixel value and map it to VC encoding
-            source_pixel_rgb = image.getpixel((i, j))
-            source_pixel_vc = map_rgb_to_bit(source_pixel_rgb)
+    Instead of expanding each pixel into the four subpixels of a basis matrix, a single column of the
+    (white or black) basis matrix is chosen at random for every pixel. White pixels therefore get the same
+    random subpixel on both shares, while black pixels get complementary subpixels. Once overlapped, black
+    pixels are always black and white pixels are black with probability 1/2, so the contrast is the same as
+    the 2x2 scheme but the shares keep the resolution of the original image.
 
-            # For white pixels
-            if source_pixel_vc == 0:
-                random_white_matrix = random_col_permutation(white_matrix)
-                populate_subpixels(share1, share2, i, j, random_white_matrix)
+    Parameters:
+    black_pixels (numpy.ndarray): A boolean array, True for black pixels and False for white ones.
+    random_source (callable): A function returning the requested number of random bytes.
+    progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
 
-            # For black pixels
-            else:
-                random_black_matrix = random_col_permutation(black_matrix)
-                populate_subpixels(share1, share2, i, j, random_black_matrix)
+    Returns:
+    tuple: A tuple containing the two shares as boolean arrays, with the same shape as black_pixels.
+    """
+    # Draw one random column of the basis matrix per pixel
+    share1 = create_first_random_grid(black_pixels.shape, random_source).astype(bool)
+    share2 = np.empty_like(share1)
 
+    def kernel(rows):
+        # Complementary subpixel for black pixels, same subpixel for white ones
+        np.bitwise_xor(share1[rows], black_pixels[rows], out=share2[rows])
+
+    run_in_bands(kernel, black_pixels.shape[0], progress=progress, cancel=cancel)
     return share1, share2
 
 
+# Function to encrypt an image array into two shares
+def encrypt_array(image_array, expansion="2x2", halftoning="Floyd-Steinberg", regions=None,
+                  random_source=secrets.token_bytes, progress=None, cancel=None):
+    """
+    Encrypts an image array using the specified pixel expansion ("2x2" or "Probabilistic").
+
+    Parameters:
+    image_array (numpy.ndarray): The grayscale image (np.uint8), or a binary image (bool) which is not halftoned.
+    expansion (str): "2x2" to expand each pixel into four subpixels, "Probabilistic" to keep the original size.
+    halftoning (str): The method used to convert the image into binary ("Floyd-Steinberg", "Bayer" or "Blue noise").
+    regions: The regions of interest (see region_mask in scripts/common/regions.py). If given, only they are
+             halftoned and encrypted, and the rest of the shares decrypts to white. None for the whole image.
+    random_source (callable): A function returning the requested number of random bytes.
+                              The system's cryptographic random number generator is used by default.
+    progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
+
+    Returns:
+    tuple: A tuple containing the two shares as boolean arrays (True for white subpixels).
+    """
+    if expansion.upper() == "2X2":
+        encrypt_binary = encrypt_expanded
+    elif expansion.upper() == "PROBABILISTIC":
+        encrypt_binary = encrypt_probabilistic
+    else:
+        raise ValueError(f"Invalid pixel expansion: {expansion}. Choose '2x2' or 'Probabilistic'.")
+
+    mask = region_mask(image_array.shape[:2], regions)
+    if mask is not None:
+        # Outside the regions, the shares of a white page (the white matrix everywhere), drawn in bulk
+        return encrypt_regions(image_array, mask,
+                               lambda block: encrypt_array(block, expansion, halftoning, None, random_source),
+                               lambda: encrypt_blank(mask.shape, expansion, random_source),
+                               2 if encrypt_binary is encrypt_expanded else 1,
+                               True if image_array.dtype == bool else 255, progress, cancel)
+
+    # Black pixels are encoded with the black matrix (VC value 1), white pixels with the white matrix (VC value 0)
+    black_pixels = ~band_halftoner(image_array, halftoning)(slice(None))
+    return encrypt_binary(black_pixels, random_source, progress, cancel)
+
+
+# Function to encrypt the image into two shares
+def encrypt(image, expansion="2x2", halftoning="Floyd-Steinberg", regions=None, random_source=secrets.token_bytes,
+            progress=None, cancel=None):
+    """
+    Encrypts the input image using the specified pixel expansion ("2x2" or "Probabilistic").
+
+    Parameters:
+    image (PIL.Image.Image): The input image to be encrypted (black and white or grayscale).
+    expansion (str): "2x2" to expand each pixel into four subpixels, "Probabilistic" to keep the original size.
+    halftoning (str): The method used to convert the image into binary ("Floyd-Steinberg", "Bayer" or "Blue noise").
+                      Binary images are left unchanged by every method.
+    regions: The regions of interest (see region_mask in scripts/common/regions.py). If given, only they are
+             halftoned and encrypted, and the rest of the shares decrypts to white. None for the whole image.
+    random_source (callable): A function returning the requested number of random bytes.
+                              The system's cryptographic random number generator is used by default.
+    progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
+
+    Returns:
+    tuple: A tuple containing two share images (share1, share2).
+    """
+    image_array = image_to_array(image, None if image.mode == '1' else 'L')
+    share1, share2 = encrypt_array(image_array, expansion, halftoning, regions, random_source, progress, cancel)
+
+    return tag_shares((array_to_image(share1, '1'), array_to_image(share2, '1')), "vc_grayscale_halftone",
+                      {"expansion": expansion, "halftoning": halftoning})
+
+
+# Function to overlay two share arrays
+def decrypt_array(share1_array, share2_array, num_bands=None, progress=None, cancel=None):
+    """
+    Overlays two share arrays using the OR operation in VC encoding (a subpixel is black if it is black
+    on at least one share), i.e. an AND of the white subpixels.
+
+    Parameters:
+    share1_array (numpy.ndarray): The first share (bool, or any integer type where non-zero is white).
+    share2_array (numpy.ndarray): The second share, with the same shape as share1_array.
+    num_bands (int): The number of bands processed in parallel. If None, the number of CPUs is used.
+    progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
+
+    Returns:
+    numpy.ndarray: The decrypted image as a boolean array (True for white pixels).
+    """
+    if share1_array.shape != share2_array.shape:
+        raise ValueError(f"The shares must have the same size, got {share1_array.shape} and {share2_array.shape}.")
+
+    out = np.empty(share1_array.shape, dtype=bool)
+
+    def kernel(rows):
+        np.logical_and(share1_array[rows], share2_array[rows], out=out[rows])
+
+    run_in_bands(kernel, share1_array.shape[0], num_bands, progress, cancel)
+    return out
+
+
 # Function to decrypt the shares and reconstruct the original image
-def decrypt(share1, share2):
+def decrypt(share1, share2, alignment="None", num_bands=None, progress=None, cancel=None):
     """
     Decrypts the two shares using the OR operation to reconstruct the original image.
 
     Parameters:
     share1 (PIL.Image.Image): The first share image.
     share2 (PIL.Image.Image): The second share image.
+    alignment (str): "None" for shares with the same pixel grid, or "Translation" or "Rotation and scale" to align
+                     the second share to the first one (e.g. printed and scanned shares, see align_shares in
+                     scripts/common/alignment.py).
+    progress (callable): A function called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): The cancellation token. When it is set, the operation raises OperationCancelled.
 
     Returns:
     PIL.Image.Image: The decrypted image, reconstructed from the two shares.
     """
-    out = Image.new("1", (share1.size[0], share1.size[1]))
+    share1, share2 = align_shares([share1, share2], alignment)
+    check_share_headers([share1, share2])
+    check_share_pair([share1, share2], "vc_grayscale_halftone", allow_missing=alignment.upper() != "NONE")
 
-    for i in range(share1.size[0]):
-        for j in range(share1.size[1]):
-            # Overlay shares using OR operation
-            share1_vc_value = map_rgb_to_bit(share1.getpixel((i, j)))
-            share2_vc_value = map_rgb_to_bit(share2.getpixel((i, j)))
-            out_vc_value = share1_vc_value | share2_vc_value
-
-            # Map VC encoding back to RGB
-            share1.putpixel((i, j), map_bit_to_rgb(share1_vc_value))
-            share2.putpixel((i, j), map_bit_to_rgb(share2_vc_value))
-            out.putpixel((i, j), map_bit_to_rgb(out_vc_value))
-
-    return out
+    out = decrypt_array(image_to_array(share1), image_to_array(share2), num_bands, progress, cancel)
+    return array_to_image(out, '1')
 
 
 if __name__ == "__main__":
-    image_path = '../images/test.png'
-    output_path = '../images/output/'
+    image_path = 'scripts/images/test.png'
+    output_path = 'scripts/images/output/'
 
     # Load and convert the input image to binary
     image = Image.open(image_path).convert('1')
-    image.save(output_path + "halftoned.png")
+    save_image(image, output_path + "halftoned.png", "PNG")
 
-    # ENCRYPT: Generate shares
+    # ENCRYPT: Generate shares (save_image writes their metadata, read back by decrypt)
     share1, share2 = encrypt(image)
-    share1.save(output_path + "share1.png")
-    share2.save(output_path + "share2.png")
+    save_image(share1, output_path + "share1.png", BINARY_ENCODERS[0])
+    save_image(share2, output_path + "share2.png", BINARY_ENCODERS[0])
 
     # DECRYPT: Overlay shares to reconstruct the image
     img_share1 = Image.open(output_path + "share1.png")
     img_share2 = Image.open(output_path + "share2.png")
 
     out = decrypt(img_share1, img_share2)
-    out.save(output_path + "overlap.png")
+    save_image(out, output_path + "overlap.png", "PNG")
+
+    # ENCRYPT/DECRYPT without pixel expansion
+    share1, share2 = encrypt(image, "Probabilistic")
+    save_image(share1, output_path + "share1_probabilistic.png", BINARY_ENCODERS[0])
+    save_image(share2, output_path + "share2_probabilistic.png", BINARY_ENCODERS[0])
+
+    out = decrypt(Image.open(output_path + "share1_probabilistic.png"), Image.open(output_path + "share2_probabilistic.png"))
+    save_image(out, output_path + "overlap_probabilistic.png", "PNG")
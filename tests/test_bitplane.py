@@ -0,0 +1,19 @@
+import numpy as np
+import pytest
+from scripts.random_grid import rg_grayscale_bitplane
+
+
+@pytest.mark.parametrize("dtype", [np.uint8, np.uint16])
+@pytest.mark.parametrize("all_planes", [True, False])
+def test_decryption_recovers_the_encrypted_bitplanes(dtype, all_planes):
+    image = np.random.default_rng(0).integers(0, np.iinfo(dtype).max + 1, (37, 53)).astype(dtype)
+    number_of_MSBP = np.iinfo(dtype).bits if all_planes else 3
+    mask = rg_grayscale_bitplane.msb_mask(number_of_MSBP, dtype)
+
+    RG1_final, RG2_final = rg_grayscale_bitplane.encrypt_array(image, number_of_MSBP, num_bands=2)
+    decrypted = rg_grayscale_bitplane.decrypt_array(RG1_final, RG2_final, number_of_MSBP, num_bands=2)
+
+    # With all the bitplanes the source is recovered exactly, otherwise only its most significant bitplanes
+    assert np.array_equal(decrypted & mask, image & mask)
+    if all_planes:
+        assert np.array_equal(decrypted, image)
@@ -0,0 +1,122 @@
+import os
+import subprocess
+import sys
+import numpy as np
+import pytest
+from scripts.common import kernels
+from scripts.visual_cryptography import vc_color_cmyk
+
+SHAPES = [(1, 1), (1, 7), (7, 1), (37, 53), (300, 200)]  # (height, width) of the test channels
+
+
+# Function to dither the channels of an image with the pure Python reference (floyd_steinberg_row)
+def reference_dithering(pixels):
+    """
+    Parameters:
+    pixels (numpy.ndarray): The pixel values (np.uint8), with shape (height, width, channels).
+
+    Returns:
+    numpy.ndarray: A boolean array with the same shape, True where the dithered pixel is black.
+    """
+    black = np.empty(pixels.shape, dtype=bool)
+
+    for channel in range(pixels.shape[2]):
+        next_row = pixels[0, :, channel].tolist()
+        for y in range(pixels.shape[0]):
+            current_row = next_row
+            next_row = pixels[y + 1, :, channel].tolist() if y < pixels.shape[0] - 1 else None
+            black[y, :, channel] = vc_color_cmyk.floyd_steinberg_row(current_row, next_row)
+
+    return black
+
+
+# Function to dither an image block by block with a backend, carrying the error below each block to the next one
+def block_dithering(pixels, block_rows, backend):
+    """
+    The same loop as vc_color_cmyk.dither_cmy_rows, with any number of rows per block.
+
+    Parameters:
+    pixels (numpy.ndarray): The pixel values (np.uint8), with shape (height, width, channels).
+    block_rows (int): The number of rows dithered at once.
+    backend (str): The kernel backend.
+
+    Returns:
+    numpy.ndarray: A boolean array with the same shape, True where the dithered pixel is black.
+    """
+    height = pixels.shape[0]
+    blocks = []
+    carry = None
+
+    for top in range(0, height, block_rows):
+        num_rows = min(block_rows, height - top)
+        work = pixels[top:top + num_rows + 1].astype(np.int32, order='C')
+        if carry is not None:
+            work[0] = carry
+
+        blocks.append(kernels.floyd_steinberg(work, num_rows, backend=backend))
+        carry = work[num_rows] if num_rows < work.shape[0] else None
+
+    return np.concatenate(blocks)
+
+
+# Function to make the test pixels: random values (every error value), or the values around the threshold
+def make_pixels(shape, kind, channels=3):
+    """
+    Parameters:
+    shape (tuple): The (height, width) of the image.
+    kind (str): "random", or "threshold" for the values 0, 127, 128 (black), 129 (white) and 255.
+    channels (int): The number of channels.
+
+    Returns:
+    numpy.ndarray: The pixel values (np.uint8), with shape (height, width, channels), the same at every run.
+    """
+    rng = np.random.default_rng([*shape, channels, kind == "random"])
+    if kind == "random":
+        return rng.integers(0, 256, (*shape, channels), dtype=np.uint8)
+    return rng.choice(np.array([0, 127, 128, 129, 255], dtype=np.uint8), (*shape, channels))
+
+
+@pytest.mark.parametrize("backend", kernels.available_backends())
+@pytest.mark.parametrize("shape", SHAPES)
+@pytest.mark.parametrize("kind", ["random", "threshold"])
+def test_single_block_matches_reference(backend, shape, kind):
+    pixels = make_pixels(shape, kind)
+    work = pixels.astype(np.int32, order='C')
+
+    assert np.array_equal(kernels.floyd_steinberg(work, shape[0], backend=backend), reference_dithering(pixels))
+
+
+@pytest.mark.parametrize("backend", kernels.available_backends())
+@pytest.mark.parametrize("shape", SHAPES)
+@pytest.mark.parametrize("block_rows", [1, 2, 5, vc_color_cmyk.DITHER_BLOCK_ROWS])
+def test_blocks_carry_the_error(backend, shape, block_rows):
+    pixels = make_pixels(shape, "random")
+
+    assert np.array_equal(block_dithering(pixels, block_rows, backend), reference_dithering(pixels))
+
+
+@pytest.mark.parametrize("backend", kernels.available_backends())
+def test_cmy_rows_cross_the_block_boundary(backend, monkeypatch):
+    # More rows than a block, so that the error of the last row of the first block is carried to the second one
+    pixels = make_pixels((vc_color_cmyk.DITHER_BLOCK_ROWS + 3, 41), "random", channels=4)
+    monkeypatch.setattr(kernels, "KERNEL_BACKEND", backend)
+
+    assert np.array_equal(np.array(list(vc_color_cmyk.dither_cmy_rows(pixels))), reference_dithering(pixels[..., :3]))
+
+
+def test_invalid_backend():
+    with pytest.raises(ValueError):
+        kernels.floyd_steinberg(np.zeros((1, 1, 1), dtype=np.int32), 1, backend="fortran")
+    with pytest.raises(ValueError):
+        kernels.set_kernel_backend("fortran")
+
+
+@pytest.mark.parametrize("value", ["fortran", "NumPy"] + ([] if kernels.numba is not None else ["numba"]))
+def test_invalid_environment_backend(value):
+    environment = dict(os.environ, VISUALCRYPTO_KERNEL_BACKEND=value)
+    result = subprocess.run([sys.executable, "-c", "import scripts.common.kernels"], env=environment,
+                            capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    assert result.returncode != 0
+    assert "Invalid VISUALCRYPTO_KERNEL_BACKEND" in result.stderr
@@ -0,0 +1,78 @@
+import os
+import sys
+import threading
+import time
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "web_app"))
+
+from jobs import ApiError  # noqa: E402
+from scheduling import MIN_RECORDED_WORK, CostModel, FairScheduler  # noqa: E402
+
+ALGORITHM = "rg_grayscale_additive_SS"
+OPERATION = "encryption"
+
+
+def test_small_jobs_do_not_inflate_the_rate():
+    cost_model = CostModel({(ALGORITHM, OPERATION): 0.02})
+
+    # Thumbnails: 50 ms of fixed overhead for a few kilopixels, i.e. seconds per megapixel in the tens
+    for _ in range(20):
+        cost_model.record(ALGORITHM, OPERATION, 0.004, 0.05)
+    assert cost_model.estimate(ALGORITHM, OPERATION, 100) == pytest.approx(2.0)
+
+    # A large job admitted on that estimate still fits, and its own measurement is recorded
+    scheduler = FairScheduler(cost_model, fast_slots=1, slow_slots=1, slow_seconds=5, max_seconds=10)
+    assert scheduler.check(ALGORITHM, OPERATION, 100) == pytest.approx(2.0)
+    cost_model.record(ALGORITHM, OPERATION, MIN_RECORDED_WORK * 10, MIN_RECORDED_WORK * 10 * 0.03)
+    assert cost_model.estimate(ALGORITHM, OPERATION, 100) > 2.0
+
+
+# Function to run an empty job in a slot
+def run_in_slot(scheduler, client, work):
+    with scheduler.slot(client, ALGORITHM, OPERATION, work, timeout=5, record=False):
+        pass
+
+
+# Function to hold the only slot of the fast lane until the returned event is set
+def hold_slot(scheduler, client):
+    granted, release = threading.Event(), threading.Event()
+
+    def run():
+        with scheduler.slot(client, ALGORITHM, OPERATION, 1, record=False):
+            granted.set()
+            release.wait()
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    granted.wait()
+    return release, thread
+
+
+@pytest.mark.parametrize("queued_before", [0, 1])
+def test_abandoned_job_does_not_delay_its_client(queued_before):
+    scheduler = FairScheduler(CostModel({(ALGORITHM, OPERATION): 0.02}), fast_slots=1, slow_slots=1,
+                              slow_seconds=5, max_seconds=10)
+    lane = scheduler.lanes["fast"]
+    release, thread = hold_slot(scheduler, "a")
+
+    # A client whose jobs time out in the queue (with or without an earlier job of the same client in the queue)
+    waiting = []
+    if queued_before:
+        waiting.append(threading.Thread(target=run_in_slot, args=(scheduler, "b", 10)))
+        waiting[0].start()
+        while "b" not in lane.finish_tags:
+            time.sleep(0.01)
+    tag_before = lane.finish_tags.get("b")
+
+    for _ in range(3):
+        with pytest.raises(ApiError) as error:
+            with scheduler.slot("b", ALGORITHM, OPERATION, 100, timeout=0.05):
+                pass
+        assert error.value.status_code == 503
+    assert lane.finish_tags.get("b") == tag_before
+
+    release.set()
+    thread.join()
+    for waiting_thread in waiting:
+        waiting_thread.join()
@@ -1,5 +1,13 @@
+import numpy as np
+from PIL import Image, ImageMode
+
 from scripts.visual_cryptography import vc_grayscale_halftone, vc_color_cmyk
 from scripts.random_grid import rg_grayscale_halftone, rg_grayscale_bitplane, rg_grayscale_additive_SS, rg_color_additive_SS
+from scripts.random_grid import rg_grayscale16_bitplane, rg_grayscale16_additive_SS
+from scripts.common.arrays import convert_image
+from scripts.common.halftoning import BLUE_NOISE_SIZE
+from scripts.common.regions import crop_regions
+from scripts.common.randomness import random_source
 
 # Using get_config() to retrieve the dictionaries with function mappings
 ALGORITHM_MODULES = {
@@ -7,7 +15,205 @@ ALGORITHM_MODULES = {
     "rg_grayscale_additive_SS": rg_grayscale_additive_SS.get_config(),
     "rg_grayscale_halftone": rg_grayscale_halftone.get_config(),
     "rg_grayscale_bitplane": rg_grayscale_bitplane.get_config(),
+    "rg_grayscale16_additive_SS": rg_grayscale16_additive_SS.get_config(),
+    "rg_grayscale16_bitplane": rg_grayscale16_bitplane.get_config(),
 
     "vc_grayscale_halftone": vc_grayscale_halftone.get_config(),
     "vc_color_cmyk": vc_color_cmyk.get_config(),
 }
+
+PARALLEL_MIN_PIXELS = 512 * 512  # Below this size a single band is faster than handing the bands to the thread pool
+TILE_BYTES = 64 * 2 ** 20  # Memory of the pixels of one tile (the input and the outputs), for the tiled engine
+TILE_ROW_ALIGNMENT = BLUE_NOISE_SIZE  # The tiles start on multiples of the ordered-dithering masks, which keep their phase
+
+
+# Function to get the capabilities of an operation for the selected parameters
+def get_capabilities(algorithm_module, operation, param_values):
+    """
+    Reads the capabilities of an operation (get_config()["capabilities"]). A capability given as
+    {parameter: {option: value}} depends on the parameters of the request, and is resolved here.
+
+    Parameters:
+    algorithm_module (dict): The configuration of the scheme (a value of ALGORITHM_MODULES).
+    operation (str): "encryption" or "decryption".
+    param_values (dict): The parameters of the request.
+
+    Returns:
+    dict: The capabilities (pixel_expansion, cross_row_state, bit_packed_io, dtype, max_safe_pixels, bands).
+    """
+    capabilities = {}
+    for name, value in algorithm_module["capabilities"][operation].items():
+        if isinstance(value, dict):
+            (parameter, options), = value.items()
+            if param_values.get(parameter) not in options:
+                raise ValueError(f"Invalid value for {parameter}: {param_values.get(parameter)}")
+            value = options[param_values[parameter]]
+        capabilities[name] = value
+
+    return capabilities
+
+
+# Function to choose how an operation is executed
+def choose_engine(capabilities, size):
+    """
+    Chooses the execution engine of an operation:
+    - "tiled": the image is larger than max_safe_pixels and no state crosses its rows, so it is processed in
+      tiles of rows, one after the other (each in parallel bands if the scheme allows it); the temporary arrays
+      of the scheme are bounded by the size of a tile.
+    - "parallel": the scheme splits the rows into bands processed by the thread pool (a single band for small images).
+    - "streaming": the scheme processes the rows in order in a single pass (e.g. the per-row loops of the CMYK scheme).
+
+    Parameters:
+    capabilities (dict): The capabilities of the operation (see get_capabilities).
+    size (tuple): The (width, height) of the input images.
+
+    Returns:
+    str: "tiled", "parallel" or "streaming".
+    """
+    if size[0] * size[1] > capabilities["max_safe_pixels"] and not capabilities["cross_row_state"]:
+        return "tiled"
+    return "parallel" if capabilities["bands"] else "streaming"
+
+
+# Function to check whether a decryption aligns its shares (e.g. printed and scanned shares)
+def aligns_shares(operation, param_values):
+    """
+    Parameters:
+    operation (str): "encryption" or "decryption".
+    param_values (dict): The parameters of the request.
+
+    Returns:
+    bool: True if the scheme aligns the shares (the "alignment" parameter, see scripts/common/alignment.py): their
+          sizes and modes may differ, and the scheme binarizes them itself.
+    """
+    return operation == "decryption" and param_values.get("alignment", "None").upper() != "NONE"
+
+
+# Function to prepare the input images of an operation
+def prepare_images(algorithm_module, operation, images, param_values):
+    """
+    Converts the input images to the mode of the scheme (scaling the gray levels between 8 and 16 bits, see
+    convert_image). Binary images are kept bit-packed (mode "1") for the schemes that read them natively, instead
+    of being unpacked to 8 bits and packed again by the scheme.
+    Shares to be aligned are passed unchanged: the scheme binarizes them with a threshold (a conversion to mode "1"
+    would dither scanned gray levels).
+
+    Parameters:
+    algorithm_module (dict): The configuration of the scheme (a value of ALGORITHM_MODULES).
+    operation (str): "encryption" or "decryption".
+    images (list): The input images (PIL images).
+    param_values (dict): The parameters of the request.
+
+    Returns:
+    list: The images, ready to be passed to the scheme.
+    """
+    if aligns_shares(operation, param_values):
+        return images
+
+    bit_packed = get_capabilities(algorithm_module, operation, param_values)["bit_packed_io"]
+    return [image if bit_packed and image.mode == '1' else convert_image(image, algorithm_module["image_type"])
+            for image in images]
+
+
+# Function to compute the number of rows of the tiles of the tiled engine
+def tile_rows(capabilities, images, image_type, num_outputs):
+    """
+    Parameters:
+    capabilities (dict): The capabilities of the operation (see get_capabilities).
+    images (list): The input images, already prepared (see prepare_images).
+    image_type (str): The PIL mode of the scheme, whose bands give the size of the output pixels.
+    num_outputs (int): The number of output images (2 shares for an encryption, 1 image for a decryption).
+
+    Returns:
+    int: The number of rows of a tile, a multiple of TILE_ROW_ALIGNMENT whose pixels take about TILE_BYTES.
+    """
+    # The inputs as they really are: only bit-packed binary images (mode "1") take 1 bit per pixel
+    input_bytes = sum(1 / 8 if image.mode == '1' else
+                      Image.getmodebands(image.mode) * np.dtype(ImageMode.getmode(image.mode).typestr).itemsize
+                      for image in images)
+
+    # Each output holds pixel_expansion ** 2 pixels of the dtype of the scheme per input pixel
+    output_bytes = (num_outputs * capabilities["pixel_expansion"] ** 2 * Image.getmodebands(image_type)
+                    * np.dtype(capabilities["dtype"]).itemsize)
+    row_bytes = images[0].size[0] * (input_bytes + output_bytes)
+
+    return max(1, int(TILE_BYTES / row_bytes) // TILE_ROW_ALIGNMENT) * TILE_ROW_ALIGNMENT
+
+
+# Function to run an operation on tiles of rows, assembling the outputs
+def run_tiled(function, images, param_values, capabilities, rows_per_tile, options, progress=None, cancel=None):
+    """
+    Parameters:
+    function (callable): The encryption or decryption function of the scheme.
+    images (list): The input images, already prepared (see prepare_images).
+    param_values (dict): The parameters of the request, in the order of get_requirements(). The regions of
+                         interest ("regions" parameter) are translated to each tile.
+    capabilities (dict): The capabilities of the operation (see get_capabilities).
+    rows_per_tile (int): The number of rows of each tile.
+    options (dict): The other keyword arguments of the function (e.g. random_source).
+    progress (callable): Called as progress(done_rows, total_rows), over the rows of the whole image.
+    cancel (threading.Event): Passed to the scheme for each tile.
+
+    Returns:
+    PIL.Image.Image or tuple: The outputs, as returned by the function for the whole image.
+    """
+    width, height = images[0].size
+    factor = capabilities["pixel_expansion"]
+    bands = {"num_bands": None} if capabilities["bands"] else {}  # Each tile is processed in parallel if possible
+    outputs = None
+
+    for top in range(0, height, rows_per_tile):
+        bottom = min(top + rows_per_tile, height)
+        tile_progress = None if progress is None else lambda done, total, top=top: progress(top + done, height)
+        parameters = [crop_regions(value, (0, top, width, bottom)) if key == "regions" else value
+                      for key, value in param_values.items()]
+
+        result = function(*[image.crop((0, top, width, bottom)) for image in images], *parameters,
+                          **bands, **options, progress=tile_progress, cancel=cancel)
+        tiles = result if isinstance(result, tuple) else (result,)
+
+        # The outputs are allocated with the first tile, which gives their number and mode (and their metadata)
+        if outputs is None:
+            outputs = [Image.new(tile.mode, (width * factor, height * factor)) for tile in tiles]
+            for output, tile in zip(outputs, tiles):
+                output.info.update(tile.info)
+
+        for output, tile in zip(outputs, tiles):
+            output.paste(tile, (0, top * factor))
+
+    return tuple(outputs) if len(outputs) > 1 else outputs[0]
+
+
+# Function to run an encryption or a decryption with the fastest engine the scheme allows
+def run_operation(algorithm_module, operation, images, param_values, progress=None, cancel=None):
+    """
+    Runs an operation of a scheme, choosing the execution engine from its capabilities (see choose_engine).
+
+    Parameters:
+    algorithm_module (dict): The configuration of the scheme (a value of ALGORITHM_MODULES).
+    operation (str): "encryption" or "decryption".
+    images (list): The input images, already prepared (see prepare_images).
+    param_values (dict): The parameters of the request, in the order of get_requirements().
+    progress (callable): Passed to the scheme, called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): Passed to the scheme, which raises OperationCancelled once it is set.
+
+    Returns:
+    tuple or PIL.Image.Image: The shares (encryption) or the decrypted image (decryption).
+    """
+    function = algorithm_module["encrypt" if operation == "encryption" else "decrypt"]
+    parameters = list(param_values.values())  # Images first, then only parameter values
+    capabilities = get_capabilities(algorithm_module, operation, param_values)
+    engine = choose_engine(capabilities, images[0].size)
+
+    # The encryptions draw their random bytes from the random pool of the process, if it was started
+    options = {"random_source": random_source()} if operation == "encryption" else {}
+
+    if engine == "tiled":
+        rows_per_tile = tile_rows(capabilities, images, algorithm_module["image_type"],
+                                  2 if operation == "encryption" else 1)
+        return run_tiled(function, images, param_values, capabilities, rows_per_tile, options, progress, cancel)
+    elif engine == "parallel":
+        num_bands = None if images[0].size[0] * images[0].size[1] >= PARALLEL_MIN_PIXELS else 1
+        return function(*images, *parameters, num_bands=num_bands, **options, progress=progress, cancel=cancel)
+    else:
+        return function(*images, *parameters, **options, progress=progress, cancel=cancel)
@@ -1,18 +1,56 @@
 from PIL import Image
-from flask import Flask, render_template, request, url_for, jsonify
+from flask import Flask, Response, render_template, request, stream_with_context, url_for, jsonify
 import os
 
-from algo_interface import ALGORITHM_MODULES
+from algo_interface import ALGORITHM_MODULES, aligns_shares, prepare_images, run_operation
+from scripts.common.alignment import align_shares_preview
+from scripts.common.encoding import get_encoder_profile, save_image
+from scripts.common.metadata import resolve_share_pair
+from scripts.common.preview import make_preview, preview_decrypt
+from scripts.common.randomness import POOL_CAPACITY, start_random_pool, get_random_pool
+from scripts.common.halftone_cache import (HALFTONE_CACHE_CAPACITY, HALFTONE_DISK_CAPACITY, start_halftone_cache,
+                                           get_halftone_cache)
+from scripts.common.regions import parse_regions
+from scripts.common.validation import check_share_headers
+from zip_stream import stream_shares_zip
+from rest_api import api_v1
+from jobs import ApiError
+from scheduling import get_scheduler, work_megapixels
 
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = 'static/uploads'
 app.config['OUTPUT_FOLDER'] = 'static/output'
+app.config['MAX_CONTENT_LENGTH'] = 64 * 1024 * 1024  # Maximum size of a request body (64 MiB)
+app.config['API_MAX_PIXELS'] = 50_000_000  # Maximum number of pixels of an image sent to /api/v1
+app.config['API_MAX_JOBS'] = 4  # Maximum number of /api/v1/jobs running at the same time
+app.config['API_JOB_TTL'] = 600  # Seconds a finished job and its result are kept
+app.config['API_JOB_HEARTBEAT'] = 15  # Seconds between two heartbeats of an idle event stream
+app.config['SCHEDULER_MAX_SECONDS'] = 300  # Estimated duration above which an operation is rejected (413)
+app.config['SCHEDULER_SLOW_SECONDS'] = 5  # Estimated duration above which an operation runs in the slow lane
+app.config['SCHEDULER_FAST_SLOTS'] = os.cpu_count() or 1  # Operations of the fast lane running at the same time
+app.config['SCHEDULER_SLOW_SLOTS'] = 1  # Operations of the slow lane running at the same time
+app.config['SCHEDULER_QUEUE_TIMEOUT'] = 60  # Seconds a request waits for a slot before a 503 response
+app.config['RANDOM_POOL_BYTES'] = POOL_CAPACITY  # Random bytes drawn in advance for the encryptions (0 to disable)
+app.config['RANDOM_POOL_LOW_WATERMARK'] = None  # Level under which the random pool is refilled (None: half of it)
+app.config['HALFTONE_CACHE_BYTES'] = HALFTONE_CACHE_CAPACITY  # Halftoned planes kept in memory (0 to disable)
+app.config['HALFTONE_CACHE_DIR'] = None  # Directory of the halftoned planes kept on disk (None: in memory only)
+app.config['HALFTONE_CACHE_DISK_BYTES'] = HALFTONE_DISK_CAPACITY  # Halftoned planes kept in HALFTONE_CACHE_DIR
+app.register_blueprint(api_v1)
 
 # Ensure folders exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['OUTPUT_FOLDER'], exist_ok=True)
 
 
+# Starts the random pool and the halftone cache of the process before the first request (the configuration may
+# change after the import)
+@app.before_request
+def start_randomness():
+    start_random_pool(app.config['RANDOM_POOL_BYTES'], app.config['RANDOM_POOL_LOW_WATERMARK'])
+    start_halftone_cache(app.config['HALFTONE_CACHE_BYTES'], app.config['HALFTONE_CACHE_DIR'],
+                         app.config['HALFTONE_CACHE_DISK_BYTES'])
+
+
 # Route for the main page
 @app.route('/')
 def home():
@@ -67,79 +105,200 @@ def get_algorithm_requirements(algorithm, operation):
         return jsonify({"error": str(e)}), 500
 
 
+# Route that returns the encoder profiles available for the output images of the indicated algorithm
+@app.route('/api/algorithm_encoders/<algorithm>', methods=['GET'])
+def get_algorithm_encoders(algorithm):
+    if algorithm not in ALGORITHM_MODULES:
+        return jsonify({"error": "Algorithm not found"}), 404
+
+    encoders = ALGORITHM_MODULES[algorithm].get("encoders", [])
+    return jsonify({
+        "encoders": encoders,
+        "default": encoders[0] if encoders else None
+    })
+
+
+# Route that returns the state of the scheduler, of the random pool and of the halftone cache (in the async mode,
+# asgi.py serves /metrics)
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    pool = get_random_pool()
+    cache = get_halftone_cache()
+    return jsonify({
+        "scheduler": get_scheduler(app).snapshot(),
+        "random_pool": None if pool is None else pool.metrics(),
+        "halftone_cache": None if cache is None else cache.metrics()
+    })
+
+
+# Helper function to read the operation, the images, the parameters and the encoder profile of a request
+def parse_operation_request():
+    operation = request.form['operation']
+    algorithm = request.form['algorithm']
+
+    # Retrieve the algorithm module
+    algorithm_module = ALGORITHM_MODULES.get(algorithm)
+    if not algorithm_module:
+        raise ValueError(f"Unknown algorithm: {algorithm}")
+
+    # Retrieve algorithm requirements for the operation
+    requirements = algorithm_module.get("requirements", {}).get(operation, {})
+    num_images = requirements.get("num_images", 1)
+    parameters = requirements.get("parameters", {})
+
+    # Dynamically retrieve uploaded images based on num_images
+    input_paths = []
+    for i in range(1, num_images + 1):
+        file = request.files.get(f"image{i}")
+        if file and file.filename:
+            save_path = os.path.join(app.config['UPLOAD_FOLDER'], file.filename)
+            file.save(save_path)
+            input_paths.append(save_path)
+
+    # Ensure correct number of images
+    if len(input_paths) != num_images:
+        raise ValueError(f"{operation.capitalize()} requires {num_images} image(s), but {len(input_paths)} provided.")
+
+    # Open images (lazily: only the headers are read until they are converted)
+    images = [Image.open(path) for path in input_paths]
+
+    # Shares carrying metadata are decrypted by the scheme that made them, whatever the selected algorithm,
+    # and shares of different encryptions are rejected before decoding their pixels (a scanned share to be
+    # aligned carries no metadata, the other one may)
+    if operation == "decryption":
+        metadata = resolve_share_pair(images, allow_missing=aligns_shares(operation, request.form))
+        if metadata is not None and metadata["algorithm"] != algorithm:
+            if metadata["algorithm"] not in ALGORITHM_MODULES:
+                raise ValueError(f"The shares were made with an unknown algorithm: {metadata['algorithm']}")
+            algorithm = metadata["algorithm"]
+            algorithm_module = ALGORITHM_MODULES[algorithm]
+            parameters = algorithm_module.get("requirements", {}).get(operation, {}).get("parameters", {})
+
+    # Extract additional parameters from the form
+    param_values = {}
+    for param_key, param_config in parameters.items():
+        if param_config["type"] == "number":
+            param_values[param_key] = int(request.form.get(param_key, param_config.get("default", 0)))
+        elif param_config["type"] == "select":
+            param_values[param_key] = request.form.get(param_key, param_config.get("default"))
+        elif param_config["type"] == "regions":
+            param_values[param_key] = request.form.get(param_key, param_config.get("default"))
+            parse_regions(param_values[param_key])  # Invalid rectangles are rejected before any decoding
+        # Here it is possible to add other types of requirements for new schemes
+
+    # Sizes and modes are checked from the headers too, so incompatible shares are never decoded (the shares to be
+    # aligned are scans, of any size and mode)
+    if operation == "decryption" and not aligns_shares(operation, param_values):
+        check_share_headers(images, algorithm_module.get("share_modes"))
+
+    # Retrieve the encoder profile used to save the output images (the first one is the default)
+    encoders = algorithm_module.get("encoders", [])
+    encoder = request.form.get("encoder") or encoders[0]
+    if operation == "decryption" and encoder not in encoders:  # The algorithm may come from the share metadata
+        encoder = encoders[0]
+    if encoder not in encoders:
+        raise ValueError(f"Invalid encoder profile for {algorithm_module['name']}: {encoder}")
+
+    return operation, algorithm, algorithm_module, images, param_values, encoder
+
+
 # Process the selected operation
 @app.route('/process', methods=['POST'])
 def process():
     try:
-        operation = request.form['operation']
-        algorithm = request.form['algorithm']
-
-        # Retrieve the algorithm module
-        algorithm_module = ALGORITHM_MODULES.get(algorithm)
-        if not algorithm_module:
-            error_message = f"Unknown algorithm: {algorithm}"
-            return render_template('error.html', error_message=error_message), 500
-
-        # Retrieve algorithm requirements for the operation
-        requirements = algorithm_module.get("requirements", {}).get(operation, {})
-        num_images = requirements.get("num_images", 1)
-        parameters = requirements.get("parameters", {})
-
-        # Dynamically retrieve uploaded images based on num_images
-        input_paths = []
-        for i in range(1, num_images + 1):
-            file = request.files.get(f"image{i}")
-            if file and file.filename:
-                save_path = os.path.join(app.config['UPLOAD_FOLDER'], file.filename)
-                file.save(save_path)
-                input_paths.append(save_path)
-
-        # Ensure correct number of images
-        if len(input_paths) != num_images:
-            error_message = f"{operation.capitalize()} requires {num_images} image(s), but {len(input_paths)} provided."
-            return render_template('error.html', error_message=error_message), 500
-
-        # Open images
-        images = [Image.open(path).convert(algorithm_module.get("image_type")) for path in input_paths]
-
-        # Extract additional parameters from the form
-        param_values = {}
-        for param_key, param_config in parameters.items():
-            if param_config["type"] == "number":
-                param_values[param_key] = int(request.form.get(param_key, param_config.get("default", 0)))
-            elif param_config["type"] == "select":
-                param_values[param_key] = request.form.get(param_key, param_config.get("default"))
-            # Here it is possible to add other types of requirements for new schemes
-
-        # Call the appropriate method dynamically
-        if operation == "encryption":
-            encrypt_method = algorithm_module.get("encrypt")
-            result = encrypt_method(*images, *param_values.values())  # Pass images first, then only parameter values
-            return save_and_render_shares(*result, extension=algorithm_module.get("extension"))
-
-        elif operation == "decryption":
-            decrypt_method = algorithm_module.get("decrypt")
-            result = decrypt_method(*images, *param_values.values())  # Pass images first, then only parameter values
-            return save_and_render_decryption_result(result, algorithm_module.get("extension"))
+        operation, algorithm, algorithm_module, images, param_values, encoder = parse_operation_request()
+
+        if operation == "decryption" and request.form.get("preview"):
+            # Quick check: decrypt only a subsampled version of the shares, displayed without saving the full result.
+            # The shares are decoded at full resolution, so the preview is admitted on the work of the whole image,
+            # but its duration does not update the cost model of the decryption
+            work = work_megapixels(algorithm_module, operation, images[0].size, param_values)
+            with get_scheduler(app).slot(request.remote_addr, algorithm, operation, work,
+                                         timeout=app.config['SCHEDULER_QUEUE_TIMEOUT'], record=False):
+                if aligns_shares(operation, param_values):
+                    # Only the pixels of the preview are resampled from the aligned shares (which have no metadata
+                    # anymore: it was checked with the files, and a scanned share has none)
+                    images = align_shares_preview(images, param_values["alignment"])
+                    param_values = dict(param_values, alignment="None")
+                result = preview_decrypt(algorithm_module.get("decrypt"), images, list(param_values.values()),
+                                         prepare=lambda samples: prepare_images(algorithm_module, operation, samples,
+                                                                                param_values))
+            return save_and_render_decryption_preview(result)
+
+        # The cost is estimated from the headers, before decoding: large operations wait in the slow lane
+        work = work_megapixels(algorithm_module, operation, images[0].size, param_values)
+        with get_scheduler(app).slot(request.remote_addr, algorithm, operation, work,
+                                     timeout=app.config['SCHEDULER_QUEUE_TIMEOUT']):
+            images = prepare_images(algorithm_module, operation, images, param_values)
+
+            # Call the appropriate method dynamically
+            if operation == "encryption":
+                result = run_operation(algorithm_module, operation, images, param_values)
+                return save_and_render_shares(*result, encoder=encoder)
+
+            elif operation == "decryption":
+                result = run_operation(algorithm_module, operation, images, param_values)
+                return save_and_render_decryption_result(result, encoder)
+
+    except ApiError as e:  # Rejected by the scheduler (413) or queued for too long (503)
+        return render_template('error.html', error_message=e.message), e.status_code
+    except Exception as e:
+        error_message = str(e)
+        return render_template('error.html', error_message=error_message), 500
 
+
+# Encrypt the uploaded image and stream all the shares, with a manifest, as a single ZIP archive
+@app.route('/process_zip', methods=['POST'])
+def process_zip():
+    try:
+        operation, algorithm, algorithm_module, images, param_values, encoder = parse_operation_request()
+        if operation != "encryption":
+            raise ValueError("Only the encryption can be downloaded as a ZIP archive.")
+
+        # The slot covers the encryption only: the shares are encoded while the archive is sent
+        work = work_megapixels(algorithm_module, operation, images[0].size, param_values)
+        with get_scheduler(app).slot(request.remote_addr, algorithm, operation, work,
+                                     timeout=app.config['SCHEDULER_QUEUE_TIMEOUT']):
+            images = prepare_images(algorithm_module, operation, images, param_values)
+            shares = run_operation(algorithm_module, operation, images, param_values)
+
+    except ApiError as e:
+        return render_template('error.html', error_message=e.message), e.status_code
     except Exception as e:
         error_message = str(e)
         return render_template('error.html', error_message=error_message), 500
 
+    manifest = {
+        "algorithm": algorithm,
+        "name": algorithm_module["name"],
+        "parameters": param_values,
+        "encoder": encoder,
+    }
+
+    return Response(
+        stream_with_context(stream_shares_zip(shares, encoder, manifest)),
+        mimetype='application/zip',
+        headers={"Content-Disposition": f"attachment; filename={algorithm}_shares.zip"}
+    )
+
 
-def save_and_render_shares(*shares, extension, output_folder='output'):
+def save_and_render_shares(*shares, encoder, output_folder='output'):
     share_urls = []
     download_urls = []
+    extension = get_encoder_profile(encoder)["format"]
 
     for i, share in enumerate(shares, start=1):
         filename = f"share{i}.{extension}"
         share_path = os.path.join(app.config['OUTPUT_FOLDER'], filename)
 
-        # Save shares
-        share.save(share_path)
+        # Save shares with the selected encoder profile
+        save_image(share, share_path, encoder)
+
+        # Save a downscaled rendition next to the share, displayed in the page instead of the full resolution one
+        make_preview(share).save(os.path.join(app.config['OUTPUT_FOLDER'], f"share{i}_preview.png"), compress_level=1)
 
-        # Generate URLs for rendering and downloading
-        share_urls.append(url_for('static', filename=f'{output_folder}/{filename}'))
+        # Generate URLs for rendering (preview) and downloading (full resolution)
+        share_urls.append(url_for('static', filename=f'{output_folder}/share{i}_preview.png'))
         download_urls.append(url_for('static', filename=f'{output_folder}/{filename}'))
 
     # Render results dynamically. This rendering handles the case where more than 2 shares are generated.
@@ -152,17 +311,32 @@ def save_and_render_shares(*shares, extension, output_folder='output'):
 
 
 # Helper function to handle decryption and rendering results
-def save_and_render_decryption_result(result_image, extension, output_folder='output'):
+def save_and_render_decryption_result(result_image, encoder, output_folder='output'):
+    extension = get_encoder_profile(encoder)["format"]
     result_path = os.path.join(app.config['OUTPUT_FOLDER'], f'decrypted.{extension}')
-    result_image.save(result_path)
+    save_image(result_image, result_path, encoder)
+    make_preview(result_image).save(os.path.join(app.config['OUTPUT_FOLDER'], 'decrypted_preview.png'),
+                                    compress_level=1)
 
     # Render results
     return render_template(
         'dec_result.html',
-        result_url=url_for('static', filename=f'{output_folder}/decrypted.{extension}'),
+        result_url=url_for('static', filename=f'{output_folder}/decrypted_preview.png'),
         result_download=url_for('static', filename=f'{output_folder}/decrypted.{extension}')
     )
 
 
+# Helper function to render the result of a preview decryption
+def save_and_render_decryption_preview(preview_image, output_folder='output'):
+    make_preview(preview_image).save(os.path.join(app.config['OUTPUT_FOLDER'], 'decrypted_preview.png'),
+                                     compress_level=1)
+
+    return render_template(
+        'dec_result.html',
+        result_url=url_for('static', filename=f'{output_folder}/decrypted_preview.png'),
+        result_download=None  # Only the preview is available: run the full decryption to download the result
+    )
+
+
 if __name__ == '__main__':
     app.run(debug=True)
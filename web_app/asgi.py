@@ -0,0 +1,177 @@
+import asyncio
+import io
+import json
+import os
+import re
+from urllib.parse import unquote
+from asgiref.wsgi import WsgiToAsgi
+from werkzeug.wrappers import Request
+
+from app import app as flask_app
+from jobs import OPERATIONS, ApiError
+from rest_api import prepare_job, job_response
+from scheduling import get_scheduler, job_work
+from worker_pool import WorkerPool
+
+# Async serving mode: run with "uvicorn asgi:app" from the web_app folder.
+# Requests to /api/v1 are handled by the event loop, which reads the uploads and writes the responses without
+# holding a thread, while the CPU-bound encryption/decryption runs in a bounded pool of warm worker processes
+# (see worker_pool.py). GET /health and GET /metrics report the state of the pool.
+# All the other routes (web interface, /process, ...) are served by the Flask app through WsgiToAsgi.
+
+API_ROUTE = re.compile(r"^/api/v1/(?P<algorithm>[^/]+)/(?P<operation>[^/]+)$")
+
+flask_app.config.setdefault('ASGI_WORKERS', os.cpu_count() or 1)  # Number of worker processes
+flask_app.config.setdefault('ASGI_MAX_PENDING_JOBS', 4 * flask_app.config['ASGI_WORKERS'])  # Jobs queued at most
+flask_app.config.setdefault('ASGI_MAX_TASKS_PER_CHILD', 1000)  # Jobs after which a worker process is replaced
+
+wsgi_app = WsgiToAsgi(flask_app)
+worker_pool = None
+pending_jobs = None
+pool_lock = asyncio.Lock()  # Held while the pool starts, so that concurrent first requests start only one pool
+
+
+# Function to start the worker pool and create the semaphore that bounds the jobs submitted to it
+def start_pool():
+    global worker_pool, pending_jobs
+
+    pool = WorkerPool(flask_app.config['ASGI_WORKERS'], flask_app.config['ASGI_MAX_TASKS_PER_CHILD'],
+                      flask_app.config['RANDOM_POOL_BYTES'],
+                      (flask_app.config['HALFTONE_CACHE_BYTES'], flask_app.config['HALFTONE_CACHE_DIR'],
+                       flask_app.config['HALFTONE_CACHE_DISK_BYTES']))
+    pool.start()
+
+    # Published once the workers are ready: the other requests wait for them in ensure_pool
+    pending_jobs = asyncio.Semaphore(flask_app.config['ASGI_MAX_PENDING_JOBS'])
+    worker_pool = pool
+
+
+# Function to start the worker pool from the event loop, without blocking it while the workers start
+async def ensure_pool():
+    async with pool_lock:
+        if worker_pool is None:
+            await asyncio.get_running_loop().run_in_executor(None, start_pool)
+
+
+# Function to reject a job when ASGI_MAX_PENDING_JOBS jobs are already pending
+def check_pending_jobs():
+    if pending_jobs.locked():
+        raise ApiError("The server is busy, retry later", 503)
+
+
+# Function to stop the worker pool
+def stop_pool():
+    global worker_pool
+
+    if worker_pool is not None:
+        worker_pool.stop()
+        worker_pool = None
+
+
+# Function to read the whole request body from the event loop, enforcing MAX_CONTENT_LENGTH
+async def read_body(receive):
+    limit = flask_app.config['MAX_CONTENT_LENGTH']
+    body = bytearray()
+
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+
+        body += message.get("body", b"")
+        if limit is not None and len(body) > limit:
+            raise ApiError(f"Request body too large (limit: {limit} bytes)", 413)
+        if not message.get("more_body", False):
+            return bytes(body)
+
+
+# Function to build a WSGI request around a body already read, to reuse the validation of rest_api
+def build_request(scope, body):
+    headers = {name.decode("latin-1").upper().replace("-", "_"): value.decode("latin-1")
+               for name, value in scope["headers"]}
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": "",
+        "PATH_INFO": unquote(scope["path"]),
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "CONTENT_TYPE": headers.pop("CONTENT_TYPE", ""),
+        "CONTENT_LENGTH": str(len(body)),
+        "SERVER_NAME": "asgi",
+        "SERVER_PORT": "0",
+        "SERVER_PROTOCOL": "HTTP/" + scope.get("http_version", "1.1"),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+    }
+    environ.update({f"HTTP_{name}": value for name, value in headers.items()})
+    return Request(environ)
+
+
+# Function to send a complete response through the ASGI interface
+async def send_response(send, status, headers, chunks):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()],
+    })
+    for chunk in chunks:
+        await send({"type": "http.response.body", "body": chunk, "more_body": True})
+    await send({"type": "http.response.body", "body": b""})
+
+
+# Function to serve an /api/v1 request: I/O on the event loop, computation in the process pool
+async def handle_api(scope, receive, send, algorithm, operation):
+    try:
+        check_pending_jobs()  # Before reading the body: a rejected request does not keep its upload in memory
+        body = await read_body(receive)
+        if body is None:
+            return  # The client disconnected before the end of the upload
+
+        job = prepare_job(build_request(scope, body), algorithm, operation)
+        max_pixels = flask_app.config['API_MAX_PIXELS']
+
+        # The jobs over the cost budget are rejected before reaching the pool, and the others when the pool already
+        # has ASGI_MAX_PENDING_JOBS jobs (checked again after the upload, without awaiting before the acquisition)
+        get_scheduler(flask_app).check(algorithm, OPERATIONS[operation], job_work(*job[:4], max_pixels))
+        check_pending_jobs()
+
+        async with pending_jobs:
+            outputs, extension = await worker_pool.run(*job, max_pixels)
+
+    except ApiError as e:
+        await send_response(send, e.status_code, {"Content-Type": "application/json"},
+                            [json.dumps({"error": e.message}).encode()])
+        return
+
+    headers, chunks = job_response(operation, outputs, extension)
+    await send_response(send, 200, headers, chunks)
+
+
+# ASGI application
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await ensure_pool()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                stop_pool()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    if scope["type"] == "http" and worker_pool is None:  # Servers without lifespan support
+        await ensure_pool()
+
+    path = scope.get("path", "")
+    match = API_ROUTE.match(path)
+    if scope["type"] == "http" and scope["method"] == "POST" and match:
+        await handle_api(scope, receive, send, match["algorithm"], match["operation"])
+    elif scope["type"] == "http" and scope["method"] == "GET" and path == "/health":
+        health = await worker_pool.health()
+        await send_response(send, 200 if health["status"] == "ok" else 503, {"Content-Type": "application/json"},
+                            [json.dumps(health).encode()])
+    elif scope["type"] == "http" and scope["method"] == "GET" and path == "/metrics":
+        await send_response(send, 200, {"Content-Type": "application/json"},
+                            [json.dumps(worker_pool.metrics()).encode()])
+    else:
+        await wsgi_app(scope, receive, send)
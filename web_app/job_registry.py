@@ -0,0 +1,125 @@
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+
+from jobs import OPERATIONS, ApiError, run_job
+from scheduling import job_work
+from scripts.common.progress import OperationCancelled
+
+
+# Background encryption/decryption job, whose progress can be followed and which can be cancelled
+class Job:
+    def __init__(self, operation):
+        """
+        Parameters:
+        operation (str): "encrypt" or "decrypt".
+        """
+        self.id = uuid.uuid4().hex
+        self.operation = operation
+        self.cancel = threading.Event()
+        self.changed = threading.Condition()  # Notified at each progress report and when the job ends
+        self.status = "running"  # "running", "done", "error" or "cancelled"
+        self.done_rows = 0
+        self.total_rows = 0
+        self.result = None  # (outputs, extension) once the job is done
+        self.error = None
+        self.finished_at = None
+
+    # Progress callback passed to the scheme (it may be called from the threads of the shared pool)
+    def report(self, done_rows, total_rows):
+        with self.changed:
+            self.done_rows = done_rows
+            self.total_rows = total_rows
+            self.changed.notify_all()
+
+    # Records the final state of the job and wakes up its listeners
+    def finish(self, status, result=None, error=None):
+        with self.changed:
+            self.status = status
+            self.result = result
+            self.error = error
+            self.finished_at = time.monotonic()
+            self.changed.notify_all()
+
+    # Runs the job (in its own thread), in a slot of the scheduler if one is given
+    def run(self, algorithm, operation, images_data, param_values, encoder, max_pixels, scheduler, client, work):
+        try:
+            slot = nullcontext() if scheduler is None else \
+                scheduler.slot(client, algorithm, OPERATIONS[operation], work, cancel=self.cancel)
+            with slot:
+                result = run_job(algorithm, operation, images_data, param_values, encoder, max_pixels,
+                                 progress=self.report, cancel=self.cancel)
+        except OperationCancelled:
+            self.finish("cancelled")
+        except ApiError as e:
+            self.finish("error", error=e.message)
+        except Exception as e:
+            self.finish("error", error=f"Unexpected error: {e}")
+        else:
+            self.finish("done", result=result)
+
+    # Waits until the state of the job changes (or the timeout expires) and returns a snapshot of it
+    def wait(self, last_done_rows, timeout):
+        with self.changed:
+            if self.status == "running" and self.done_rows == last_done_rows:
+                self.changed.wait(timeout)
+            return self.status, self.done_rows, self.total_rows
+
+
+# Registry of the background jobs of the application
+class JobRegistry:
+    def __init__(self, max_jobs, ttl):
+        """
+        Parameters:
+        max_jobs (int): The maximum number of jobs running at the same time.
+        ttl (float): The number of seconds a finished job (and its result) is kept.
+        """
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    # Removes the finished jobs older than the TTL (called with the lock held)
+    def _expire(self):
+        now = time.monotonic()
+        for job_id in [job_id for job_id, job in self.jobs.items()
+                       if job.finished_at is not None and now - job.finished_at > self.ttl]:
+            del self.jobs[job_id]
+
+    # Starts a job (the arguments of jobs.run_job) in a new thread and returns it
+    def submit(self, algorithm, operation, images_data, param_values, encoder, max_pixels, scheduler=None,
+               client=None):
+        """
+        Parameters (in addition to those of jobs.run_job):
+        scheduler (FairScheduler): If given, the job is rejected if its estimated cost is over the budget, and
+                                   otherwise waits for a slot of the scheduler (as "running") in its thread.
+        client (str): The identifier of the client, for the fair queuing of the scheduler.
+        """
+        work = None
+        if scheduler is not None:
+            work = job_work(algorithm, operation, images_data, param_values, max_pixels)
+            scheduler.check(algorithm, OPERATIONS[operation], work)
+
+        with self.lock:
+            self._expire()
+            if sum(job.status == "running" for job in self.jobs.values()) >= self.max_jobs:
+                raise ApiError("Too many jobs running, retry later", 503)
+
+            job = Job(operation)
+            self.jobs[job.id] = job
+
+        # A dedicated thread, not the shared pool: the banded schemes submit their own work to that pool
+        threading.Thread(target=job.run, args=(algorithm, operation, images_data, param_values, encoder, max_pixels,
+                                               scheduler, client, work), daemon=True).start()
+        return job
+
+    # Returns a job from its identifier
+    def get(self, job_id):
+        with self.lock:
+            self._expire()
+            job = self.jobs.get(job_id)
+
+        if job is None:
+            raise ApiError(f"Unknown job: {job_id}", 404)
+        return job
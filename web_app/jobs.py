@@ -0,0 +1,102 @@
+import io
+from PIL import Image, UnidentifiedImageError
+
+from algo_interface import ALGORITHM_MODULES, aligns_shares, prepare_images, run_operation
+from scripts.common.encoding import get_encoder_profile, save_image
+from scripts.common.metadata import check_share_pair
+from scripts.common.validation import check_share_headers
+
+# Maps the operations of the URL to the keys used by get_config() and get_requirements()
+OPERATIONS = {
+    "encrypt": "encryption",
+    "decrypt": "decryption",
+}
+
+
+# Exception raised when a request cannot be processed, turned into a JSON error response
+class ApiError(Exception):
+    def __init__(self, message, status_code=400):
+        super().__init__(message, status_code)  # Both arguments are kept, so the error can be pickled between processes
+        self.message = message
+        self.status_code = status_code
+
+
+# Function to open an uploaded image, reading only its header
+def open_image(data, max_pixels):
+    """
+    Opens an uploaded image lazily: only the header (size, mode and metadata) is read, not the pixels.
+
+    Parameters:
+    data (bytes): The encoded image (any format supported by PIL).
+    max_pixels (int): The maximum number of pixels accepted.
+
+    Returns:
+    PIL.Image.Image: The image, whose pixels are decoded on first use.
+    """
+    try:
+        image = Image.open(io.BytesIO(data))  # Only the header is read here
+    except UnidentifiedImageError:
+        raise ApiError("The uploaded data is not a supported image")
+
+    if image.size[0] * image.size[1] > max_pixels:
+        raise ApiError(f"Image too large: {image.size[0]}x{image.size[1]} (limit: {max_pixels} pixels)", 413)
+
+    return image
+
+
+# Function to encode an image in memory with an encoder profile
+def encode_image(image, encoder):
+    """
+    Encodes an image in memory with the given encoder profile.
+
+    Parameters:
+    image (PIL.Image.Image): The image to be encoded.
+    encoder (str): The name of the encoder profile.
+
+    Returns:
+    bytes: The encoded image.
+    """
+    buffer = io.BytesIO()
+    save_image(image, buffer, encoder)
+    return buffer.getvalue()
+
+
+# Function to run an already validated encryption or decryption, from encoded images to encoded images
+def run_job(algorithm, operation, images_data, param_values, encoder, max_pixels, progress=None, cancel=None):
+    """
+    Decodes the input images, runs the scheme and encodes the results. It only takes and returns bytes and
+    plain values, so it can run in the request thread as well as in a worker process.
+
+    Parameters:
+    algorithm (str): The algorithm identifier (a key of ALGORITHM_MODULES).
+    operation (str): "encrypt" or "decrypt".
+    images_data (list): The encoded input images.
+    param_values (dict): The validated parameters of the operation, in the order of get_requirements().
+    encoder (str): The name of the encoder profile used for the results.
+    max_pixels (int): The maximum number of pixels of each input image.
+    progress (callable): Passed to the scheme, called as progress(done_rows, total_rows) after each strip of rows.
+    cancel (threading.Event): Passed to the scheme, which raises OperationCancelled once it is set.
+
+    Returns:
+    tuple: The list of encoded results (the shares, or the decrypted image alone) and their file extension.
+    """
+    algorithm_module = ALGORITHM_MODULES[algorithm]
+    images = [open_image(data, max_pixels) for data in images_data]
+
+    try:
+        # Shares of another scheme, of different encryptions, or of incompatible sizes or modes are rejected
+        # from their headers, before decoding (the shares to be aligned are scans, of any size and mode)
+        if operation == "decrypt":
+            aligned = aligns_shares(OPERATIONS[operation], param_values)
+            check_share_pair(images, algorithm, allow_missing=aligned)
+            if not aligned:
+                check_share_headers(images, algorithm_module.get("share_modes"))
+        images = prepare_images(algorithm_module, OPERATIONS[operation], images, param_values)
+
+        # The execution engine (tiles, parallel bands or a single pass) is chosen from the scheme capabilities
+        result = run_operation(algorithm_module, OPERATIONS[operation], images, param_values, progress, cancel)
+    except ValueError as e:  # Raised by the schemes for invalid inputs (e.g. shares of different sizes)
+        raise ApiError(str(e))
+
+    results = result if operation == "encrypt" else [result]
+    return [encode_image(image, encoder) for image in results], get_encoder_profile(encoder)["format"]
@@ -0,0 +1,200 @@
+import json
+import secrets
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context, url_for
+
+from algo_interface import ALGORITHM_MODULES
+from job_registry import JobRegistry
+from jobs import OPERATIONS, ApiError, run_job
+from scheduling import get_scheduler, job_work
+from scripts.common.regions import parse_regions
+
+api_v1 = Blueprint('api_v1', __name__, url_prefix='/api/v1')
+
+
+@api_v1.errorhandler(ApiError)
+def handle_api_error(error):
+    return jsonify({"error": error.message}), error.status_code
+
+
+@api_v1.errorhandler(413)
+def handle_too_large(error):
+    limit = current_app.config['MAX_CONTENT_LENGTH']
+    return jsonify({"error": f"Request body too large (limit: {limit} bytes)"}), 413
+
+
+# Helper function to retrieve the uploaded images, either as multipart files or as the raw request body
+def read_images(req, num_images):
+    if req.files:
+        files = [req.files.get(f"image{i}") for i in range(1, num_images + 1)]
+        if not all(files):
+            raise ApiError(f"Expected {num_images} image(s) in the fields " +
+                           ", ".join(f"image{i}" for i in range(1, num_images + 1)))
+        return [file.read() for file in files]
+
+    if num_images != 1:
+        raise ApiError(f"Expected {num_images} images as a multipart/form-data request")
+
+    data = req.get_data(cache=False)
+    if not data:
+        raise ApiError("Expected an image in the request body, with an image/* or application/octet-stream "
+                       "Content-Type")
+    return [data]
+
+
+# Helper function to validate the parameters of the request against the requirements of the algorithm
+def read_parameters(req, parameters):
+    param_values = {}
+
+    for param_key, param_config in parameters.items():
+        value = req.values.get(param_key, param_config.get("default"))
+
+        if param_config["type"] == "number":
+            try:
+                param_values[param_key] = int(value)
+            except (TypeError, ValueError):
+                raise ApiError(f"Parameter '{param_key}' must be an integer, got: {value}")
+        elif param_config["type"] == "select":
+            if value not in param_config["options"]:
+                raise ApiError(f"Parameter '{param_key}' must be one of {', '.join(param_config['options'])}, "
+                               f"got: {value}")
+            param_values[param_key] = value
+        elif param_config["type"] == "regions":
+            try:
+                parse_regions(value)
+            except ValueError as e:
+                raise ApiError(f"Parameter '{param_key}': {e}")
+            param_values[param_key] = value
+        # Here it is possible to add other types of requirements for new schemes
+
+    return param_values
+
+
+# Helper function to validate a request and extract the arguments of run_job (except max_pixels)
+def prepare_job(req, algorithm, operation):
+    algorithm_module = ALGORITHM_MODULES.get(algorithm)
+    if not algorithm_module:
+        raise ApiError(f"Unknown algorithm: {algorithm}", 404)
+    if operation not in OPERATIONS:
+        raise ApiError(f"Unknown operation: {operation}. Choose 'encrypt' or 'decrypt'.", 404)
+
+    requirements = algorithm_module.get("requirements", {}).get(OPERATIONS[operation], {})
+    images_data = read_images(req, requirements.get("num_images", 1))
+    param_values = read_parameters(req, requirements.get("parameters", {}))
+
+    encoders = algorithm_module.get("encoders", [])
+    encoder = req.values.get("encoder") or encoders[0]
+    if encoder not in encoders:
+        raise ApiError(f"Encoder profile must be one of {', '.join(encoders)}, got: {encoder}")
+
+    return algorithm, operation, images_data, param_values, encoder
+
+
+# Helper function to describe the results of a job as the headers and the body chunks of the response
+def job_response(operation, outputs, extension):
+    # Decryption: a single image in the response body
+    if operation == "decrypt":
+        return {"Content-Type": f"image/{extension}"}, outputs
+
+    # Encryption: a multipart/mixed body with one part per share
+    boundary = secrets.token_hex(16)
+    chunks = []
+    for i, output in enumerate(outputs, start=1):
+        chunks.append((f"--{boundary}\r\n"
+                       f"Content-Type: image/{extension}\r\n"
+                       f"Content-Disposition: attachment; filename=\"share{i}.{extension}\"\r\n\r\n").encode())
+        chunks.append(output)
+        chunks.append(b"\r\n")
+    chunks.append(f"--{boundary}--\r\n".encode())
+
+    return {"Content-Type": f"multipart/mixed; boundary={boundary}", "X-Share-Count": str(len(outputs))}, chunks
+
+
+# Encrypt or decrypt the images of the request and return the result as binary data
+@api_v1.route('/<algorithm>/<operation>', methods=['POST'])
+def run_operation(algorithm, operation):
+    job = prepare_job(request, algorithm, operation)
+    max_pixels = current_app.config['API_MAX_PIXELS']
+
+    # Rejected if too costly, then queued fairly with the other requests (see scheduling.py)
+    work = job_work(*job[:4], max_pixels)
+    with get_scheduler(current_app).slot(request.remote_addr, algorithm, OPERATIONS[operation], work,
+                                         timeout=current_app.config['SCHEDULER_QUEUE_TIMEOUT']):
+        outputs, extension = run_job(*job, max_pixels)
+
+    headers, chunks = job_response(operation, outputs, extension)
+    return Response(chunks, headers=headers)
+
+
+# Helper function to retrieve the job registry of the app, created on first use
+def get_job_registry():
+    if 'job_registry' not in current_app.extensions:
+        current_app.extensions['job_registry'] = JobRegistry(current_app.config['API_MAX_JOBS'],
+                                                             current_app.config['API_JOB_TTL'])
+    return current_app.extensions['job_registry']
+
+
+# Helper function to format a server-sent event
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+# Start an encryption or decryption in the background and return the URLs to follow it
+@api_v1.route('/jobs/<algorithm>/<operation>', methods=['POST'])
+def submit_job(algorithm, operation):
+    job = get_job_registry().submit(*prepare_job(request, algorithm, operation), current_app.config['API_MAX_PIXELS'],
+                                    scheduler=get_scheduler(current_app), client=request.remote_addr)
+
+    return jsonify({
+        "job_id": job.id,
+        "events_url": url_for('api_v1.job_events', job_id=job.id),
+        "result_url": url_for('api_v1.job_result', job_id=job.id)
+    }), 202
+
+
+# Stream the progress of a job as server-sent events, until it ends
+@api_v1.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    job = get_job_registry().get(job_id)
+    heartbeat = current_app.config['API_JOB_HEARTBEAT']
+
+    def generate():
+        last_done_rows = None
+        while True:
+            status, done_rows, total_rows = job.wait(last_done_rows, heartbeat)
+
+            if done_rows != last_done_rows:
+                yield sse_event("progress", {"done": done_rows, "total": total_rows})
+                last_done_rows = done_rows
+            elif status == "running":
+                yield ": heartbeat\n\n"  # Comment line, keeps proxies from closing an idle connection
+
+            if status != "running":
+                yield sse_event(status, {"error": job.error} if status == "error" else {})
+                return
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+# Return the result of a finished job, in the same format as the synchronous endpoints
+@api_v1.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    job = get_job_registry().get(job_id)
+
+    if job.status == "running":
+        raise ApiError("The job is still running", 409)
+    if job.status == "cancelled":
+        raise ApiError("The job was cancelled", 409)
+    if job.status == "error":
+        raise ApiError(job.error)
+
+    headers, chunks = job_response(job.operation, *job.result)
+    return Response(chunks, headers=headers)
+
+
+# Cancel a job: the scheme stops at the next strip of rows
+@api_v1.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    job = get_job_registry().get(job_id)
+    job.cancel.set()
+    return jsonify({"job_id": job.id, "status": job.status if job.status != "running" else "cancelling"}), 202
@@ -0,0 +1,271 @@
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from PIL import Image
+
+from algo_interface import ALGORITHM_MODULES, get_capabilities
+from jobs import OPERATIONS, ApiError, open_image
+from scripts.common.progress import OperationCancelled
+
+# Seconds per megapixel of work (see work_megapixels) assumed for an operation before its first measurement:
+# the schemes processed in parallel bands are NumPy code, the others have per-row (or per-pixel) loops
+DEFAULT_SECONDS_PER_MEGAPIXEL = {True: 0.02, False: 0.1}
+RATE_WEIGHT = 0.3  # Weight of the last measurement in the moving average of the seconds per megapixel
+# Work below which a measured duration is not recorded: the time of a small job is mostly fixed overhead (request,
+# decoding, encoding), which would inflate the seconds per megapixel of the large jobs
+MIN_RECORDED_WORK = 1.0
+WAIT_POLL_SECONDS = 0.5  # Interval at which a queued job checks its cancellation token
+
+
+# Function to compute the amount of work of an operation
+def work_megapixels(algorithm_module, operation, size, param_values):
+    """
+    Counts the work of an operation in megapixels of output: the pixels of the input, times the bands of the
+    scheme mode (e.g. 4 for CMYK), times the pixel expansion squared (e.g. 4 for the 2x2 VC schemes).
+
+    Parameters:
+    algorithm_module (dict): The configuration of the scheme (a value of ALGORITHM_MODULES).
+    operation (str): "encryption" or "decryption".
+    size (tuple): The (width, height) of the input images.
+    param_values (dict): The parameters of the request.
+
+    Returns:
+    float: The work of the operation.
+    """
+    capabilities = get_capabilities(algorithm_module, operation, param_values)
+    bands = Image.getmodebands(algorithm_module["image_type"])
+    return size[0] * size[1] / 1e6 * bands * capabilities["pixel_expansion"] ** 2
+
+
+# Function to compute the work of a job from the headers of its encoded images
+def job_work(algorithm, operation, images_data, param_values, max_pixels):
+    """
+    Parameters:
+    algorithm (str): The algorithm identifier (a key of ALGORITHM_MODULES).
+    operation (str): "encrypt" or "decrypt".
+    images_data (list): The encoded input images (only their headers are read).
+    param_values (dict): The validated parameters of the operation.
+    max_pixels (int): The maximum number of pixels of each input image.
+
+    Returns:
+    float: The work of the job (see work_megapixels).
+    """
+    image = open_image(images_data[0], max_pixels)
+    return work_megapixels(ALGORITHM_MODULES[algorithm], OPERATIONS[operation], image.size, param_values)
+
+
+# Estimator of the duration of the operations, learned from their measured throughput
+class CostModel:
+    def __init__(self, default_rates=None):
+        """
+        Parameters:
+        default_rates (dict): The initial seconds per megapixel of each (algorithm, operation) pair. The missing
+                              pairs start from DEFAULT_SECONDS_PER_MEGAPIXEL.
+        """
+        self.rates = dict(default_rates or {})
+        self.lock = threading.Lock()
+
+    # Returns the estimated duration, in seconds, of an operation
+    def estimate(self, algorithm, operation, work):
+        """
+        Parameters:
+        algorithm (str): The algorithm identifier.
+        operation (str): "encryption" or "decryption".
+        work (float): The work of the operation (see work_megapixels).
+        """
+        with self.lock:
+            rate = self.rates.get((algorithm, operation))
+        if rate is None:
+            rate = DEFAULT_SECONDS_PER_MEGAPIXEL[ALGORITHM_MODULES[algorithm]["capabilities"][operation]["bands"]]
+        return work * rate
+
+    # Updates the throughput of an operation with a measured duration (ignored below MIN_RECORDED_WORK)
+    def record(self, algorithm, operation, work, seconds):
+        if work < MIN_RECORDED_WORK:
+            return
+        with self.lock:
+            rate = self.rates.get((algorithm, operation))
+            measured = seconds / work
+            self.rates[(algorithm, operation)] = measured if rate is None else \
+                (1 - RATE_WEIGHT) * rate + RATE_WEIGHT * measured
+
+
+# Queue of one lane of the scheduler: a number of slots shared fairly between the clients
+class Lane:
+    def __init__(self, slots):
+        self.slots = slots
+        self.running = 0
+        self.waiting = []  # Heap of (start_tag, sequence, ticket)
+        self.virtual_time = 0.0
+        self.finish_tags = {}  # Finish tag of the last job of each client
+
+
+# Scheduler of the operations of the web app: admission from their estimated cost, then fair queuing per client
+class FairScheduler:
+    def __init__(self, cost_model, fast_slots, slow_slots, slow_seconds, max_seconds):
+        """
+        A job whose estimated duration exceeds max_seconds is rejected. The others run in one of two lanes:
+        the slow lane (jobs estimated longer than slow_seconds) has few slots, so large jobs cannot take every
+        slot of the fast lane, where the small jobs keep a short queue.
+
+        Within a lane, the slots are given by start-time fair queuing: each job gets a start tag, the later of
+        the lane virtual time and the finish tag of the previous job of its client, and a finish tag, its start
+        tag plus its estimated duration. The job with the smallest start tag runs first, so a client with many
+        (or long) jobs queued does not delay the first job of another client.
+
+        Parameters:
+        cost_model (CostModel): The estimator of the durations.
+        fast_slots (int): The number of jobs of the fast lane running at the same time.
+        slow_slots (int): The number of jobs of the slow lane running at the same time.
+        slow_seconds (float): The estimated duration above which a job goes to the slow lane.
+        max_seconds (float): The estimated duration above which a job is rejected.
+        """
+        self.cost_model = cost_model
+        self.lanes = {"fast": Lane(fast_slots), "slow": Lane(slow_slots)}
+        self.slow_seconds = slow_seconds
+        self.max_seconds = max_seconds
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+
+    # Estimates the duration of an operation, rejecting the operations over the budget
+    def check(self, algorithm, operation, work):
+        """
+        Parameters:
+        algorithm (str): The algorithm identifier.
+        operation (str): "encryption" or "decryption".
+        work (float): The work of the operation (see work_megapixels).
+
+        Returns:
+        float: The estimated duration in seconds.
+        """
+        seconds = self.cost_model.estimate(algorithm, operation, work)
+        if seconds > self.max_seconds:
+            raise ApiError(f"The operation is too large: estimated {seconds:.0f} s "
+                           f"(limit: {self.max_seconds:.0f} s)", 413)
+        return seconds
+
+    # Gives the free slots of a lane to the queued jobs with the smallest start tags (called with the lock held)
+    def _dispatch(self, lane):
+        while lane.running < lane.slots and lane.waiting:
+            start_tag, _, ticket = heapq.heappop(lane.waiting)
+            if ticket["abandoned"]:
+                continue
+            lane.virtual_time = max(lane.virtual_time, start_tag)
+            lane.running += 1
+            ticket["granted"] = True
+
+        # A finish tag behind the virtual time no longer delays its client (its next job starts at the virtual time)
+        for client in [client for client, tag in lane.finish_tags.items() if tag <= lane.virtual_time]:
+            del lane.finish_tags[client]
+        self.condition.notify_all()
+
+    # Waits for a slot of a lane (called with the lock held)
+    def _acquire(self, lane, client, seconds, timeout, cancel):
+        previous_tag = lane.finish_tags.get(client)
+        start_tag = max(lane.virtual_time, previous_tag or 0.0)
+        lane.finish_tags[client] = start_tag + seconds
+        ticket = {"granted": False, "abandoned": False}
+        heapq.heappush(lane.waiting, (start_tag, next(self.sequence), ticket))
+        self._dispatch(lane)
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not ticket["granted"]:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if (remaining is not None and remaining <= 0) or (cancel is not None and cancel.is_set()):
+                ticket["abandoned"] = True
+                self._forget_finish_tag(lane, client, start_tag + seconds, previous_tag, seconds)
+                if cancel is not None and cancel.is_set():
+                    raise OperationCancelled()
+                raise ApiError("The server is busy, retry later", 503)
+
+            if cancel is not None:
+                remaining = WAIT_POLL_SECONDS if remaining is None else min(remaining, WAIT_POLL_SECONDS)
+            self.condition.wait(remaining)
+
+    # Gives back the estimated duration of an abandoned job to its client (called with the lock held)
+    def _forget_finish_tag(self, lane, client, finish_tag, previous_tag, seconds):
+        """
+        The job never ran, so its client must not be delayed by it: the finish tag of the client goes back to the
+        one before the job if it was the last job of the client, else it is moved back by the duration of the job.
+
+        Parameters:
+        lane (Lane): The lane of the job.
+        client (str): The identifier of the client.
+        finish_tag (float): The finish tag of the job.
+        previous_tag (float): The finish tag of the client before the job (None if it had none).
+        seconds (float): The estimated duration of the job.
+        """
+        current = lane.finish_tags.get(client)
+        if current is None:  # Already behind the virtual time
+            return
+        if current != finish_tag:  # Later jobs of the client were queued after this one
+            lane.finish_tags[client] = current - seconds
+        elif previous_tag is None or previous_tag <= lane.virtual_time:
+            del lane.finish_tags[client]
+        else:
+            lane.finish_tags[client] = previous_tag
+
+    # Runs the body of the with statement in a slot of the lane of the operation, recording its duration
+    @contextmanager
+    def slot(self, client, algorithm, operation, work, timeout=None, cancel=None, record=True):
+        """
+        Parameters:
+        client (str): The identifier of the client (e.g. its IP address), the unit of fairness.
+        algorithm (str): The algorithm identifier.
+        operation (str): "encryption" or "decryption".
+        work (float): The work of the operation (see work_megapixels).
+        timeout (float): The maximum time spent in the queue, after which ApiError (503) is raised. If None,
+                         the job waits until a slot is free.
+        cancel (threading.Event): If set while the job is queued, OperationCancelled is raised.
+        record (bool): Whether the measured duration updates the cost model (False for the operations that are
+                       not proportional to their work, e.g. the decryption previews).
+
+        Returns:
+        str: The lane of the operation ("fast" or "slow").
+        """
+        seconds = self.check(algorithm, operation, work)
+        name = "slow" if seconds > self.slow_seconds else "fast"
+        lane = self.lanes[name]
+
+        with self.condition:
+            self._acquire(lane, client, seconds, timeout, cancel)
+
+        start = time.perf_counter()
+        try:
+            yield name
+            if record:
+                self.cost_model.record(algorithm, operation, work, time.perf_counter() - start)
+        finally:
+            with self.condition:
+                lane.running -= 1
+                self._dispatch(lane)
+
+    # Returns the state of the lanes and the learned throughput
+    def snapshot(self):
+        with self.condition:
+            lanes = {name: {"slots": lane.slots, "running": lane.running,
+                            "queued": sum(not ticket["abandoned"] for _, _, ticket in lane.waiting)}
+                     for name, lane in self.lanes.items()}
+        with self.cost_model.lock:
+            rates = {f"{algorithm}/{operation}": round(rate, 4)
+                     for (algorithm, operation), rate in self.cost_model.rates.items()}
+        return {"lanes": lanes, "seconds_per_megapixel": rates}
+
+
+# Function to retrieve the scheduler of an app, created on first use from its configuration
+def get_scheduler(app):
+    """
+    Parameters:
+    app (flask.Flask): The app, whose SCHEDULER_* settings are used.
+
+    Returns:
+    FairScheduler: The scheduler shared by the routes of the app.
+    """
+    if 'scheduler' not in app.extensions:
+        app.extensions['scheduler'] = FairScheduler(CostModel(), app.config['SCHEDULER_FAST_SLOTS'],
+                                                    app.config['SCHEDULER_SLOW_SLOTS'],
+                                                    app.config['SCHEDULER_SLOW_SECONDS'],
+                                                    app.config['SCHEDULER_MAX_SECONDS'])
+    return app.extensions['scheduler']
@@ -0,0 +1,286 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from jobs import run_job
+from scripts.common.halftoning import threshold_mask
+from scripts.common.kernels import KERNEL_BACKEND
+from scripts.common.randomness import start_random_pool, get_random_pool
+from scripts.common.halftone_cache import HALFTONE_DISK_CAPACITY, start_halftone_cache
+
+
+# Function run once in each worker process when it starts
+def init_worker(random_pool_bytes=0, halftone_cache_bytes=0, halftone_cache_dir=None,
+                halftone_cache_disk_bytes=HALFTONE_DISK_CAPACITY):
+    """
+    Warms up a worker process. Importing jobs already loaded NumPy, PIL and every scheme (through
+    ALGORITHM_MODULES); here the cached threshold masks of the ordered halftoning are also computed,
+    and the random pool of the worker starts filling, so that the first job of the worker does not pay for them.
+
+    Parameters:
+    random_pool_bytes (int): The capacity of the random pool of the worker (see scripts/common/randomness.py).
+                             If 0, the encryptions draw their random bytes from the system directly.
+    halftone_cache_bytes (int): The capacity of the halftone cache of the worker, in memory (see
+                                scripts/common/halftone_cache.py). If 0, the images are always halftoned.
+    halftone_cache_dir (str): The directory of the halftoned planes kept on disk, shared by the workers. If None,
+                              each worker keeps its planes in memory only.
+    halftone_cache_disk_bytes (int): The number of bytes of planes kept in the directory.
+    """
+    threshold_mask("Bayer")
+    threshold_mask("Blue noise")
+    start_random_pool(random_pool_bytes)
+    start_halftone_cache(halftone_cache_bytes, halftone_cache_dir, halftone_cache_disk_bytes)
+
+
+# Function to read the counters of the random pool of a worker process
+def random_pool_metrics():
+    """
+    Returns:
+    tuple: The process identifier and the metrics of its random pool (None if it has no pool).
+    """
+    pool = get_random_pool()
+    return os.getpid(), None if pool is None else pool.metrics()
+
+
+# Function used by the health check, executed by a worker process
+def ping():
+    return os.getpid(), KERNEL_BACKEND
+
+
+# Function to copy bytes into a new shared memory block
+def write_shared(data):
+    """
+    Copies bytes into a new shared memory block. The block must be freed by the process that reads it (see unlink_shared).
+
+    Parameters:
+    data (bytes): The data to be shared.
+
+    Returns:
+    tuple: The name of the block and the size of the data (the block may be larger).
+    """
+    block = shared_memory.SharedMemory(create=True, size=max(1, len(data)))
+    block.buf[:len(data)] = data
+    block.close()
+    return block.name, len(data)
+
+
+# Function to read a shared memory block
+def read_shared(name, size):
+    """
+    Reads the data of a shared memory block.
+
+    Parameters:
+    name (str): The name of the block.
+    size (int): The size of the data.
+
+    Returns:
+    bytes: The data of the block.
+    """
+    block = shared_memory.SharedMemory(name=name)
+    data = bytes(block.buf[:size])
+    block.close()
+    return data
+
+
+# Function to free shared memory blocks (the ones already freed are skipped)
+def unlink_shared(blocks):
+    """
+    Parameters:
+    blocks (list): The (name, size) of each block.
+    """
+    for name, _ in blocks:
+        try:
+            block = shared_memory.SharedMemory(name=name)
+        except FileNotFoundError:
+            continue
+        block.close()
+        block.unlink()
+
+
+# Function to copy each data into a new shared memory block, freeing the blocks already written if one fails
+def write_all_shared(datas):
+    """
+    Parameters:
+    datas (list): The data (bytes) of each block.
+
+    Returns:
+    list: The (name, size) of each block (see write_shared).
+    """
+    blocks = []
+    try:
+        for data in datas:
+            blocks.append(write_shared(data))
+    except BaseException:
+        unlink_shared(blocks)
+        raise
+    return blocks
+
+
+# Function to free the result blocks of a job, once it is completed (used as a callback of its future)
+def unlink_job_outputs(future):
+    if not future.cancelled() and future.exception() is None:
+        unlink_shared(future.result()[0])
+
+
+# Function executed by a worker process: reads the inputs from shared memory and writes the results to it
+def run_shared_job(algorithm, operation, inputs, param_values, encoder, max_pixels):
+    """
+    Runs a job whose encoded input images are stored in shared memory blocks, and stores the encoded results
+    in new shared memory blocks, so that only their names cross the process boundary.
+
+    Parameters:
+    algorithm (str): The algorithm identifier.
+    operation (str): "encrypt" or "decrypt".
+    inputs (list): The (name, size) of the shared memory block of each input image.
+    param_values (dict): The validated parameters of the operation.
+    encoder (str): The name of the encoder profile used for the results.
+    max_pixels (int): The maximum number of pixels of each input image.
+
+    Returns:
+    tuple: The (name, size) of the block of each result, their file extension, the time spent in the worker and
+           the metrics of its random pool (see random_pool_metrics).
+    """
+    start = time.perf_counter()
+
+    images_data = [read_shared(name, size) for name, size in inputs]
+    outputs, extension = run_job(algorithm, operation, images_data, param_values, encoder, max_pixels)
+
+    shared_outputs = write_all_shared(outputs)
+    try:
+        return shared_outputs, extension, time.perf_counter() - start, random_pool_metrics()
+    except BaseException:  # The parent never receives the names of the blocks
+        unlink_shared(shared_outputs)
+        raise
+
+
+# Persistent pool of warm worker processes exchanging images through shared memory
+class WorkerPool:
+    def __init__(self, num_workers, max_tasks_per_child=None, random_pool_bytes=0, halftone_cache=(0, None)):
+        """
+        Parameters:
+        num_workers (int): The number of worker processes.
+        max_tasks_per_child (int): The number of jobs after which a worker is replaced by a fresh one, bounding the
+                                   memory growth of long-lived workers. If None, workers are never replaced.
+        random_pool_bytes (int): The capacity of the random pool of each worker (0 for no pool).
+        halftone_cache (tuple): The capacity in memory of the halftone cache of each worker (0 for no cache), its
+                                directory on disk (None for none) and optionally the capacity of the directory
+                                (see init_worker).
+        """
+        self.num_workers = num_workers
+        self.max_tasks_per_child = max_tasks_per_child
+        self.random_pool_bytes = random_pool_bytes
+        self.halftone_cache = tuple(halftone_cache)
+        self.random_pools = {}  # Last metrics of the random pool of each worker process, by process identifier
+        self.executor = None
+        self.jobs = 0
+        self.failed_jobs = 0
+        self.total_overhead = 0.0
+        self.max_overhead = 0.0
+        self.total_worker_time = 0.0
+
+    # Starts the worker processes and waits until all of them are ready
+    def start(self):
+        # "spawn" starts clean workers, without copying the threads of the event loop
+        self.executor = ProcessPoolExecutor(max_workers=self.num_workers,
+                                            mp_context=multiprocessing.get_context("spawn"),
+                                            initializer=init_worker,
+                                            initargs=(self.random_pool_bytes, *self.halftone_cache),
+                                            max_tasks_per_child=self.max_tasks_per_child)
+
+        # One ping per worker, so that every process is spawned and initialized before the first request
+        for future in [self.executor.submit(ping) for _ in range(self.num_workers)]:
+            future.result()
+
+    # Stops the worker processes
+    def stop(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    # Runs a job (the arguments of jobs.run_job) in a worker and returns its results
+    async def run(self, algorithm, operation, images_data, param_values, encoder, max_pixels):
+        start = time.perf_counter()
+        inputs = write_all_shared(images_data)
+
+        # The inputs are freed when the job is completed (or cancelled before it started), not when the await is
+        # interrupted: the worker may still be reading them
+        try:
+            future = self.executor.submit(run_shared_job, algorithm, operation, inputs, param_values, encoder,
+                                          max_pixels)
+        except BaseException:
+            unlink_shared(inputs)
+            raise
+        future.add_done_callback(lambda _: unlink_shared(inputs))
+
+        try:
+            shared_outputs, extension, worker_time, (pid, pool_metrics) = await asyncio.wrap_future(future)
+        except BaseException as e:
+            # Cancelled (e.g. the client disconnected, or a timeout) while the worker runs: the results it writes
+            # are freed when it completes
+            future.add_done_callback(unlink_job_outputs)
+            if isinstance(e, Exception):
+                self.failed_jobs += 1
+            raise
+
+        try:
+            outputs = [read_shared(name, size) for name, size in shared_outputs]
+        finally:
+            unlink_shared(shared_outputs)
+
+        # The dispatch overhead is everything but the work done in the worker (copies, queues, scheduling)
+        overhead = time.perf_counter() - start - worker_time
+        self.jobs += 1
+        self.total_worker_time += worker_time
+        self.total_overhead += overhead
+        self.max_overhead = max(self.max_overhead, overhead)
+        if pool_metrics is not None:
+            self.random_pools[pid] = pool_metrics
+
+        return outputs, extension
+
+    # Checks that a worker answers within the timeout
+    async def health(self, timeout=5.0):
+        if self.executor is None:
+            return {"status": "stopped", "workers": self.num_workers}
+
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            pid, kernel_backend = await asyncio.wait_for(loop.run_in_executor(self.executor, ping), timeout)
+        except Exception as e:  # Timeout, or broken pool after a worker crashed
+            return {"status": "unhealthy", "workers": self.num_workers, "error": repr(e)}
+
+        return {
+            "status": "ok",
+            "workers": self.num_workers,
+            "responding_pid": pid,
+            "kernel_backend": kernel_backend,  # "numba" if the compiled kernels are available in the workers
+            "ping_ms": round((time.perf_counter() - start) * 1000, 3)
+        }
+
+    # Returns the counters of the jobs run so far
+    def metrics(self):
+        return {
+            "workers": self.num_workers,
+            "max_tasks_per_child": self.max_tasks_per_child,
+            "jobs": self.jobs,
+            "failed_jobs": self.failed_jobs,
+            "mean_worker_ms": round(self.total_worker_time / self.jobs * 1000, 3) if self.jobs else None,
+            "mean_dispatch_overhead_ms": round(self.total_overhead / self.jobs * 1000, 3) if self.jobs else None,
+            "max_dispatch_overhead_ms": round(self.max_overhead * 1000, 3),
+            "random_pool": self.random_pool_totals()
+        }
+
+    # Returns the counters of the random pools, summed over the workers that ran a job
+    def random_pool_totals(self):
+        if not self.random_pools:
+            return None
+
+        counters = ["requests", "misses", "bytes_from_pool", "bytes_from_source"]
+        totals = {counter: sum(metrics[counter] for metrics in self.random_pools.values()) for counter in counters}
+        totals["capacity_bytes"] = self.random_pool_bytes
+        totals["reporting_workers"] = len(self.random_pools)
+        return totals
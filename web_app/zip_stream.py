@@ -0,0 +1,67 @@
+import io
+import json
+import zipfile
+
+from scripts.common.encoding import get_encoder_profile, save_image
+
+
+# File-like object that collects the bytes written by zipfile until they are sent to the client
+class ChunkWriter:
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    # Returns the bytes written since the last call and forgets them
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+# Generator that builds a ZIP archive of the shares on the fly, one entry at a time
+def stream_shares_zip(shares, encoder, manifest):
+    """
+    Builds a ZIP archive containing the shares and a manifest, yielding it in chunks while it is written.
+    The writer has no seek(), so zipfile streams each entry followed by a data descriptor, and only one
+    encoded share is kept in memory at a time. The shares are stored without compression, since they are
+    already encoded (and random-grid shares are incompressible noise).
+
+    Parameters:
+    shares (list): The shares (PIL images) to be archived, saved as share1, share2, ...
+    encoder (str): The name of the encoder profile used to save the shares.
+    manifest (dict): The metadata of the encryption, written to manifest.json together with the list of shares.
+
+    Returns:
+    generator: The chunks (bytes) of the ZIP archive.
+    """
+    extension = get_encoder_profile(encoder)["format"]
+    writer = ChunkWriter()
+    manifest = dict(manifest, format=extension, shares=[])
+
+    with zipfile.ZipFile(writer, mode='w', compression=zipfile.ZIP_STORED) as archive:
+        for i, share in enumerate(shares, start=1):
+            filename = f"share{i}.{extension}"
+
+            buffer = io.BytesIO()
+            save_image(share, buffer, encoder)
+            archive.writestr(filename, buffer.getbuffer())
+
+            manifest["shares"].append({
+                "file": filename,
+                "width": share.size[0],
+                "height": share.size[1],
+                "mode": share.mode,
+                "bytes": buffer.tell()
+            })
+            del buffer
+            yield writer.drain()
+
+        archive.writestr("manifest.json", json.dumps(manifest, indent=4), compress_type=zipfile.ZIP_DEFLATED)
+
+    yield writer.drain()  # Manifest and central directory, written when the archive is closed